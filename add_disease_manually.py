@@ -2,7 +2,9 @@
 """
 Manual Disease Addition Tool for AI Crop Diseases Solution
 """
-from pymongo import MongoClient
+from plants.catalog import catalog_write, record_deletions
+from plants.disease_index import normalize_name, with_name_key
+from plants.mongo import get_client, get_db
 import json
 from datetime import datetime
 
@@ -10,9 +12,9 @@ class DiseaseManager:
     def __init__(self):
         """Initialize MongoDB connection"""
         try:
-            self.client = MongoClient('mongodb://localhost:27017/')
+            self.client = get_client()
             self.client.admin.command('ping')
-            self.db = self.client['plant_diseases']
+            self.db = get_db()
             self.collection = self.db['diseases']
             print("✅ Connected to MongoDB successfully!")
         except Exception as e:
@@ -36,8 +38,8 @@ class DiseaseManager:
             print("❌ Disease name is required")
             return False
 
-        # Check if disease already exists
-        existing = self.collection.find_one({"name": {"$regex": f"^{disease_name}$", "$options": "i"}})
+        # Check if disease already exists (indexed lookup on the normalized name)
+        existing = self.collection.find_one({"name_key": normalize_name(disease_name)}, {"_id": 1})
         if existing:
             print(f"⚠️  Disease '{disease_name}' already exists!")
             overwrite = input("Do you want to overwrite it? (y/n): ").strip().lower()
@@ -105,24 +107,26 @@ class DiseaseManager:
             })
 
         # Create disease document
-        disease_doc = {
+        disease_doc = with_name_key({
             "name": disease_name.lower(),
             "description": description,
             "solutions": solutions,
             "added_date": datetime.now(),
             "added_manually": True
-        }
+        })
 
         # Insert or update disease
         try:
+            # The write bumps the catalog version, which the web workers watch
+            # to reload their search index and response cache
+            with catalog_write(self.db, disease_doc):
+                if existing:
+                    result = self.collection.replace_one({"_id": existing["_id"]}, disease_doc)
+                else:
+                    result = self.collection.insert_one(disease_doc)
             if existing:
-                result = self.collection.replace_one(
-                    {"name": {"$regex": f"^{disease_name}$", "$options": "i"}},
-                    disease_doc
-                )
                 print(f"✅ Updated disease '{disease_name}' successfully!")
             else:
-                result = self.collection.insert_one(disease_doc)
                 print(f"✅ Added disease '{disease_name}' successfully!")
                 print(f"📄 Document ID: {result.inserted_id}")
 
@@ -153,8 +157,10 @@ class DiseaseManager:
             # Add metadata
             disease_data['added_date'] = datetime.now()
             disease_data['added_manually'] = True
+            with_name_key(disease_data)
 
-            result = self.collection.insert_one(disease_data)
+            with catalog_write(self.db, disease_data):
+                result = self.collection.insert_one(disease_data)
             print(f"✅ Added disease '{disease_data['name']}' successfully!")
             print(f"📄 Document ID: {result.inserted_id}")
             return True
@@ -202,7 +208,7 @@ class DiseaseManager:
             return
 
         # Find disease
-        disease = self.collection.find_one({"name": {"$regex": f"^{disease_name}$", "$options": "i"}})
+        disease = self.collection.find_one({"name_key": normalize_name(disease_name)})
         if not disease:
             print(f"❌ Disease '{disease_name}' not found")
             return
@@ -215,6 +221,7 @@ class DiseaseManager:
         if confirm == 'y':
             result = self.collection.delete_one({"_id": disease["_id"]})
             if result.deleted_count > 0:
+                record_deletions(self.db, [disease])
                 print(f"✅ Deleted disease '{disease['name']}' successfully!")
             else:
                 print(f"❌ Failed to delete disease")
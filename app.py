@@ -1,10 +1,15 @@
 from flask import Flask, render_template, request, jsonify
 from flask_cors import CORS
-from pymongo import MongoClient, errors
 from bson import ObjectId
 import logging
 from datetime import datetime
 import os
+from plants.catalog import get_version
+from plants.mongo import get_db
+from plants.search_cache import get_search_cache
+from plants.search_engine import DiseaseSearchEngine, clamp_limit, solution_payload
+from plants.seed import apply_seed
+from functools import partial
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS
@@ -13,31 +18,36 @@ CORS(app)  # Enable CORS
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# MongoDB connection setup with error handling
-try:
-    # MongoDB connection with timeout and error handling
-    client = MongoClient(
-        'mongodb://localhost:27017/',
-        serverSelectionTimeoutMS=5000,  # 5 second timeout
-        connectTimeoutMS=10000,         # 10 second connection timeout
-        socketTimeoutMS=20000           # 20 second socket timeout
-    )
+# MongoDB handle from the shared provider (timeouts and pool sizes come from
+# MONGODB_* settings/environment variables); connects lazily on first use
+db = get_db()
+
+# Shared ranked search engine, rebuilt whenever the diseases collection changes;
+# responses (with images) are serialized once per rebuild
+search_engine = DiseaseSearchEngine(render=partial(solution_payload, images=True))
 
-    # Test the connection
-    client.admin.command('ping')
-    logger.info("✅ Successfully connected to MongoDB!")
+def refresh_search_engine():
+    """Rebuild the in-memory search index from MongoDB"""
+    try:
+        search_engine.refresh(db.diseases, get_version(db))
+        return True
+    except Exception as e:
+        logger.error(f"❌ Failed to build search index: {e}")
+        return False
 
-    db = client['plant_diseases']
+def ensure_search_engine():
+    """Load the search index, reloading it when the catalog was written elsewhere"""
+    try:
+        search_engine.ensure_current(db.diseases, lambda: get_version(db))
+        return True
+    except Exception as e:
+        logger.error(f"❌ Failed to build search index: {e}")
+        return False
 
-except errors.ServerSelectionTimeoutError as e:
-    logger.error(f"❌ MongoDB connection failed: {e}")
-    logger.error("Please ensure MongoDB is running on localhost:27017")
-    db = None
-except Exception as e:
-    logger.error(f"❌ Unexpected MongoDB error: {e}")
-    db = None
+# Cached search responses, invalidated whenever the search index is rebuilt
+search_cache = get_search_cache('flask')
 
-def init_db():
+def init_db(swap=False):
     # Check if collections exist, if not create them
     if 'diseases' not in db.list_collection_names():
         db.create_collection('diseases')
@@ -45,232 +55,51 @@ def init_db():
     if 'solutions' not in db.list_collection_names():
         db.create_collection('solutions')
     
-    # Insert sample data if collections are empty
-    if db.diseases.count_documents({}) == 0:
-        sample_data = [
-            {
-                "name": "powdery mildew",
-                "description": "A fungal disease that appears as white powdery spots on leaves and stems",
-                "image": "https://images.unsplash.com/photo-1416879595882-3373a0480b5b?w=400&h=300&fit=crop&q=80",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Mix 1 tablespoon baking soda with 1 gallon of water",
-                        "image": "https://images.unsplash.com/photo-1584464491033-06628f3a6b7b?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "High",
-                        "application": "Spray on affected areas every 7-10 days"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Apply milk spray (40% milk to 60% water)",
-                        "image": "https://images.unsplash.com/photo-1563636619-e9143da7973b?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Medium",
-                        "application": "Spray early morning or evening"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Apply potassium bicarbonate fungicides",
-                        "image": "https://images.unsplash.com/photo-1582719471384-894fbb16e074?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Very High",
-                        "application": "Follow manufacturer's instructions"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Use synthetic fungicides containing myclobutanil",
-                        "image": "https://images.unsplash.com/photo-1559757148-5c350d0d3c56?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Very High",
-                        "application": "Professional application recommended"
-                    }
-                ]
-            },
-            {
-                "name": "blight",
-                "description": "A plant disease causing browning and death of plant tissues",
-                "image": "https://images.unsplash.com/photo-1416879595882-3373a0480b5b?w=400&h=300&fit=crop&q=80",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Apply copper-based fungicides",
-                        "image": "https://images.unsplash.com/photo-1628771065518-0d82f1938462?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "High",
-                        "application": "Apply during dry weather conditions"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Use Bacillus subtilis biological fungicide",
-                        "image": "https://images.unsplash.com/photo-1530836369250-ef72a3f5cda8?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Medium",
-                        "application": "Apply as preventive measure"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Apply chlorothalonil every 7-10 days",
-                        "image": "https://images.unsplash.com/photo-1576086213369-97a306d36557?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Very High",
-                        "application": "Regular scheduled applications"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Use mancozeb or maneb fungicides",
-                        "image": "https://images.unsplash.com/photo-1582719471384-894fbb16e074?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Very High",
-                        "application": "Follow safety guidelines strictly"
-                    }
-                ]
-            },
-            {
-                "name": "rust",
-                "description": "A fungal disease causing orange or rust-colored spots on leaves",
-                "image": "https://images.unsplash.com/photo-1550583724-b2692b85b150?w=400&h=300&fit=crop&q=80",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Apply sulfur dust or spray early in the season",
-                        "image": "https://images.unsplash.com/photo-1574263867128-a3d5c1b1deae?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "High",
-                        "application": "Early morning application preferred"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Use neem oil every 7-14 days",
-                        "image": "https://images.unsplash.com/photo-1628771065518-0d82f1938462?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Medium",
-                        "application": "Avoid application during hot weather"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Apply myclobutanil or propiconazole fungicides",
-                        "image": "https://images.unsplash.com/photo-1576086213369-97a306d36557?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Very High",
-                        "application": "Professional consultation recommended"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Use tebuconazole for severe infections",
-                        "image": "https://images.unsplash.com/photo-1582719471384-894fbb16e074?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Very High",
-                        "application": "Last resort for severe cases"
-                    }
-                ]
-            },
-            {
-                "name": "aphid infestation",
-                "description": "Small insects that feed on plant sap, causing yellowing and stunted growth",
-                "image": "https://images.unsplash.com/photo-1416879595882-3373a0480b5b?w=400&h=300&fit=crop&q=80",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Spray with insecticidal soap solution",
-                        "image": "https://images.unsplash.com/photo-1584464491033-06628f3a6b7b?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "High",
-                        "application": "Apply every 3-5 days until controlled"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Release ladybugs as natural predators",
-                        "image": "https://images.unsplash.com/photo-1530836369250-ef72a3f5cda8?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Very High",
-                        "application": "Release in early morning or evening"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Apply systemic insecticides like imidacloprid",
-                        "image": "https://images.unsplash.com/photo-1576086213369-97a306d36557?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Very High",
-                        "application": "Follow label instructions carefully"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Use pyrethroid-based contact insecticides",
-                        "image": "https://images.unsplash.com/photo-1582719471384-894fbb16e074?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "High",
-                        "application": "Apply during cooler parts of the day"
-                    }
-                ]
-            },
-            {
-                "name": "black spot",
-                "description": "Fungal disease causing black spots on leaves, common in roses",
-                "image": "https://images.unsplash.com/photo-1574263867128-a3d5c1b1deae?w=400&h=300&fit=crop&q=80",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Apply baking soda and oil spray",
-                        "image": "https://images.unsplash.com/photo-1628771065518-0d82f1938462?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Medium",
-                        "application": "Spray weekly during growing season"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Use compost tea as foliar spray",
-                        "image": "https://images.unsplash.com/photo-1563636619-e9143da7973b?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Medium",
-                        "application": "Apply every 2 weeks"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Apply triazole fungicides",
-                        "image": "https://images.unsplash.com/photo-1559757148-5c350d0d3c56?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "Very High",
-                        "application": "Start applications early in season"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Use copper-based fungicides",
-                        "image": "https://images.unsplash.com/photo-1582719471384-894fbb16e074?w=300&h=200&fit=crop&q=80",
-                        "effectiveness": "High",
-                        "application": "Apply before symptoms appear"
-                    }
-                ]
-            }
-        ]
+    # The database is shared with the Django app, so startup only seeds an empty
+    # collection; a reset replaces the catalog with the seed
+    if swap:
+        apply_seed(db.diseases, swap=True)
+    elif db.diseases.find_one({}, {'_id': 1}) is None:
+        apply_seed(db.diseases)
 
-        db.diseases.insert_many(sample_data)
+    refresh_search_engine()
+    search_cache.invalidate()
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def search_response(disease_input, limit):
+    """Build the (status, body) search response from the pre-rendered index"""
+    if not ensure_search_engine():
+        return 500, b'{"error": "Database connection failed"}'
+    body = search_engine.search_body(disease_input, limit=limit)
+    if body is None:
+        return 404, b'{"error": "Disease not found"}'
+    return 200, body
+
 @app.route('/search', methods=['POST'])
 def search():
     disease_input = request.json.get('disease', '').lower()
-
-    # MongoDB query with case-insensitive search
-    disease = db.diseases.find_one(
-        {"name": {"$regex": f".*{disease_input}.*", "$options": "i"}}
+    limit = clamp_limit(request.json.get('limit'))
+    if not ensure_search_engine():
+        return app.response_class(b'{"error": "Database connection failed"}', status=500, mimetype='application/json')
+
+    # Ranked fuzzy search, served from the response cache when possible
+    status, body = search_cache.get_or_compute(
+        disease_input, lambda: search_response(disease_input, limit), limit,
+        version=search_engine.version,
     )
-
-    if not disease:
-        return jsonify({"error": "Disease not found"}), 404
-
-    # Organize solutions by type with enhanced data
-    solutions = {"organic": [], "inorganic": []}
-    for solution in disease.get('solutions', []):
-        solution_data = {
-            "solution": solution['solution'],
-            "image": solution.get('image', ''),
-            "effectiveness": solution.get('effectiveness', 'Unknown'),
-            "application": solution.get('application', 'Follow standard guidelines')
-        }
-        solutions[solution['type']].append(solution_data)
-
-    return jsonify({
-        "disease": disease['name'],
-        "description": disease.get('description', ''),
-        "image": disease.get('image', ''),
-        "solutions": solutions
-    })
+    return app.response_class(body, status=status, mimetype='application/json')
 
 @app.route('/reset-db', methods=['POST'])
 def reset_database():
     """Reset database with new image data structure"""
     try:
-        # Drop existing collections
-        db.diseases.drop()
+        # Drop the unused solutions collection; diseases are swapped in
+        # atomically so searches never see an empty collection
         db.solutions.drop()
-
-        # Reinitialize with new data
-        init_db()
+        init_db(swap=True)
 
         return jsonify({"message": "Database reset successfully with image support!"})
     except Exception as e:
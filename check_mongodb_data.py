@@ -2,7 +2,7 @@
 """
 Check MongoDB Data vs Web Display
 """
-from pymongo import MongoClient
+from plants.mongo import get_db
 import requests
 from bs4 import BeautifulSoup
 
@@ -12,8 +12,7 @@ def check_mongodb_data():
     print("=" * 50)
     
     try:
-        client = MongoClient('mongodb://localhost:27017/')
-        db = client['plant_diseases']
+        db = get_db()
         collection = db['diseases']
         
         # Get all diseases
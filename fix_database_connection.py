@@ -3,7 +3,9 @@
 Complete Database Connection Fix
 """
 import requests
-from pymongo import MongoClient
+from plants.catalog import catalog_write, record_deletions
+from plants.disease_index import with_name_key
+from plants.mongo import get_client, get_db
 import subprocess
 import time
 
@@ -14,12 +16,12 @@ def check_mongodb_status():
     
     try:
         # Test MongoDB connection
-        client = MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=5000)
+        client = get_client()
         client.admin.command('ping')
         print("✅ MongoDB is running and accessible")
         
         # Check database and collection
-        db = client['plant_diseases']
+        db = get_db()
         count = db.diseases.count_documents({})
         print(f"📊 Found {count} diseases in database")
         
@@ -109,8 +111,7 @@ def create_quick_test():
     
     try:
         # Test MongoDB directly
-        client = MongoClient('mongodb://localhost:27017/')
-        db = client['plant_diseases']
+        db = get_db()
         
         # Insert a test disease
         test_disease = {
@@ -126,11 +127,13 @@ def create_quick_test():
         }
         
         # Insert and immediately remove
-        result = db.diseases.insert_one(test_disease)
+        with catalog_write(db, with_name_key(test_disease)):
+            result = db.diseases.insert_one(test_disease)
         print(f"✅ Test insert successful: {result.inserted_id}")
         
         # Remove test disease
         db.diseases.delete_one({"_id": result.inserted_id})
+        record_deletions(db, [test_disease])
         print("✅ Test cleanup successful")
         
         return True
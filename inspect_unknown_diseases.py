@@ -2,7 +2,8 @@
 """
 Inspect Unknown Diseases in MongoDB
 """
-from pymongo import MongoClient
+from plants.catalog import record_deletions
+from plants.mongo import get_db
 import json
 from datetime import datetime
 
@@ -12,8 +13,7 @@ def inspect_unknown_diseases():
     print("=" * 50)
     
     try:
-        client = MongoClient('mongodb://localhost:27017/')
-        db = client['plant_diseases']
+        db = get_db()
         collection = db['diseases']
         
         # Find diseases with missing or unknown names
@@ -53,8 +53,7 @@ def clean_unknown_diseases():
     print("=" * 50)
     
     try:
-        client = MongoClient('mongodb://localhost:27017/')
-        db = client['plant_diseases']
+        db = get_db()
         collection = db['diseases']
         
         # Find and delete diseases with no useful data
@@ -78,7 +77,10 @@ def clean_unknown_diseases():
         if count_before > 0:
             confirm = input(f"Delete {count_before} incomplete diseases? (y/n): ").strip().lower()
             if confirm == 'y':
-                result = collection.delete_many(criteria)
+                # Delete by _id so exactly the recorded documents go, and leave tombstones for sync clients
+                doomed = list(collection.find(criteria, {"name": 1}))
+                result = collection.delete_many({"_id": {"$in": [d["_id"] for d in doomed]}})
+                record_deletions(db, doomed)
                 print(f"✅ Deleted {result.deleted_count} incomplete diseases")
                 
                 # Show remaining count
@@ -102,8 +104,7 @@ def show_valid_diseases():
     print("=" * 50)
     
     try:
-        client = MongoClient('mongodb://localhost:27017/')
-        db = client['plant_diseases']
+        db = get_db()
         collection = db['diseases']
         
         # Find diseases with valid names and solutions
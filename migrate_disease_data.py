@@ -3,127 +3,41 @@
 Migrate Disease Data to Correct Format
 Convert old schema to new schema for web display
 """
-from pymongo import MongoClient
-from datetime import datetime
+import argparse
 
-def migrate_disease_data():
+from plants.mongo import get_db
+from plants.schema_migration import OLD_SCHEMA_FILTER, clear_checkpoint, get_failed_ids, run_migration
+
+def migrate_disease_data(restart=False):
     """Convert old schema diseases to new schema"""
     print("🔄 Migrating Disease Data to Correct Format...")
     print("=" * 60)
     
     try:
-        client = MongoClient('mongodb://localhost:27017/')
-        db = client['plant_diseases']
+        db = get_db()
         collection = db['diseases']
+        if restart:
+            clear_checkpoint(db)
         
-        # Find diseases with old schema
-        old_schema_diseases = list(collection.find({
-            "disease_name": {"$exists": True},
-            "name": {"$exists": False}
-        }))
-        
-        print(f"📊 Found {len(old_schema_diseases)} diseases to migrate")
-        
-        migrated_count = 0
-        
-        for disease in old_schema_diseases:
-            try:
-                # Extract data from old schema
-                disease_name = disease.get('disease_name', '').lower()
-                recommended_treatment = disease.get('recommended_treatment', '')
-                fertilisers = disease.get('fertilisers', '')
-                pesticides = disease.get('pesticides', '')
-                
-                # Create description based on disease name
-                descriptions = {
-                    'anthracnose': 'A fungal disease causing dark, sunken lesions on fruits, leaves, and stems',
-                    'downy mildew': 'A fungal disease causing yellow spots on upper leaf surfaces with fuzzy growth underneath',
-                    'bacterial wilt': 'A bacterial disease causing sudden wilting and death of plants',
-                    'early blight': 'A fungal disease causing brown spots with concentric rings on leaves',
-                    'late blight': 'A devastating fungal disease causing dark, water-soaked lesions on leaves and fruits',
-                    'black rot': 'A fungal disease causing black, circular lesions on leaves and fruits',
-                    'root rot': 'A fungal disease affecting plant roots, causing yellowing and wilting',
-                    'sooty mold': 'A fungal disease causing black, sooty coating on leaves and stems',
-                    'canker': 'A fungal disease causing sunken, dead areas on stems and branches',
-                    'mosaic virus': 'A viral disease causing mottled yellow and green patterns on leaves'
-                }
-                
-                description = descriptions.get(disease_name, f'A plant disease: {disease_name}')
-                
-                # Create solutions array
-                solutions = []
-                
-                # Add organic solution (fertilizers)
-                if fertilisers and fertilisers.strip():
-                    organic_solution = {
-                        'type': 'organic',
-                        'solution': f'Apply {fertilisers.lower()}',
-                        'effectiveness': 'Medium',
-                        'application': 'Apply as soil amendment or foliar feed'
-                    }
-                    solutions.append(organic_solution)
-                
-                # Add inorganic solution (pesticides)
-                if pesticides and pesticides.strip():
-                    inorganic_solution = {
-                        'type': 'inorganic',
-                        'solution': pesticides,
-                        'effectiveness': 'High',
-                        'application': 'Apply according to label instructions'
-                    }
-                    solutions.append(inorganic_solution)
-                
-                # Add general treatment if available
-                if recommended_treatment and recommended_treatment.strip():
-                    general_solution = {
-                        'type': 'organic',
-                        'solution': recommended_treatment,
-                        'effectiveness': 'High',
-                        'application': 'Follow recommended practices'
-                    }
-                    solutions.append(general_solution)
-                
-                # Ensure at least one solution
-                if not solutions:
-                    solutions.append({
-                        'type': 'organic',
-                        'solution': 'Consult agricultural expert for treatment options',
-                        'effectiveness': 'Medium',
-                        'application': 'Follow expert recommendations'
-                    })
-                
-                # Create new document with correct schema
-                new_document = {
-                    'name': disease_name,
-                    'description': description,
-                    'solutions': solutions,
-                    'migrated_from_old_schema': True,
-                    'migration_date': datetime.now(),
-                    'original_data': {
-                        'disease_name': disease.get('disease_name'),
-                        'recommended_treatment': disease.get('recommended_treatment'),
-                        'fertilisers': disease.get('fertilisers'),
-                        'pesticides': disease.get('pesticides')
-                    }
-                }
-                
-                # Replace the old document
-                result = collection.replace_one(
-                    {'_id': disease['_id']},
-                    new_document
-                )
-                
-                if result.modified_count > 0:
-                    migrated_count += 1
-                    print(f"✅ Migrated: {disease_name.title()}")
-                    print(f"   Solutions: {len(solutions)}")
-                    print(f"   Description: {description[:50]}...")
-                
-            except Exception as e:
-                print(f"❌ Error migrating {disease.get('disease_name', 'Unknown')}: {e}")
+        # Count diseases with old schema
+        remaining = collection.count_documents(OLD_SCHEMA_FILTER)
+        print(f"📊 Found {remaining} diseases to migrate")
+
+        def report(progress):
+            print(f"✅ Batch {progress.batches}: {progress.scanned}/{remaining} scanned, "
+                  f"{progress.migrated} migrated, {progress.merged} merged ({progress.rate:.0f} docs/s)")
+
+        # Batched bulk replace, resuming from the last checkpoint if a run was interrupted
+        progress = run_migration(collection, on_batch=report)
+        migrated_count = progress.migrated + progress.merged
+        if progress.merged:
+            print(f"🔗 {progress.merged} diseases merged into existing ones with the same name")
+        failed = get_failed_ids(db)
+        if failed:
+            print(f"❌ {len(failed)} diseases could not be migrated; run again to retry them")
         
         print(f"\n🎉 Migration Complete!")
-        print(f"✅ Successfully migrated {migrated_count} diseases")
+        print(f"✅ Successfully migrated {migrated_count} diseases in {progress.elapsed:.1f}s")
         
         # Show final statistics
         total_diseases = collection.count_documents({})
@@ -149,8 +63,7 @@ def show_all_diseases():
     print("=" * 60)
     
     try:
-        client = MongoClient('mongodb://localhost:27017/')
-        db = client['plant_diseases']
+        db = get_db()
         collection = db['diseases']
         
         diseases = list(collection.find({}).sort('name', 1))
@@ -182,11 +95,15 @@ def show_all_diseases():
 
 def main():
     """Main migration function"""
+    parser = argparse.ArgumentParser(description="Convert old-schema diseases to the current schema")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the beginning")
+    args = parser.parse_args()
+
     print("🚀 Disease Data Migration Tool")
     print("=" * 60)
     
     # Perform migration
-    migrated_count = migrate_disease_data()
+    migrated_count = migrate_disease_data(restart=args.restart)
     
     if migrated_count > 0:
         # Show all diseases
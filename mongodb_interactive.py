@@ -2,7 +2,8 @@
 """
 Interactive MongoDB Connection for AI Crop Diseases Solution
 """
-from pymongo import MongoClient
+from plants.mongo import get_client, get_db
+from plants.seed import apply_seed
 import json
 from datetime import datetime
 
@@ -10,9 +11,9 @@ class MongoDBManager:
     def __init__(self):
         """Initialize MongoDB connection"""
         try:
-            self.client = MongoClient('mongodb://localhost:27017/')
+            self.client = get_client()
             self.client.admin.command('ping')
-            self.db = self.client['plant_diseases']
+            self.db = get_db()
             self.collection = self.db['diseases']
             print("✅ Connected to MongoDB successfully!")
             print(f"📊 Database: {self.db.name}")
@@ -131,115 +132,9 @@ class MongoDBManager:
         print("\n📝 Adding comprehensive sample data...")
         print("=" * 50)
         
-        # Clear existing data
-        self.collection.drop()
-        
-        sample_diseases = [
-            {
-                "name": "powdery mildew",
-                "description": "A fungal disease that appears as white powdery coating on leaves and stems",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Baking soda spray (1 tbsp per gallon water)",
-                        "effectiveness": "High",
-                        "application": "Spray weekly on affected areas"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Neem oil treatment",
-                        "effectiveness": "High",
-                        "application": "Apply every 7-14 days"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Sulfur-based fungicide",
-                        "effectiveness": "Very High",
-                        "application": "Apply as directed on label"
-                    }
-                ]
-            },
-            {
-                "name": "blight",
-                "description": "A plant disease causing brown spots and wilting of leaves and stems",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Copper sulfate spray",
-                        "effectiveness": "High",
-                        "application": "Apply every 7-10 days in dry weather"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Chlorothalonil fungicide",
-                        "effectiveness": "Very High",
-                        "application": "Apply every 7-14 days"
-                    }
-                ]
-            },
-            {
-                "name": "rust",
-                "description": "A fungal disease causing orange-red pustules on leaf undersides",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Sulfur dust application",
-                        "effectiveness": "High",
-                        "application": "Apply early morning when dew is present"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Propiconazole systemic fungicide",
-                        "effectiveness": "Very High",
-                        "application": "Apply at first sign of disease"
-                    }
-                ]
-            },
-            {
-                "name": "aphid infestation",
-                "description": "Small green or black insects clustering on stems and leaves",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Insecticidal soap spray",
-                        "effectiveness": "High",
-                        "application": "Spray every 2-3 days until controlled"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Imidacloprid systemic insecticide",
-                        "effectiveness": "Very High",
-                        "application": "Apply to soil around plant base"
-                    }
-                ]
-            },
-            {
-                "name": "black spot",
-                "description": "Fungal disease causing black spots on leaves, common in roses",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Baking soda and oil spray",
-                        "effectiveness": "Medium",
-                        "application": "Spray weekly during growing season"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Tebuconazole fungicide",
-                        "effectiveness": "Very High",
-                        "application": "Apply every 14 days"
-                    }
-                ]
-            }
-        ]
-        
-        # Insert sample data
-        result = self.collection.insert_many(sample_diseases)
-        print(f"✅ Added {len(result.inserted_ids)} diseases to database")
-        
-        # Show what was added
-        for disease in sample_diseases:
-            print(f"  • {disease['name'].title()}")
+        # Swap in the versioned seed dataset; the old data stays readable until it is replaced
+        seed = apply_seed(self.collection, swap=True)
+        print(f"✅ Loaded seed v{seed['version']} with {seed['written']} diseases")
 
     def interactive_menu(self):
         """Interactive menu for MongoDB operations"""
@@ -14,3 +14,5 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plant_django.settings')
 
 application = get_asgi_application()
+
+# Set PLANTS_ASYNC_VIEWS=1 to serve the MongoDB-backed views without a thread per request
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -74,14 +75,62 @@ WSGI_APPLICATION = 'plant_django.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite is tuned for concurrent workers (env overrides in brackets):
+#   journal_mode=WAL      readers no longer block the writer [SQLITE_JOURNAL_MODE]
+#   synchronous=NORMAL    no fsync per commit; safe with WAL [SQLITE_SYNCHRONOUS]
+#   mmap_size             reads through a memory map [SQLITE_MMAP_SIZE, bytes]
+#   timeout               seconds to wait for the write lock before
+#                         "database is locked" [SQLITE_TIMEOUT]
+#   transaction_mode      IMMEDIATE takes the write lock at BEGIN, so a
+#                         transaction never fails upgrading a read lock
+#                         [SQLITE_TRANSACTION_MODE]
+#   CONN_MAX_AGE          reuse connections across requests [SQLITE_CONN_MAX_AGE];
+#                         0 by default under ASGI, where each request runs
+#                         its ORM calls on a different thread
+# Check a configuration with: manage.py test plants.tests.TrackingConcurrencyTests
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('SQLITE_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join([
+                f"PRAGMA journal_mode={os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')}",
+                f"PRAGMA synchronous={os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+                f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024))}",
+            ]),
+            'timeout': float(os.environ.get('SQLITE_TIMEOUT', 20)),
+            'transaction_mode': os.environ.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+        },
+        # A file rather than the in-memory default, so tests see the same locking as production
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
 
+# MongoDB (disease catalog), used through plants.mongo
+# https://pymongo.readthedocs.io/en/stable/api/pymongo/mongo_client.html
+
+MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost:27017/')
+MONGODB_DB_NAME = os.environ.get('MONGODB_DB_NAME', 'plant_diseases')
+MONGODB_MAX_POOL_SIZE = int(os.environ.get('MONGODB_MAX_POOL_SIZE', 50))
+MONGODB_MIN_POOL_SIZE = int(os.environ.get('MONGODB_MIN_POOL_SIZE', 0))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGODB_CONNECT_TIMEOUT_MS', 10000))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGODB_SOCKET_TIMEOUT_MS', 20000))
+
+# Serve /search/, /database/ and /add-disease/ with the async driver
+# (plants.async_views); only worthwhile under an ASGI server
+PLANTS_ASYNC_VIEWS = os.environ.get('PLANTS_ASYNC_VIEWS', '').lower() in ('1', 'true', 'yes')
+if PLANTS_ASYNC_VIEWS and 'SQLITE_CONN_MAX_AGE' not in os.environ:
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+# Where manage.py build_catalog_snapshot writes the search page's offline catalog
+CATALOG_SNAPSHOT_DIR = Path(os.environ.get('CATALOG_SNAPSHOT_DIR', BASE_DIR / 'catalog_snapshots'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -127,3 +176,62 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
+
+# Disease search response cache (plants.search_cache): 'local', 'django' or 'redis'
+SEARCH_CACHE_BACKEND = os.environ.get('SEARCH_CACHE_BACKEND', 'local')
+SEARCH_CACHE_TTL = 300          # seconds
+SEARCH_CACHE_MAX_ENTRIES = 1024
+# Seconds between checks of the catalog version, so each worker's in-memory
+# search index picks up writes made by other workers and CLI tools
+DISEASE_INDEX_VERSION_TTL = 2.0
+
+# User tracking write-behind buffer (plants.tracking)
+USER_TRACKING_FLUSH_INTERVAL = 10   # seconds between background flushes
+USER_TRACKING_FLUSH_THRESHOLD = 50  # pending events that trigger an early flush
+# Page-view classification (plants.pageviews); views marked with
+# @track_pageview / @no_tracking ignore these
+USER_TRACKING_SKIP_PREFIXES = ['/static/', '/media/', '/favicon.ico']
+USER_TRACKING_PAGE_PREFIXES = []  # e.g. ['/admin/'] to count admin pages
+# Where the current visit's tracking state is kept (plants.tracking_store):
+# 'cookie' (signed cookie) or 'memory' (per-process LRU), never the session
+USER_TRACKING_STORE = os.environ.get('USER_TRACKING_STORE', 'cookie')
+
+
+# Sessions and cache, by deployment profile (PLANTS_DEPLOYMENT_PROFILE)
+#   default          sessions in the database, local-memory cache
+#   high_concurrency cached_db sessions in the file cache, shared by all worker
+#                    processes: reads come from the cache, so only logins and
+#                    logouts touch SQLite
+#   stateless        signed-cookie sessions: no session storage at all
+# PLANTS_SESSION_ENGINE ('db', 'cached_db', 'cache', 'signed_cookies') and
+# PLANTS_CACHE_BACKEND ('locmem', 'file') override the profile's choice.
+# locmem is per process: with cached sessions, only use it for single-process
+# deployments, or a logout in one worker leaves the session cached in others.
+# Compare the options with: manage.py benchmark_sessions
+
+DEPLOYMENT_PROFILES = {
+    'default': {'sessions': 'db', 'cache': 'locmem'},
+    'high_concurrency': {'sessions': 'cached_db', 'cache': 'file'},
+    'stateless': {'sessions': 'signed_cookies', 'cache': 'locmem'},
+}
+DEPLOYMENT_PROFILE = os.environ.get('PLANTS_DEPLOYMENT_PROFILE', 'default')
+_profile = DEPLOYMENT_PROFILES[DEPLOYMENT_PROFILE]
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('PLANTS_SESSION_ENGINE', _profile['sessions'])
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'plant-django',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('PLANTS_CACHE_DIR', str(BASE_DIR / 'cache')),
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('PLANTS_CACHE_BACKEND', _profile['cache'])],
+}
+
+# Sessions are saved only when they change (i.e. on login/logout), not on every request
+SESSION_SAVE_EVERY_REQUEST = False
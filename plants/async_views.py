@@ -0,0 +1,221 @@
+"""
+Async versions of the MongoDB-backed views, for ASGI deployments.
+
+Enabled with ``PLANTS_ASYNC_VIEWS = True`` (see ``plants/urls.py``). They
+share the in-memory search index, response cache, helpers and templates with
+``plants.views`` but talk to MongoDB through the async driver, so a slow
+client or query waits on the event loop instead of holding a worker thread.
+Sync-only work (template context processors that touch the session or user,
+shared cache backends) runs through ``sync_to_async``.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.template.loader import get_template, render_to_string
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from functools import partial
+from pymongo.errors import PyMongoError
+import json
+import logging
+
+from . import views
+from .catalog import acatalog_write, aget_version, await_change, changes_since
+from .disease_index import VERSION_CHECK_TTL, normalize_name
+from .mongo import get_async_db
+from .pageviews import no_tracking, track_pageview
+from .search_cache import LocalCache
+from .search_engine import clamp_limit
+
+logger = logging.getLogger(__name__)
+
+arender = sync_to_async(render)
+arender_to_string = sync_to_async(render_to_string)
+
+
+async def _cached(method, *args):
+    """Call a search cache method, off the event loop unless the cache is in-process"""
+    if isinstance(views.search_cache.backend, LocalCache):
+        return method(*args)
+    return await sync_to_async(method)(*args)
+
+async def refresh_disease_index():
+    """Rebuild the shared disease index from MongoDB"""
+    adb = get_async_db()
+    try:
+        await views.disease_index.arefresh(adb.diseases, await aget_version(adb))
+        logger.info(f"📇 Disease index built with {len(views.disease_index)} diseases")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Failed to build disease index: {e}")
+        return False
+
+async def ensure_disease_index():
+    """Async ``plants.views.ensure_disease_index``"""
+    adb = get_async_db()
+    try:
+        await views.disease_index.aensure_current(
+            adb.diseases, lambda: aget_version(adb),
+            getattr(settings, 'DISEASE_INDEX_VERSION_TTL', VERSION_CHECK_TTL),
+        )
+        return True
+    except Exception as e:
+        logger.error(f"❌ Failed to build disease index: {e}")
+        return False
+
+async def catalog_changed():
+    """Refresh derived search state after any write to the diseases collection"""
+    await refresh_disease_index()
+    await _cached(views.search_cache.invalidate)
+
+async def _stream_database(request, context, cursor):
+    """Async ``plants.views._stream_database``"""
+    context.update({'streaming': True, 'cards_marker': views.DATABASE_CARDS_MARKER})
+    page = await arender_to_string('plants/database.html', context, request)
+    head, tail = page.split(views.DATABASE_CARDS_MARKER, 1)
+    card_template = get_template('plants/partials/disease_card.html')
+
+    async def render_cards():
+        yield head
+        chunk = []
+        try:
+            async for disease in cursor.batch_size(views.DATABASE_STREAM_CHUNK_SIZE):
+                chunk.append(card_template.render({'disease': views._disease_card(disease)}))
+                if len(chunk) >= views.DATABASE_STREAM_CHUNK_SIZE:
+                    yield ''.join(chunk)
+                    chunk = []
+        except Exception as e:
+            # Headers are already sent, so close the page instead of failing
+            logger.error(f"❌ Database stream interrupted: {e}")
+        if chunk:
+            yield ''.join(chunk)
+        yield tail
+
+    return StreamingHttpResponse(render_cards(), content_type='text/html; charset=utf-8')
+
+@track_pageview
+async def view_database(request):
+    """View MongoDB database content, one keyset page at a time"""
+    context = {
+        'diseases': [],
+        'total_diseases': 0,
+        'database_name': 'plant_diseases',
+        'collection_name': 'diseases'
+    }
+    try:
+        collection = get_async_db().diseases
+        context['total_diseases'] = await collection.estimated_document_count()
+
+        # Keyset pagination on (name, _id), fetching only the fields the page shows
+        page_cursor = request.GET.get('cursor')
+        cursor = collection.find(
+            views._decode_page_cursor(page_cursor),
+            views.DATABASE_CARD_PROJECTION
+        ).sort([('name', 1), ('_id', 1)])
+
+        if request.GET.get('stream'):
+            return await _stream_database(request, context, cursor)
+
+        page_size = getattr(settings, 'DATABASE_PAGE_SIZE', views.DATABASE_PAGE_SIZE)
+        diseases = [views._disease_card(disease) async for disease in cursor.limit(page_size + 1)]
+        if len(diseases) > page_size:
+            diseases = diseases[:page_size]
+            context['next_cursor'] = views._encode_page_cursor(diseases[-1])
+
+        context['diseases'] = diseases
+        context['is_paginated'] = bool(page_cursor)
+        return await arender(request, 'plants/database.html', context)
+
+    except PyMongoError as e:
+        context['error'] = f"Database connection failed: {e}"
+        return await arender(request, 'plants/database.html', context)
+    except Exception as e:
+        context['error'] = str(e)
+        return await arender(request, 'plants/database.html', context)
+
+@track_pageview
+async def add_disease_form(request):
+    """Display form to add new disease"""
+    if request.method == 'GET':
+        return await arender(request, 'plants/add_disease.html')
+
+    elif request.method == 'POST':
+        try:
+            disease_name = request.POST.get('disease_name', '').strip().lower()
+            description = request.POST.get('description', '').strip()
+
+            if not disease_name:
+                messages.error(request, 'Disease name is required')
+                return await arender(request, 'plants/add_disease.html')
+
+            adb = get_async_db()
+            collection = adb.diseases
+            if await collection.find_one({"name_key": normalize_name(disease_name)}, {"_id": 1}):
+                messages.error(request, f'Disease "{disease_name}" already exists')
+                return await arender(request, 'plants/add_disease.html')
+
+            disease_doc = views._disease_from_form(request.POST, disease_name, description)
+            async with acatalog_write(adb, disease_doc):
+                await collection.insert_one(disease_doc)
+            await catalog_changed()
+            messages.success(request, f'Disease "{disease_name}" added successfully!')
+            return redirect('plants:database')
+
+        except PyMongoError as e:
+            messages.error(request, f'Database connection failed: {str(e)}')
+            return await arender(request, 'plants/add_disease.html')
+        except Exception as e:
+            messages.error(request, f'Error adding disease: {str(e)}')
+            return await arender(request, 'plants/add_disease.html')
+
+@no_tracking
+@csrf_exempt
+@require_http_methods(["POST"])
+async def search_disease(request):
+    """Search for disease solutions"""
+    try:
+        data = json.loads(request.body)
+        disease_input = data.get('disease', '').lower()
+
+        if not disease_input:
+            return JsonResponse({"error": "Please enter a disease name"}, status=400)
+
+        # The index is checked here so the shared response builder never blocks on MongoDB
+        if not await ensure_disease_index():
+            return HttpResponse(views.SEARCH_DB_ERROR, status=500, content_type='application/json')
+
+        limit = clamp_limit(data.get('limit'))
+        status, body = await _cached(
+            partial(views.search_cache.get_or_compute, version=views.disease_index.version),
+            disease_input, lambda: views._search_response(disease_input, limit), limit
+        )
+        return HttpResponse(body, status=status, content_type='application/json')
+
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+@no_tracking
+@require_http_methods(["GET"])
+async def disease_changes(request):
+    """Async ``plants.views.disease_changes`` that honours ``wait=<seconds>``
+
+    The request waits on the event loop (a change stream, or polling on a
+    standalone server) until changes after ``since`` are visible or the
+    wait runs out, then returns whatever there is.
+    """
+    try:
+        since, limit, wait = views._changes_params(request)
+    except ValueError:
+        return JsonResponse({"error": views.CHANGES_PARAMS_ERROR}, status=400)
+
+    try:
+        if wait:
+            await await_change(get_async_db(), since, wait)
+        documents, tombstones, cursor, more = await sync_to_async(changes_since)(views.db, since, limit)
+    except PyMongoError as e:
+        return JsonResponse({"error": f"Database connection failed: {e}"}, status=500)
+    return views._changes_response(since, documents, tombstones, cursor, more)
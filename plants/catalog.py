@@ -0,0 +1,256 @@
+"""
+Version counter and change feed for the disease catalog.
+
+Each collection has a document in ``catalog_meta`` holding:
+
+    version   incremented once every write has landed; readers use it as a
+              cheap "has anything changed?" check (ETags, the in-memory
+              search index, the offline snapshot)
+    seq       the last ``updated_seq`` handed out
+    pending   sequence ranges (``first``, ``count``) reserved by writes
+              that have not finished
+
+Every write path wraps its write in ``catalog_write()``, which reserves the
+next ``seq`` values and stamps them on the documents as ``updated_seq`` with
+``updated_at``, then publishes the write (bumping ``version``) when the
+block exits. Deletions are recorded with ``record_deletions()`` as
+tombstones in ``catalog_tombstones``. Clients sync incrementally by asking
+for everything with ``updated_seq`` greater than the last cursor they saw
+(``changes_since()``); changes are only returned below the oldest write
+still in flight, so a cursor never skips a slower concurrent write.
+
+Documents written before the feed existed have no ``updated_seq``;
+``manage.py backfill_updated_seq`` stamps them.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+META_COLLECTION = 'catalog_meta'
+TOMBSTONE_COLLECTION = 'catalog_tombstones'
+# How often the polling fallback re-reads the catalog while waiting
+POLL_INTERVAL = 1.0
+# A reservation older than this belongs to a writer that died; it stops holding back the feed
+RESERVATION_TIMEOUT = 300  # seconds
+
+
+def get_version(db, name='diseases'):
+    """Return the current version of collection ``name`` (0 if never written)"""
+    meta = db[META_COLLECTION].find_one({'_id': name}, {'version': 1})
+    return meta.get('version', 0) if meta else 0
+
+
+async def aget_version(db, name='diseases'):
+    """``get_version()`` for an AsyncMongoClient database"""
+    meta = await db[META_COLLECTION].find_one({'_id': name}, {'version': 1})
+    return meta.get('version', 0) if meta else 0
+
+
+def _reserve_update(name, meta, count):
+    """Return ``(filter, update, entry)`` reserving ``count`` sequence numbers after ``meta``
+
+    The filter matches only while ``seq`` is still what was read, so the
+    first number recorded in the ``pending`` entry is exact.
+    """
+    seq = meta.get('seq') if meta else None
+    entry = {'token': ObjectId(), 'first': (seq or 0) + 1, 'count': count, 'at': datetime.now(timezone.utc)}
+    query = {'_id': name, 'seq': seq if seq is not None else {'$exists': False}}
+    return query, {'$inc': {'seq': count}, '$push': {'pending': entry}}, entry
+
+
+def _reserve(collection, name, count):
+    """Reserve ``count`` sequence numbers and return the ``pending`` entry recording them"""
+    while True:
+        meta = collection.find_one({'_id': name}, {'seq': 1})
+        query, update, entry = _reserve_update(name, meta, count)
+        try:
+            result = collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            # Another writer created the meta document first
+            continue
+        if result.matched_count or result.upserted_id is not None:
+            return entry
+
+
+async def _areserve(collection, name, count):
+    """``_reserve()`` for an AsyncMongoClient collection"""
+    while True:
+        meta = await collection.find_one({'_id': name}, {'seq': 1})
+        query, update, entry = _reserve_update(name, meta, count)
+        try:
+            result = await collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            continue
+        if result.matched_count or result.upserted_id is not None:
+            return entry
+
+
+def _apply_stamps(documents, first_seq):
+    now = datetime.now(timezone.utc)
+    for offset, document in enumerate(documents):
+        document['updated_seq'] = first_seq + offset
+        document['updated_at'] = now
+    return documents
+
+
+def _publish_update(token):
+    return {'$pull': {'pending': {'token': token}}, '$inc': {'version': 1}}
+
+
+@contextmanager
+def catalog_write(db, documents, name='diseases'):
+    """Stamp documents for a write, and publish the write when the block exits
+
+    Accepts one document or a list; the sequence numbers for a list are
+    reserved with a single update. The version is bumped after the block,
+    so readers never see a new version before the data it describes. The
+    write is published even if the block fails, to release its reservation.
+    """
+    batch = documents if isinstance(documents, list) else [documents]
+    if not batch:
+        yield documents
+        return
+    reservation = _reserve(db[META_COLLECTION], name, len(batch))
+    _apply_stamps(batch, reservation['first'])
+    try:
+        yield documents
+    finally:
+        db[META_COLLECTION].update_one({'_id': name}, _publish_update(reservation['token']))
+
+
+@asynccontextmanager
+async def acatalog_write(db, documents, name='diseases'):
+    """``catalog_write()`` for an AsyncMongoClient database"""
+    batch = documents if isinstance(documents, list) else [documents]
+    if not batch:
+        yield documents
+        return
+    reservation = await _areserve(db[META_COLLECTION], name, len(batch))
+    _apply_stamps(batch, reservation['first'])
+    try:
+        yield documents
+    finally:
+        await db[META_COLLECTION].update_one({'_id': name}, _publish_update(reservation['token']))
+
+
+def record_deletions(db, documents, name='diseases'):
+    """Record tombstones for deleted documents (each needs ``_id``; ``name`` is kept if present)"""
+    if not documents:
+        return
+    tombstones = [
+        {
+            'collection': name,
+            'document_id': document['_id'],
+            'name': document.get('name'),
+        }
+        for document in documents
+    ]
+    with catalog_write(db, tombstones, name):
+        for tombstone in tombstones:
+            tombstone['deleted_at'] = tombstone.pop('updated_at')
+        db[TOMBSTONE_COLLECTION].insert_many(tombstones)
+
+
+def visible_seq(meta):
+    """The highest ``updated_seq`` below every write still in flight"""
+    if not meta:
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=RESERVATION_TIMEOUT)
+    visible = meta.get('seq', 0)
+    for entry in meta.get('pending', []):
+        reserved_at = entry['at']
+        if reserved_at.tzinfo is None:
+            # PyMongo returns naive UTC datetimes unless tz_aware is set
+            reserved_at = reserved_at.replace(tzinfo=timezone.utc)
+        if reserved_at >= cutoff:
+            visible = min(visible, entry['first'] - 1)
+    return visible
+
+
+def changes_since(db, since, limit, name='diseases'):
+    """Return ``(documents, tombstones, cursor, more)`` for changes after sequence ``since``
+
+    At most ``limit`` changes are returned, in sequence order across both
+    kinds; ``cursor`` is the sequence to pass as ``since`` next time. Changes
+    at or above a write that is still in flight are held back until it lands.
+    """
+    visible = visible_seq(db[META_COLLECTION].find_one({'_id': name}, {'seq': 1, 'pending': 1}))
+    seq_filter = {'updated_seq': {'$gt': since, '$lte': visible}}
+    documents = list(db[name].find(seq_filter).sort('updated_seq', 1).limit(limit + 1))
+    tombstones = list(
+        db[TOMBSTONE_COLLECTION]
+        .find(dict(seq_filter, collection=name))
+        .sort('updated_seq', 1)
+        .limit(limit + 1)
+    )
+
+    merged = sorted(documents + tombstones, key=lambda change: change['updated_seq'])
+    more = len(merged) > limit
+    merged = merged[:limit]
+    cursor = merged[-1]['updated_seq'] if merged else since
+    return (
+        [change for change in merged if 'document_id' not in change],
+        [change for change in merged if 'document_id' in change],
+        cursor,
+        more,
+    )
+
+
+def ensure_sequence(db, name='diseases'):
+    """Raise ``seq`` above every ``updated_seq`` already stored, and return it
+
+    For catalogs whose meta document predates the separate ``seq`` counter.
+    """
+    highest = 0
+    for collection, query in ((db[name], {}), (db[TOMBSTONE_COLLECTION], {'collection': name})):
+        query = dict(query, updated_seq={'$type': 'number'})
+        latest = collection.find_one(query, {'updated_seq': 1}, sort=[('updated_seq', -1)])
+        if latest:
+            highest = max(highest, latest['updated_seq'])
+    meta = db[META_COLLECTION].find_one_and_update(
+        {'_id': name}, {'$max': {'seq': highest}}, upsert=True, return_document=ReturnDocument.AFTER,
+    )
+    return meta['seq']
+
+
+async def await_change(db, since, timeout, name='diseases'):
+    """Wait up to ``timeout`` seconds until changes after ``since`` are visible
+
+    For AsyncMongoClient databases (the async views), so a waiting client
+    holds no worker thread. Watches ``catalog_meta`` with a change stream
+    when the server supports them (replica sets, Atlas); a standalone
+    mongod rejects change streams, so it falls back to polling. Returns
+    whether anything changed.
+    """
+    deadline = time.monotonic() + timeout
+    meta = db[META_COLLECTION]
+
+    async def changed():
+        return visible_seq(await meta.find_one({'_id': name}, {'seq': 1, 'pending': 1})) > since
+
+    pipeline = [{'$match': {'documentKey._id': name}}]
+    try:
+        # Opened before the first check so a write in between is not missed
+        stream = await meta.watch(pipeline, max_await_time_ms=int(POLL_INTERVAL * 1000))
+        async with stream:
+            if await changed():
+                return True
+            while time.monotonic() < deadline:
+                if await stream.try_next() is not None and await changed():
+                    return True
+        return False
+    except OperationFailure:
+        pass
+
+    while True:
+        if await changed():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(POLL_INTERVAL, remaining))
@@ -0,0 +1,30 @@
+"""
+Settings lookup shared by modules that also run outside Django.
+
+The Flask apps and helper scripts import some ``plants`` modules without
+configuring Django, so settings are read from Django when it is configured,
+then from environment variables of the same name, then from a default.
+"""
+import os
+
+_MISSING = object()
+
+
+def get_setting(name, default):
+    """Return a setting from Django settings, the environment or ``default``"""
+    try:
+        from django.conf import settings
+        if settings.configured and hasattr(settings, name):
+            return getattr(settings, name)
+    except ImportError:
+        pass
+
+    value = os.environ.get(name, _MISSING)
+    if value is _MISSING:
+        return default
+    # Environment values are strings; convert them to the default's type
+    if isinstance(default, bool):
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    if default is not None:
+        return type(default)(value)
+    return value
@@ -0,0 +1,172 @@
+"""
+In-memory disease name index used by the search endpoints.
+
+The index is built from the MongoDB ``diseases`` collection once and then
+holds the normalized names, sorted, and their words, so the search engine
+(``plants.search_engine``) answers queries without a database round-trip. Write paths call ``refresh()`` so the index stays current in
+their own process; readers call ``ensure_current()``, which reloads the
+index when the catalog version (``plants.catalog``) has moved because of a
+write made by another worker or a command line tool.
+"""
+import bisect
+import re
+import threading
+import time
+import unicodedata
+
+# Fields needed to answer a search request
+INDEX_PROJECTION = {'name': 1, 'description': 1, 'solutions': 1}
+
+# Seconds between catalog version checks in ensure_current()
+VERSION_CHECK_TTL = 2.0
+
+_WHITESPACE = re.compile(r'\s+')
+_TOKEN = re.compile(r'\w+')
+
+
+def normalize_name(name):
+    """Return the lookup key for a disease name (case-folded, single-spaced)"""
+    name = unicodedata.normalize('NFKC', name or '')
+    return _WHITESPACE.sub(' ', name).strip().casefold()
+
+
+def with_name_key(document):
+    """Store the normalized name as ``name_key`` on a disease document before it is written
+
+    ``name_key`` carries a unique index, so exact lookups and duplicate
+    checks are indexed point reads: ``{"name_key": normalize_name(text)}``.
+    """
+    document['name_key'] = normalize_name(document.get('name'))
+    return document
+
+
+def _starting_with(sorted_values, prefix):
+    """Yield the values of a sorted list that start with ``prefix``"""
+    start = bisect.bisect_left(sorted_values, prefix)
+    for value in sorted_values[start:]:
+        if not value.startswith(prefix):
+            break
+        yield value
+
+
+class IndexState:
+    """Immutable snapshot of the index, swapped in as a single object"""
+
+    def __init__(self, docs=None):
+        docs = docs or {}
+        tokens = {}
+        for key in docs:
+            for token in _TOKEN.findall(key):
+                tokens.setdefault(token, []).append(key)
+        for token_keys in tokens.values():
+            token_keys.sort()
+
+        self.docs = docs
+        self.keys = sorted(docs)
+        self.tokens = tokens
+        self.token_list = sorted(tokens)
+
+
+class DiseaseIndex:
+    """Process-local index of disease documents keyed by normalized name"""
+
+    # Fields loaded from MongoDB
+    projection = INDEX_PROJECTION
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = self._build_state({})
+        self.loaded = False
+        # Catalog version the index was loaded at, and when it was last checked
+        self.version = None
+        self._checked = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def _build_state(self, docs):
+        """Return the lookup structures for ``docs`` (key -> document)"""
+        return IndexState(docs)
+
+    def build(self, documents):
+        """Replace the index contents with the given disease documents"""
+        docs = {}
+        for document in documents:
+            key = normalize_name(document.get('name'))
+            if key and key not in docs:
+                docs[key] = document
+        state = self._build_state(docs)
+
+        # Swap all structures at once so readers never see a partial index
+        with self._lock:
+            self._state = state
+            self.loaded = True
+
+    def load(self, collection):
+        """Build the index from a MongoDB collection"""
+        self.build(collection.find({}, self.projection))
+
+    def refresh(self, collection, version=None):
+        """Rebuild the index after the collection has been written to
+
+        ``version`` is the catalog version read *before* loading; a write
+        that lands during the load then still triggers the next reload.
+        """
+        self.load(collection)
+        self._mark_current(version)
+
+    def _mark_current(self, version):
+        self.version = version
+        self._checked = time.monotonic()
+
+    def _is_fresh(self, ttl):
+        return self.loaded and time.monotonic() - self._checked < ttl
+
+    def ensure_current(self, collection, get_version, ttl=VERSION_CHECK_TTL):
+        """Load the index, or reload it if ``get_version()`` changed since the last load
+
+        The version is read at most every ``ttl`` seconds. If it cannot be
+        read, a loaded index keeps being served; an unloaded one raises.
+        """
+        if self._is_fresh(ttl):
+            return
+        with self._refresh_lock:
+            if self._is_fresh(ttl):
+                return
+            try:
+                version = get_version()
+            except Exception:
+                if not self.loaded:
+                    raise
+                self._checked = time.monotonic()
+                return
+            if not self.loaded or version != self.version:
+                self.refresh(collection, version)
+            else:
+                self._checked = time.monotonic()
+
+    async def aload(self, collection):
+        """Build the index from an async (AsyncMongoClient) collection"""
+        self.build(await collection.find({}, self.projection).to_list())
+
+    async def arefresh(self, collection, version=None):
+        """Async ``refresh()``"""
+        await self.aload(collection)
+        self._mark_current(version)
+
+    async def aensure_current(self, collection, aget_version, ttl=VERSION_CHECK_TTL):
+        """Async ``ensure_current()``; ``aget_version`` is a coroutine function"""
+        if self._is_fresh(ttl):
+            return
+        try:
+            version = await aget_version()
+        except Exception:
+            if not self.loaded:
+                raise
+            self._checked = time.monotonic()
+            return
+        if not self.loaded or version != self.version:
+            await self.arefresh(collection, version)
+        else:
+            self._checked = time.monotonic()
+
+    def __len__(self):
+        return len(self._state.docs)
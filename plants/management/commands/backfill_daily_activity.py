@@ -0,0 +1,56 @@
+"""
+Rebuild the UserDailyActivity rollup from existing UserSession rows.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+from plants.models import UserDailyActivity, UserSession
+
+
+class Command(BaseCommand):
+    help = 'Backfill the per-user daily activity rollup from UserSession history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='Only backfill this user id')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per batch')
+
+    def handle(self, *args, **options):
+        sessions = UserSession.objects.all()
+        if options['user']:
+            sessions = sessions.filter(user_id=options['user'])
+
+        # One grouped query; every (user, day) bucket is computed by the database
+        buckets = (
+            sessions.annotate(date=TruncDate('session_start'))
+            .values('user_id', 'date')
+            .annotate(
+                session_count=Count('id'),
+                total_duration=Sum('duration'),
+                total_pages=Sum('pages_visited'),
+            )
+            .order_by('user_id', 'date')
+        )
+
+        rows = [
+            UserDailyActivity(
+                user_id=bucket['user_id'],
+                date=bucket['date'],
+                sessions=bucket['session_count'],
+                duration=bucket['total_duration'] or 0,
+                pages_visited=bucket['total_pages'] or 0,
+            )
+            for bucket in buckets.iterator()
+        ]
+
+        with transaction.atomic():
+            UserDailyActivity.objects.bulk_create(
+                rows,
+                batch_size=options['batch_size'],
+                update_conflicts=True,
+                unique_fields=['user', 'date'],
+                update_fields=['sessions', 'duration', 'pages_visited'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Backfilled {len(rows)} daily activity rows'))
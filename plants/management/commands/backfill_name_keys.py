@@ -0,0 +1,46 @@
+"""
+Set name_key on disease documents written before it existed.
+"""
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from plants.disease_index import normalize_name
+from plants.mongo import get_db
+
+
+class Command(BaseCommand):
+    help = 'Backfill the normalized name_key field on MongoDB diseases'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Documents updated per bulk write')
+
+    def handle(self, *args, **options):
+        collection = get_db()['diseases']
+        self.updated = 0
+        self.conflicts = []
+
+        # Also fixes keys left stale by tools that rename diseases without updating name_key
+        cursor = collection.find({'name': {'$type': 'string'}}, {'name': 1, 'name_key': 1})
+        operations = []
+        for document in cursor.batch_size(options['batch_size']):
+            name_key = normalize_name(document['name'])
+            if document.get('name_key') != name_key:
+                operations.append(UpdateOne({'_id': document['_id']}, {'$set': {'name_key': name_key}}))
+            if len(operations) >= options['batch_size']:
+                self.write(collection, operations)
+                operations = []
+        if operations:
+            self.write(collection, operations)
+
+        for error in self.conflicts:
+            self.stdout.write(self.style.WARNING(f"⚠️  Duplicate name, not keyed: {error['op']['q']['_id']}"))
+        self.stdout.write(self.style.SUCCESS(f'✅ Backfilled name_key on {self.updated} diseases'))
+
+    def write(self, collection, operations):
+        try:
+            self.updated += collection.bulk_write(operations, ordered=False).modified_count
+        except BulkWriteError as e:
+            # Two documents normalizing to the same name violate the unique index; report them
+            self.updated += e.details.get('nModified', 0)
+            self.conflicts.extend(e.details.get('writeErrors', []))
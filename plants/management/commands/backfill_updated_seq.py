@@ -0,0 +1,44 @@
+"""
+Stamp updated_seq on disease documents written before the change feed existed.
+
+Without it they never appear in /api/diseases/changes/, so a client syncing
+from ``since=0`` would miss them. Also moves the catalog's sequence counter
+past every ``updated_seq`` already stored.
+"""
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from plants.catalog import catalog_write, ensure_sequence
+from plants.mongo import get_db
+
+
+class Command(BaseCommand):
+    help = 'Backfill updated_seq on MongoDB diseases so the change feed includes them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Documents updated per bulk write')
+
+    def handle(self, *args, **options):
+        db = get_db()
+        collection = db['diseases']
+        seq = ensure_sequence(db)
+        self.stdout.write(f'Catalog sequence at {seq}')
+
+        updated = 0
+        unstamped = {'updated_seq': {'$exists': False}}
+        while True:
+            batch = list(collection.find(unstamped, {'_id': 1}).limit(options['batch_size']))
+            if not batch:
+                break
+            with catalog_write(db, batch):
+                # The filter skips documents a concurrent write has stamped meanwhile
+                operations = [
+                    UpdateOne(
+                        {'_id': document['_id'], **unstamped},
+                        {'$set': {'updated_seq': document['updated_seq'], 'updated_at': document['updated_at']}},
+                    )
+                    for document in batch
+                ]
+                updated += collection.bulk_write(operations, ordered=False).modified_count
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Backfilled updated_seq on {updated} diseases'))
@@ -0,0 +1,87 @@
+"""
+Measure authenticated requests/sec under each session engine.
+
+Runs logged-in GET requests through the full middleware stack, from several
+threads at once, once per session engine, and prints the throughput of each
+so a deployment profile can be chosen on numbers (see DEPLOYMENT_PROFILES in
+settings). Uses the configured database with a throwaway user created under
+a fresh random name, so no existing account is touched; it is removed
+afterwards.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from plants.tracking import buffer
+
+ENGINES = ['db', 'cached_db', 'signed_cookies']
+USERNAME_PREFIX = 'benchmark_sessions_'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark authenticated requests/sec for each session engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engines', nargs='+', default=ENGINES, choices=['db', 'cached_db', 'cache', 'signed_cookies'])
+        parser.add_argument('--path', default='/', help='Page to request (default /)')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per thread')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent clients')
+
+    def handle(self, *args, **options):
+        # create_user fails rather than reuse an account if the name were ever taken
+        user = User.objects.create_user(f'{USERNAME_PREFIX}{uuid.uuid4().hex}')
+        results = []
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for engine in options['engines']:
+                    rate = self.run_engine(engine, user, options)
+                    results.append((engine, rate))
+                    self.stdout.write(f'{engine:>15}: {rate:8.1f} req/s')
+        finally:
+            # Tracking deltas reference the user, so write them before it goes
+            buffer.flush()
+            user.delete()
+
+        baseline = results[0][1]
+        self.stdout.write('')
+        for engine, rate in results:
+            self.stdout.write(f'{engine:>15}: {rate / baseline:5.2f}x {results[0][0]}')
+
+    def run_engine(self, engine, user, options):
+        """Return requests/sec for one session engine"""
+        with override_settings(SESSION_ENGINE=f'django.contrib.sessions.backends.{engine}'):
+            # Each client builds its own handler, so it picks up the engine
+            clients = []
+            for _ in range(options['threads']):
+                client = Client()
+                client.force_login(user)
+                clients.append(client)
+
+            errors = []
+            start_barrier = threading.Barrier(len(clients) + 1)
+
+            def worker(client):
+                start_barrier.wait()
+                for _ in range(options['requests']):
+                    response = client.get(options['path'])
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+                        return
+
+            threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+            for thread in threads:
+                thread.start()
+            start_barrier.wait()
+            started = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+        if errors:
+            raise CommandError(f'{engine}: {options["path"]} returned HTTP {errors[0]}')
+        return options['threads'] * options['requests'] / elapsed
@@ -0,0 +1,34 @@
+"""
+Build the compact catalog snapshot served to the search page (plants.snapshot).
+"""
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from plants.catalog import get_version
+from plants.mongo import get_db
+from plants.snapshot import current_snapshot, write_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Compile the diseases collection into a hashed, gzip-compressed JSON snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-changed', action='store_true',
+            help='Skip the build when the catalog version matches the current snapshot',
+        )
+
+    def handle(self, *args, **options):
+        db = get_db()
+        try:
+            current = current_snapshot()
+            if options['if_changed'] and current and current.get('catalog_version') == get_version(db):
+                self.stdout.write(f"✅ Snapshot {current['file']} is up to date (catalog v{current['catalog_version']})")
+                return
+            manifest = write_snapshot(db)
+        except PyMongoError as e:
+            raise CommandError(f'Database error: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Built {manifest['file']} ({manifest['size']} bytes, catalog v{manifest['catalog_version']})"
+        ))
@@ -0,0 +1,34 @@
+"""
+Create the MongoDB indexes declared in plants.mongo_indexes.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from plants.mongo import get_db
+from plants.mongo_indexes import ensure_indexes
+
+
+class Command(BaseCommand):
+    help = 'Diff the MongoDB index registry against the live indexes and build missing ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+        parser.add_argument('--drop-unknown', action='store_true', help='Drop live indexes that are not in the registry')
+
+    def handle(self, *args, **options):
+        actions = ensure_indexes(get_db(), dry_run=options['dry_run'], drop_unknown=options['drop_unknown'])
+
+        icons = {
+            'ok': '✅', 'create': '➕', 'created': '➕', 'differs': '⚠️ ',
+            'unknown': '❔', 'dropped': '🗑️ ', 'failed': '❌',
+        }
+        for action in actions:
+            line = f'{icons[action.action]} {action.collection}.{action.name}: {action.action}'
+            if action.detail:
+                line += f' ({action.detail})'
+            self.stdout.write(line)
+
+        failed = [action for action in actions if action.action == 'failed']
+        if failed:
+            raise CommandError(f'{len(failed)} index build(s) failed')
+        built = sum(action.action == 'created' for action in actions)
+        self.stdout.write(self.style.SUCCESS(f'✅ Indexes checked, {built} built'))
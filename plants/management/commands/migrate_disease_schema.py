@@ -0,0 +1,54 @@
+"""
+Migrate old-schema disease documents in MongoDB to the current schema.
+"""
+from django.core.management.base import BaseCommand
+
+from plants.mongo import get_db
+from plants.schema_migration import (
+    DEFAULT_BATCH_SIZE, OLD_SCHEMA_FILTER, clear_checkpoint, get_checkpoint, get_failed_ids, run_migration,
+)
+
+
+class Command(BaseCommand):
+    help = 'Convert old-schema diseases in batches, resuming from the last checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Documents per bulk write')
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start from the beginning')
+
+    def handle(self, *args, **options):
+        db = get_db()
+        collection = db['diseases']
+        if options['restart']:
+            clear_checkpoint(db)
+
+        remaining = collection.count_documents(OLD_SCHEMA_FILTER)
+        self.stdout.write(f'🔄 {remaining} old-schema diseases to migrate')
+        checkpoint = get_checkpoint(db)
+        if checkpoint is not None:
+            self.stdout.write(f'↪️  Resuming after _id {checkpoint}')
+        retry = get_failed_ids(db)
+        if retry:
+            self.stdout.write(f'🔁 Retrying {len(retry)} diseases earlier runs could not migrate')
+
+        def report(progress):
+            self.stdout.write(
+                f'  batch {progress.batches}: {progress.scanned}/{remaining} scanned, '
+                f'{progress.migrated} migrated, {progress.merged} merged, {progress.failed} failed '
+                f'({progress.rate:.0f} docs/s)'
+            )
+
+        # Migrated documents are stamped, so the web workers' search index and
+        # response cache pick them up from the catalog version
+        progress = run_migration(collection, batch_size=options['batch_size'], on_batch=report)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Migrated {progress.migrated} diseases in {progress.elapsed:.1f}s '
+            f'({progress.rate:.0f} docs/s, {progress.merged} merged into existing diseases)'
+        ))
+        failed = get_failed_ids(db)
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  {len(failed)} diseases could not be migrated; they are retried on the next run: '
+                + ', '.join(str(_id) for _id in failed[:10])
+            ))
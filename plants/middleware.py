@@ -1,115 +1,131 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.utils import timezone
 from django.contrib.auth.models import User
-from .models import UserProfile, UserSession
+from .models import UserSession
+from .pageviews import is_page_view
+from .tracking import buffer
+from .tracking_store import get_tracking_store
 import time
 
+# Time differences above this are treated as idle and not added to time spent
+MAX_ACTIVE_GAP = 300  # seconds
+
 class UserTrackingMiddleware:
     """
-    Middleware to track user visits and time spent on the website
+    Middleware to track user visits and time spent on the website.
+
+    Only page views are tracked (see plants.pageviews): the decision is
+    made in process_view, so API and AJAX requests never touch the
+    tracking state or the session.
+
+    The state of the current visit lives in a tracking store (a signed
+    cookie or a process-local LRU, see plants.tracking_store), not in
+    request.session, so page views don't rewrite the session.
+
+    Only a new visit writes to the database directly (to create its
+    UserSession row); page counts and durations are handed to the
+    write-behind buffer in plants.tracking and flushed in batches.
+
+    Runs natively in both sync and async (ASGI) stacks; under ASGI the
+    session and ORM work runs in a thread (Django adapts process_view, and
+    process_response goes through sync_to_async).
     """
-    
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.store = get_tracking_store()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        # Process request before view
-        if request.user.is_authenticated:
-            self.process_request(request)
-        
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
         response = self.get_response(request)
-        
-        # Process response after view
-        if request.user.is_authenticated:
-            self.process_response(request, response)
-        
+
+        # Set by process_view for tracked page views only
+        user = getattr(request, '_tracking_user', None)
+        if user is not None:
+            self.process_response(request, response, user)
+
         return response
 
-    def process_request(self, request):
+    async def __acall__(self, request):
+        """Async request path: tracking I/O runs in a thread, off the event loop"""
+        response = await self.get_response(request)
+
+        user = getattr(request, '_tracking_user', None)
+        if user is not None:
+            await sync_to_async(self.process_response)(request, response, user)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Track the visit if the resolved view is a page view"""
+        if not is_page_view(request, view_func):
+            return None
+        user = request.user
+        if user.is_authenticated:
+            request._tracking_user = user
+            self.process_request(request, user)
+        return None
+
+    def process_request(self, request, user):
         """Track session start and page visits"""
         try:
-            # Get or create user profile
-            profile, created = UserProfile.objects.get_or_create(
-                user=request.user,
-                defaults={
-                    'total_visits': 0,
-                    'total_time_spent': 0,
-                    'last_visit': timezone.now()
-                }
-            )
-            
-            # Check if this is a new session (no session or session expired)
-            session_key = f"user_session_{request.user.id}"
-            
-            if session_key not in request.session:
-                # New session - increment visit count
-                profile.total_visits += 1
-                profile.last_visit = timezone.now()
-                profile.save()
-                
-                # Create new session record
+            # Check if this is a new visit (no state or it belongs to another login session)
+            session_data = self.store.load(request, user)
+
+            if session_data is None:
+                # New session - count the visit and create its session record
+                buffer.record_visit(user.id)
                 user_session = UserSession.objects.create(
-                    user=request.user,
+                    user=user,
                     session_start=timezone.now(),
                     pages_visited=1
                 )
                 
-                # Store session info
-                request.session[session_key] = {
+                # Visit state, saved to the store with the response
+                request._tracking_state = {
                     'session_id': user_session.id,
                     'start_time': time.time(),
                     'last_activity': time.time(),
-                    'pages_visited': 1
+                    'pages_visited': 1,
+                    'recorded_duration': 0
                 }
             else:
-                # Existing session - update page count
-                session_data = request.session[session_key]
+                # Existing visit - update page count
                 session_data['pages_visited'] += 1
                 session_data['last_activity'] = time.time()
-                request.session[session_key] = session_data
-                
-                # Update session record
-                try:
-                    user_session = UserSession.objects.get(id=session_data['session_id'])
-                    user_session.pages_visited = session_data['pages_visited']
-                    user_session.save()
-                except UserSession.DoesNotExist:
-                    pass
+                request._tracking_state = session_data
+                buffer.record_page_view(session_data['session_id'], user.id)
                     
         except Exception as e:
             # Log error but don't break the request
             print(f"UserTrackingMiddleware error in process_request: {e}")
 
-    def process_response(self, request, response):
+    def process_response(self, request, response, user):
         """Update session duration"""
         try:
-            session_key = f"user_session_{request.user.id}"
-            
-            if session_key in request.session:
-                session_data = request.session[session_key]
+            session_data = getattr(request, '_tracking_state', None)
+
+            if session_data is not None:
                 current_time = time.time()
                 
-                # Calculate session duration
+                # Calculate session duration and the time added since the last request
                 session_duration = int(current_time - session_data['start_time'])
-                
-                # Update session record
-                try:
-                    user_session = UserSession.objects.get(id=session_data['session_id'])
-                    user_session.duration = session_duration
-                    user_session.save()
-                    
-                    # Update user profile total time
-                    profile = UserProfile.objects.get(user=request.user)
-                    # Calculate the difference from last recorded session duration
-                    last_recorded_duration = getattr(user_session, '_last_duration', 0)
-                    time_diff = session_duration - last_recorded_duration
-
-                    if time_diff > 0 and time_diff < 300:  # Only add reasonable time differences (less than 5 minutes)
-                        profile.total_time_spent += time_diff
-                        profile.save()
-                        user_session._last_duration = session_duration
-                            
-                except (UserSession.DoesNotExist, UserProfile.DoesNotExist):
-                    pass
+                time_diff = session_duration - session_data.get('recorded_duration', 0)
+                if time_diff > 0:
+                    # Only add reasonable time differences (less than 5 minutes)
+                    time_spent = time_diff if time_diff < MAX_ACTIVE_GAP else 0
+                    buffer.record_duration(
+                        session_data['session_id'], user.id, session_duration, time_diff, time_spent
+                    )
+                    session_data['recorded_duration'] = session_duration
+
+                self.store.save(request, response, user, session_data)
                     
         except Exception as e:
             # Log error but don't break the response
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:04
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_total_session_duration(apps, schema_editor):
+    """Start every profile's total from the sessions already recorded"""
+    UserProfile = apps.get_model('plants', 'UserProfile')
+    UserSession = apps.get_model('plants', 'UserSession')
+    totals = (
+        UserSession.objects.filter(user_id=OuterRef('user_id'))
+        .values('user_id')
+        .annotate(total=Sum('duration'))
+        .values('total')
+    )
+    UserProfile.objects.update(total_session_duration=Coalesce(Subquery(totals), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plants', '0003_userdailyactivity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='total_session_duration',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_total_session_duration, migrations.RunPython.noop),
+    ]
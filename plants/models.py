@@ -18,6 +18,7 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     total_visits = models.IntegerField(default=0)
     total_time_spent = models.IntegerField(default=0)  # in seconds
+    total_session_duration = models.IntegerField(default=0)  # sum of UserSession durations, in seconds
     last_visit = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -46,3 +47,18 @@ class UserSession(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.session_start.strftime('%Y-%m-%d %H:%M')}"
+
+class UserDailyActivity(models.Model):
+    """Per-user, per-day rollup of UserSession activity for the profile page"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    sessions = models.IntegerField(default=0)
+    duration = models.IntegerField(default=0)  # in seconds
+    pages_visited = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'date')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date}"
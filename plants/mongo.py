@@ -0,0 +1,197 @@
+"""
+Shared MongoDB connection provider.
+
+Every entry point (Django views, the root Flask app, ``simple_plant_app`` and
+the helper scripts) gets its client from here instead of building its own
+``MongoClient`` at import time. Clients are created lazily with
+``connect=False``, so importing a module never blocks on MongoDB; the
+driver's background monitor opens the pool on first use and reconnects on
+its own when the server comes back.
+
+Configuration is read through ``plants.conf``: Django settings when Django
+is configured, then environment variables, then the defaults below.
+
+Liveness is tracked from the driver's own server monitoring events (see
+``ConnectionHealth``), so callers can check health without sending a ping.
+
+Async views use ``get_async_client()``/``get_async_db()`` instead, which
+return ``AsyncMongoClient`` instances with the same settings.
+"""
+import asyncio
+import threading
+import time
+import weakref
+
+from pymongo import MongoClient, monitoring
+from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+
+from . import conf
+
+DEFAULTS = {
+    'MONGODB_URI': 'mongodb://localhost:27017/',
+    'MONGODB_DB_NAME': 'plant_diseases',
+    'MONGODB_MAX_POOL_SIZE': 50,
+    'MONGODB_MIN_POOL_SIZE': 0,
+    'MONGODB_SERVER_SELECTION_TIMEOUT_MS': 5000,
+    'MONGODB_CONNECT_TIMEOUT_MS': 10000,
+    'MONGODB_SOCKET_TIMEOUT_MS': 20000,
+    # How long a heartbeat result is trusted before health is re-checked
+    'MONGODB_HEALTH_TTL_SECONDS': 30,
+}
+
+_clients = {}
+_health = {}
+_lock = threading.Lock()
+# event loop -> {uri: AsyncMongoClient}; async clients cannot be shared across loops
+_async_clients = weakref.WeakKeyDictionary()
+
+
+class ConnectionHealth(monitoring.ServerHeartbeatListener, monitoring.TopologyListener):
+    """Tracks server liveness from the driver's heartbeat and topology events"""
+
+    def __init__(self):
+        self.alive = None
+        self.checked_at = 0.0
+
+    def record(self, alive):
+        """Store the latest liveness result"""
+        self.alive = alive
+        self.checked_at = time.monotonic()
+
+    def status(self, ttl):
+        """Return True/False from a recent event, or None when nothing recent was seen"""
+        if self.alive is None or time.monotonic() - self.checked_at > ttl:
+            return None
+        return self.alive
+
+    # Heartbeats run on the driver's monitor thread, so recording them is free
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.record(True)
+
+    def failed(self, event):
+        self.record(False)
+
+    # Topology events also report servers lost or found between heartbeats
+    def opened(self, event):
+        pass
+
+    def description_changed(self, event):
+        description = event.new_description
+        if description.has_known_servers:
+            self.record(description.has_readable_server())
+
+    def closed(self, event):
+        self.record(False)
+
+
+def get_setting(name):
+    """Return a MongoDB setting from Django settings, the environment or the defaults"""
+    return conf.get_setting(name, DEFAULTS[name])
+
+
+def _client_options():
+    return {
+        'maxPoolSize': get_setting('MONGODB_MAX_POOL_SIZE'),
+        'minPoolSize': get_setting('MONGODB_MIN_POOL_SIZE'),
+        'serverSelectionTimeoutMS': get_setting('MONGODB_SERVER_SELECTION_TIMEOUT_MS'),
+        'connectTimeoutMS': get_setting('MONGODB_CONNECT_TIMEOUT_MS'),
+        'socketTimeoutMS': get_setting('MONGODB_SOCKET_TIMEOUT_MS'),
+    }
+
+
+def get_client(uri=None):
+    """Return the shared client for ``uri`` (default: MONGODB_URI), creating it on first use"""
+    uri = uri or get_setting('MONGODB_URI')
+    client = _clients.get(uri)
+    if client is None:
+        with _lock:
+            client = _clients.get(uri)
+            if client is None:
+                health = ConnectionHealth()
+                client = MongoClient(uri, connect=False, event_listeners=[health], **_client_options())
+                _health[uri] = health
+                _clients[uri] = client
+    return client
+
+
+def get_db(name=None, uri=None):
+    """Return a database handle from the shared client (no I/O until first use)"""
+    return get_client(uri)[name or get_setting('MONGODB_DB_NAME')]
+
+
+def get_async_client(uri=None):
+    """Return the AsyncMongoClient for ``uri`` owned by the running event loop
+
+    Must be called from a coroutine. Under ASGI there is one loop per
+    process, so this is one pooled client per process as well. Needs
+    PyMongo 4.9+; imported here so the sync apps still run on older pins.
+    """
+    from pymongo import AsyncMongoClient
+
+    uri = uri or get_setting('MONGODB_URI')
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(uri)
+    if client is None:
+        client = clients[uri] = AsyncMongoClient(uri, connect=False, **_client_options())
+    return client
+
+
+def get_async_db(name=None, uri=None):
+    """Async ``get_db()``: a database handle on the running loop's client"""
+    return get_async_client(uri)[name or get_setting('MONGODB_DB_NAME')]
+
+
+def ping(uri=None):
+    """Check the server is reachable; for diagnostics and startup scripts, not request paths"""
+    get_client(uri).admin.command('ping')
+    return True
+
+
+def is_connected(uri=None):
+    """Return whether MongoDB is reachable, pinging only when no recent heartbeat is known"""
+    uri = uri or get_setting('MONGODB_URI')
+    get_client(uri)
+    health = _health[uri]
+
+    status = health.status(get_setting('MONGODB_HEALTH_TTL_SECONDS'))
+    if status is not None:
+        return status
+
+    try:
+        ping(uri)
+        health.record(True)
+    except Exception:
+        health.record(False)
+    return health.alive
+
+
+def with_retry(operation, retries=1):
+    """Run ``operation()``, retrying only when the connection itself failed"""
+    for attempt in range(retries + 1):
+        try:
+            return operation()
+        except ServerSelectionTimeoutError:
+            # No server was reachable for the whole timeout; retrying only doubles the wait
+            raise
+        except ConnectionFailure:
+            if attempt == retries:
+                raise
+
+
+def close_clients():
+    """Close every shared client, e.g. in a worker after fork or at shutdown"""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _health.clear()
+
+
+async def close_async_clients():
+    """Close the running event loop's async clients, e.g. on ASGI shutdown"""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
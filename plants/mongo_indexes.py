@@ -0,0 +1,135 @@
+"""
+Declarative registry of the MongoDB indexes the apps rely on.
+
+``INDEXES`` maps each collection to the indexes its queries need.
+``ensure_indexes()`` (run by ``manage.py ensure_indexes`` at deploy time)
+compares the registry with the live indexes and builds the missing ones;
+indexes whose definition changed or that are not in the registry are only
+reported unless asked to drop them, since rebuilding a large index is
+something to schedule, not to do implicitly.
+"""
+from collections import namedtuple
+
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import PyMongoError
+
+# Options compared against the live index; anything else (v, ns,
+# background, textIndexVersion...) is build metadata
+COMPARED_OPTIONS = ('unique', 'sparse', 'partialFilterExpression', 'collation', 'expireAfterSeconds')
+
+
+class IndexSpec:
+    """One index: its name, key pattern and creation options"""
+
+    def __init__(self, name, keys, **options):
+        self.name = name
+        self.keys = keys
+        self.options = options
+
+    @property
+    def is_text(self):
+        return any(direction == TEXT for _, direction in self.keys)
+
+    def live_key(self):
+        """The key document the server reports for this index"""
+        if self.is_text:
+            # Text fields are stored as _fts/_ftsx plus per-field weights
+            return {'_fts': 'text', '_ftsx': 1}
+        return dict(self.keys)
+
+    def differences(self, live):
+        """Return how the live index ``live`` (from list_indexes) differs from this spec"""
+        changes = []
+        if dict(live['key']) != self.live_key():
+            changes.append(f"key {dict(live['key'])} != {self.live_key()}")
+        if self.is_text:
+            weights = {field: self.options.get('weights', {}).get(field, 1) for field, _ in self.keys}
+            if dict(live.get('weights', {})) != weights:
+                changes.append(f"weights {dict(live.get('weights', {}))} != {weights}")
+        for option in COMPARED_OPTIONS:
+            expected = self.options.get(option)
+            actual = live.get(option)
+            if option == 'collation' and expected and actual:
+                # The server expands collations with defaults; compare what we set
+                actual = {k: actual.get(k) for k in expected}
+            if option == 'unique':
+                expected, actual = bool(expected), bool(actual)
+            if expected != actual:
+                changes.append(f'{option} {actual!r} != {expected!r}')
+        return changes
+
+    def create(self, collection):
+        # Builds no longer block the collection on MongoDB >= 4.2; older servers need background
+        collection.create_index(self.keys, name=self.name, background=True, **self.options)
+
+
+INDEXES = {
+    'diseases': [
+        # Exact lookups and duplicate checks on the normalized name (see with_name_key).
+        # Partial so documents not yet backfilled don't collide on a missing key.
+        IndexSpec(
+            'name_key_unique', [('name_key', ASCENDING)],
+            unique=True, partialFilterExpression={'name_key': {'$type': 'string'}},
+        ),
+        # /database/ keyset pagination and the unknown-name cleanup queries
+        IndexSpec('name_id', [('name', ASCENDING), ('_id', ASCENDING)]),
+        IndexSpec(
+            'disease_text', [('name', TEXT), ('description', TEXT)],
+            weights={'name': 10, 'description': 1},
+        ),
+        IndexSpec(
+            'added_manually', [('added_date', DESCENDING)],
+            partialFilterExpression={'added_manually': True},
+        ),
+        IndexSpec(
+            'migrated_from_old_schema', [('migration_date', DESCENDING)],
+            partialFilterExpression={'migrated_from_old_schema': True},
+        ),
+        # Change feed (plants.catalog.changes_since)
+        IndexSpec('updated_seq', [('updated_seq', ASCENDING)]),
+    ],
+    'catalog_tombstones': [
+        IndexSpec('collection_updated_seq', [('collection', ASCENDING), ('updated_seq', ASCENDING)]),
+    ],
+}
+
+IndexAction = namedtuple('IndexAction', 'collection name action detail')
+
+
+def ensure_indexes(db, registry=INDEXES, dry_run=False, drop_unknown=False):
+    """Create the registry's missing indexes on ``db`` and report every index
+
+    Returns a list of IndexAction whose ``action`` is one of 'ok',
+    'create', 'created', 'differs', 'unknown', 'dropped' or 'failed'
+    ('create' is what a dry run would do).
+    """
+    actions = []
+    for collection_name, specs in registry.items():
+        collection = db[collection_name]
+        live = {index['name']: index for index in collection.list_indexes()}
+
+        for spec in specs:
+            if spec.name in live:
+                changes = spec.differences(live[spec.name])
+                if changes:
+                    actions.append(IndexAction(collection_name, spec.name, 'differs', '; '.join(changes)))
+                else:
+                    actions.append(IndexAction(collection_name, spec.name, 'ok', ''))
+                continue
+            if dry_run:
+                actions.append(IndexAction(collection_name, spec.name, 'create', ''))
+                continue
+            try:
+                spec.create(collection)
+                actions.append(IndexAction(collection_name, spec.name, 'created', ''))
+            except PyMongoError as e:
+                actions.append(IndexAction(collection_name, spec.name, 'failed', str(e)))
+
+        known = {spec.name for spec in specs} | {'_id_'}
+        for name in sorted(live.keys() - known):
+            if drop_unknown and not dry_run:
+                collection.drop_index(name)
+                actions.append(IndexAction(collection_name, name, 'dropped', ''))
+            else:
+                actions.append(IndexAction(collection_name, name, 'unknown', ''))
+    return actions
@@ -0,0 +1,42 @@
+"""
+Which requests UserTrackingMiddleware counts as page views.
+
+Only full page renders are tracked; JSON endpoints, static files and other
+API calls skip all tracking work, including the session write. A view is
+classified, in order, by:
+
+1. its decorator: ``@track_pageview`` or ``@no_tracking``;
+2. ``USER_TRACKING_SKIP_PREFIXES``: paths that are never tracked;
+3. ``USER_TRACKING_PAGE_PREFIXES``: paths tracked although their views
+   are not decorated (e.g. ``'/admin/'``).
+
+Anything else is not tracked.
+"""
+from django.conf import settings
+
+DEFAULT_SKIP_PREFIXES = ('/static/', '/media/', '/favicon.ico')
+DEFAULT_PAGE_PREFIXES = ()
+
+
+def track_pageview(view_func):
+    """Mark a view as a page render that counts as a visit"""
+    view_func.track_pageview = True
+    return view_func
+
+
+def no_tracking(view_func):
+    """Mark a view (API, AJAX, health check...) as never tracked"""
+    view_func.track_pageview = False
+    return view_func
+
+
+def is_page_view(request, view_func):
+    """Return whether the request for ``view_func`` should be tracked"""
+    marked = getattr(view_func, 'track_pageview', None)
+    if marked is not None:
+        return marked
+
+    path = request.path_info
+    if path.startswith(tuple(getattr(settings, 'USER_TRACKING_SKIP_PREFIXES', DEFAULT_SKIP_PREFIXES))):
+        return False
+    return path.startswith(tuple(getattr(settings, 'USER_TRACKING_PAGE_PREFIXES', DEFAULT_PAGE_PREFIXES)))
@@ -0,0 +1,308 @@
+"""
+Old-schema to new-schema migration for the ``diseases`` collection.
+
+Old documents look like ``{disease_name, recommended_treatment, fertilisers,
+pesticides}``; the app reads ``{name, description, solutions}``.
+``convert_old_disease()`` holds the conversion, shared by the
+``migrate_disease_data.py`` script and the ``migrate_disease_schema``
+management command.
+
+``run_migration()`` walks the old documents in ``_id`` order, one keyset
+batch at a time, and replaces each batch with one unordered ``bulk_write``.
+After every batch the last ``_id`` is checkpointed in the
+``migration_checkpoints`` collection, so an interrupted run resumes where it
+stopped instead of starting over.
+
+An old document whose disease already exists in the new schema (typically
+one the seed loaded) is merged into it: its solutions are added to the
+existing disease and the old document is removed. Documents that still fail
+are recorded in the checkpoint's ``failed_ids`` and retried by the next run.
+"""
+import time
+from datetime import datetime
+
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from .catalog import catalog_write, record_deletions
+from .disease_index import with_name_key
+
+MIGRATION_NAME = 'disease_schema_v2'
+CHECKPOINT_COLLECTION = 'migration_checkpoints'
+DEFAULT_BATCH_SIZE = 1000
+DUPLICATE_KEY = 11000
+
+# Documents still in the old schema
+OLD_SCHEMA_FILTER = {
+    "disease_name": {"$exists": True},
+    "name": {"$exists": False}
+}
+
+# Descriptions for well known diseases; others get a generic one
+DESCRIPTIONS = {
+    'anthracnose': 'A fungal disease causing dark, sunken lesions on fruits, leaves, and stems',
+    'downy mildew': 'A fungal disease causing yellow spots on upper leaf surfaces with fuzzy growth underneath',
+    'bacterial wilt': 'A bacterial disease causing sudden wilting and death of plants',
+    'early blight': 'A fungal disease causing brown spots with concentric rings on leaves',
+    'late blight': 'A devastating fungal disease causing dark, water-soaked lesions on leaves and fruits',
+    'black rot': 'A fungal disease causing black, circular lesions on leaves and fruits',
+    'root rot': 'A fungal disease affecting plant roots, causing yellowing and wilting',
+    'sooty mold': 'A fungal disease causing black, sooty coating on leaves and stems',
+    'canker': 'A fungal disease causing sunken, dead areas on stems and branches',
+    'mosaic virus': 'A viral disease causing mottled yellow and green patterns on leaves'
+}
+
+
+def convert_old_disease(disease, now=None):
+    """Return the new-schema document for an old-schema ``disease``"""
+    # Extract data from old schema
+    disease_name = disease.get('disease_name', '').lower()
+    recommended_treatment = disease.get('recommended_treatment', '')
+    fertilisers = disease.get('fertilisers', '')
+    pesticides = disease.get('pesticides', '')
+
+    description = DESCRIPTIONS.get(disease_name, f'A plant disease: {disease_name}')
+
+    # Create solutions array
+    solutions = []
+
+    # Add organic solution (fertilizers)
+    if fertilisers and fertilisers.strip():
+        solutions.append({
+            'type': 'organic',
+            'solution': f'Apply {fertilisers.lower()}',
+            'effectiveness': 'Medium',
+            'application': 'Apply as soil amendment or foliar feed'
+        })
+
+    # Add inorganic solution (pesticides)
+    if pesticides and pesticides.strip():
+        solutions.append({
+            'type': 'inorganic',
+            'solution': pesticides,
+            'effectiveness': 'High',
+            'application': 'Apply according to label instructions'
+        })
+
+    # Add general treatment if available
+    if recommended_treatment and recommended_treatment.strip():
+        solutions.append({
+            'type': 'organic',
+            'solution': recommended_treatment,
+            'effectiveness': 'High',
+            'application': 'Follow recommended practices'
+        })
+
+    # Ensure at least one solution
+    if not solutions:
+        solutions.append({
+            'type': 'organic',
+            'solution': 'Consult agricultural expert for treatment options',
+            'effectiveness': 'Medium',
+            'application': 'Follow expert recommendations'
+        })
+
+    return with_name_key({
+        'name': disease_name,
+        'description': description,
+        'solutions': solutions,
+        'migrated_from_old_schema': True,
+        'migration_date': now or datetime.now(),
+        'original_data': {
+            'disease_name': disease.get('disease_name'),
+            'recommended_treatment': disease.get('recommended_treatment'),
+            'fertilisers': disease.get('fertilisers'),
+            'pesticides': disease.get('pesticides')
+        }
+    })
+
+
+class MigrationProgress:
+    """Running totals of a migration run"""
+
+    def __init__(self, resumed_from=None):
+        self.resumed_from = resumed_from
+        self.batches = 0
+        self.scanned = 0
+        self.migrated = 0
+        self.merged = 0
+        self.failed = 0
+        # Counts for the batch that was just written
+        self.batch_migrated = 0
+        self.batch_merged = 0
+        self.batch_failed = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        """Documents scanned per second"""
+        elapsed = self.elapsed
+        return self.scanned / elapsed if elapsed > 0 else 0.0
+
+
+def get_checkpoint(db, name=MIGRATION_NAME):
+    """Return the last ``_id`` checkpointed for migration ``name``, or None"""
+    checkpoint = db[CHECKPOINT_COLLECTION].find_one({'_id': name})
+    return checkpoint.get('last_id') if checkpoint else None
+
+
+def get_failed_ids(db, name=MIGRATION_NAME):
+    """Return the ``_id``s migration ``name`` could not write yet"""
+    checkpoint = db[CHECKPOINT_COLLECTION].find_one({'_id': name}, {'failed_ids': 1})
+    return checkpoint.get('failed_ids', []) if checkpoint else []
+
+
+def clear_checkpoint(db, name=MIGRATION_NAME):
+    """Forget the checkpoint so the next run starts from the beginning"""
+    db[CHECKPOINT_COLLECTION].delete_one({'_id': name})
+
+
+def _save_checkpoint(db, name, progress, failed, last_id=None, retried=None):
+    update = {
+        '$set': {'updated_at': datetime.now()},
+        '$inc': {'migrated': progress.batch_migrated, 'merged': progress.batch_merged},
+    }
+    if last_id is not None:
+        update['$set']['last_id'] = last_id
+    if retried is not None:
+        # Retried ids that still fail stay in the set
+        update['$pull'] = {'failed_ids': {'$in': [_id for _id in retried if _id not in failed]}}
+    elif failed:
+        update['$addToSet'] = {'failed_ids': {'$each': failed}}
+    db[CHECKPOINT_COLLECTION].update_one({'_id': name}, update, upsert=True)
+
+
+def _merge_into(collection, old_id, target_id, document):
+    """Add ``document``'s solutions to the migrated disease ``target_id`` and drop the old document
+
+    Returns False if the target is not (yet) a new-schema disease.
+    """
+    stamp = {}
+    with catalog_write(collection.database, stamp, collection.name):
+        result = collection.update_one(
+            {'_id': target_id, 'name': {'$exists': True}},
+            {
+                '$addToSet': {
+                    'solutions': {'$each': document['solutions']},
+                    'merged_old_schema': document['original_data'],
+                },
+                '$set': {'updated_seq': stamp['updated_seq'], 'updated_at': stamp['updated_at']},
+            },
+        )
+        if result.matched_count:
+            collection.delete_one({'_id': old_id})
+    return bool(result.matched_count)
+
+
+def _migrate_batch(collection, batch, progress, now):
+    """Write one batch of old documents and return the ``_id``s that failed"""
+    failed = []
+    converted = []
+    for disease in batch:
+        try:
+            converted.append((disease['_id'], convert_old_disease(disease, now)))
+        except Exception:
+            failed.append(disease['_id'])
+
+    # Diseases that already exist in the new schema are merged into, not replaced
+    existing = {
+        document['name_key']: document['_id']
+        for document in collection.find(
+            {'name_key': {'$in': [document['name_key'] for _, document in converted]}}, {'name_key': 1}
+        )
+    }
+    replacements = []
+    merges = []
+    for _id, document in converted:
+        target = existing.get(document['name_key'])
+        if target is None:
+            # Later old documents with the same name merge into this one
+            existing[document['name_key']] = _id
+            replacements.append((_id, document))
+        else:
+            merges.append((_id, target, document))
+
+    progress.batch_migrated = 0
+    if replacements:
+        operations = [ReplaceOne({'_id': _id}, document) for _id, document in replacements]
+        with catalog_write(collection.database, [document for _, document in replacements], collection.name):
+            try:
+                result = collection.bulk_write(operations, ordered=False)
+                progress.batch_migrated = result.modified_count
+            except BulkWriteError as e:
+                # Unordered: the rest of the batch was still applied
+                progress.batch_migrated = e.details.get('nModified', 0)
+                for error in e.details.get('writeErrors', []):
+                    _id, document = replacements[error['index']]
+                    target = None
+                    if error.get('code') == DUPLICATE_KEY:
+                        # The disease was added since the lookup above
+                        target = collection.find_one({'name_key': document['name_key']}, {'_id': 1})
+                    if target:
+                        merges.append((_id, target['_id'], document))
+                    else:
+                        failed.append(_id)
+
+    merged = []
+    for old_id, target_id, document in merges:
+        try:
+            if _merge_into(collection, old_id, target_id, document):
+                merged.append(old_id)
+                continue
+        except PyMongoError:
+            pass
+        failed.append(old_id)
+    record_deletions(collection.database, [{'_id': _id} for _id in merged], collection.name)
+
+    progress.batch_merged = len(merged)
+    progress.batch_failed = len(failed)
+    progress.batches += 1
+    progress.scanned += len(batch)
+    progress.migrated += progress.batch_migrated
+    progress.merged += progress.batch_merged
+    progress.failed += progress.batch_failed
+    return failed
+
+
+def run_migration(collection, batch_size=DEFAULT_BATCH_SIZE, name=MIGRATION_NAME, on_batch=None):
+    """Migrate every old-schema document in ``collection``, resuming from the checkpoint
+
+    Documents earlier runs failed to write are retried first. ``on_batch(progress)``
+    is called after each batch is written and checkpointed. Returns the final
+    ``MigrationProgress``.
+    """
+    db = collection.database
+    last_id = get_checkpoint(db, name)
+    progress = MigrationProgress(resumed_from=last_id)
+
+    retry = get_failed_ids(db, name)
+    for start in range(0, len(retry), batch_size):
+        retried = retry[start:start + batch_size]
+        # Ids no longer in the old schema (fixed or removed by hand) drop out of the set too
+        batch = list(collection.find(dict(OLD_SCHEMA_FILTER, _id={'$in': retried})).sort('_id', 1))
+        failed = _migrate_batch(collection, batch, progress, datetime.now())
+        _save_checkpoint(db, name, progress, failed, retried=retried)
+        if on_batch:
+            on_batch(progress)
+
+    while True:
+        # Keyset batches: each query is short-lived and picks up after the checkpoint
+        query = dict(OLD_SCHEMA_FILTER)
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+        batch = list(collection.find(query).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+
+        failed = _migrate_batch(collection, batch, progress, datetime.now())
+        # Failed ids are kept in the checkpoint, so moving past them loses nothing
+        last_id = batch[-1]['_id']
+        _save_checkpoint(db, name, progress, failed, last_id=last_id)
+        if on_batch:
+            on_batch(progress)
+
+    return progress
@@ -0,0 +1,182 @@
+"""
+Read-through cache for disease search responses.
+
+Responses are cached under the normalized query, so "Rust", " rust " and
+"RUST" share one entry, and under the catalog version the answering search
+index was loaded at (``plants.catalog``). Any stamped write bumps that
+version, so once a worker reloads its index, from any process's write, it
+stops reading entries computed from the old data; they simply expire.
+
+``invalidate()`` additionally drops everything at once: the in-process
+backend clears itself, the Django and Redis backends bump a generation
+counter stored in the shared cache.
+
+Configuration (Django settings or environment variables):
+
+    SEARCH_CACHE_BACKEND       'local' (default), 'django' or 'redis'
+    SEARCH_CACHE_TTL           seconds an entry is served (default 300)
+    SEARCH_CACHE_MAX_ENTRIES   LRU size of the local backend (default 1024)
+    SEARCH_CACHE_DJANGO_ALIAS  Django cache alias (default 'default')
+    SEARCH_CACHE_REDIS_URL     Redis URL (default redis://localhost:6379/0)
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from .conf import get_setting
+from .disease_index import normalize_name
+
+KEY_PREFIX = 'plants:search'
+
+
+class LocalCache:
+    """Thread-safe in-process LRU cache with per-entry expiry"""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class GenerationCache:
+    """Base for shared backends: keys carry a generation that ``clear()`` bumps"""
+
+    generation_key = f'{KEY_PREFIX}:generation'
+
+    def _key(self, key):
+        return f'{KEY_PREFIX}:{self._generation()}:{key}'
+
+
+class DjangoCache(GenerationCache):
+    """Stores entries in a Django cache (locmem, file, memcached, redis...)"""
+
+    def __init__(self, ttl, alias):
+        from django.core.cache import caches
+        self.ttl = ttl
+        self.cache = caches[alias]
+
+    def _generation(self):
+        return self.cache.get_or_set(self.generation_key, 1, timeout=None)
+
+    def get(self, key):
+        return self.cache.get(self._key(key))
+
+    def set(self, key, value):
+        self.cache.set(self._key(key), value, timeout=self.ttl)
+
+    def clear(self):
+        try:
+            self.cache.incr(self.generation_key)
+        except ValueError:
+            self.cache.set(self.generation_key, 2, timeout=None)
+
+
+class RedisCache(GenerationCache):
+    """Stores pickled entries in Redis; requires the optional ``redis`` package"""
+
+    def __init__(self, ttl, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("SEARCH_CACHE_BACKEND='redis' requires the redis package") from e
+        self.ttl = ttl
+        self.client = redis.Redis.from_url(url)
+
+    def _generation(self):
+        return int(self.client.get(self.generation_key) or 0)
+
+    def get(self, key):
+        value = self.client.get(self._key(key))
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(self._key(key), pickle.dumps(value), ex=self.ttl)
+
+    def clear(self):
+        self.client.incr(self.generation_key)
+
+
+class SearchCache:
+    """Caches (status, body) search responses keyed by normalized query"""
+
+    def __init__(self, backend, namespace='plants'):
+        self.backend = backend
+        self.namespace = namespace
+
+    def key(self, query, *variant, version=None):
+        # Hashed so any query is a valid key for memcached-style backends
+        raw = '\x00'.join([self.namespace, f'v{version}', normalize_name(query), *map(str, variant)])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get_or_compute(self, query, compute, *variant, version=None):
+        """Return the cached response for ``query``, computing and storing it on a miss
+
+        ``version`` is the catalog version of the index ``compute`` answers
+        from (``DiseaseIndex.version``).
+        """
+        key = self.key(query, *variant, version=version)
+        try:
+            cached = self.backend.get(key)
+        except Exception:
+            # A cache outage must not take search down with it
+            cached = None
+        if cached is not None:
+            return cached
+
+        response = compute()
+        status = response[0]
+        if status < 500:
+            try:
+                self.backend.set(key, response)
+            except Exception:
+                pass
+        return response
+
+    def invalidate(self):
+        """Drop every cached response; call after any write to the diseases collection"""
+        self.backend.clear()
+
+
+def get_search_cache(namespace='plants'):
+    """Build the search cache configured by the SEARCH_CACHE_* settings
+
+    ``namespace`` keeps apps with different response formats apart when
+    they share a backend.
+    """
+    backend = get_setting('SEARCH_CACHE_BACKEND', 'local')
+    ttl = get_setting('SEARCH_CACHE_TTL', 300)
+    if backend == 'django':
+        backend = DjangoCache(ttl, get_setting('SEARCH_CACHE_DJANGO_ALIAS', 'default'))
+    elif backend == 'redis':
+        backend = RedisCache(ttl, get_setting('SEARCH_CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+    elif backend == 'local':
+        backend = LocalCache(ttl, get_setting('SEARCH_CACHE_MAX_ENTRIES', 1024))
+    else:
+        raise ValueError(f"Unknown SEARCH_CACHE_BACKEND: {backend!r}")
+    return SearchCache(backend, namespace)
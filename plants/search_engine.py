@@ -0,0 +1,274 @@
+"""
+Ranked fuzzy search over disease names and descriptions.
+
+Extends the in-memory ``DiseaseIndex`` with a trigram inverted index so that
+misspelled queries ("powdry mildew") still find the right disease, and so a
+single call can return the top-k matches ranked by similarity. The module has
+no Django dependency and is shared by the Django app, the root Flask app and
+``simple_plant_app``.
+
+Engines built with a ``render`` callable also keep every disease's search
+response pre-serialized to JSON bytes, so the hot path only joins bytes.
+
+``suggest()`` completes partial input for typeahead from a sorted array of
+names and optional ``aliases``, with a binary search per keystroke.
+"""
+import bisect
+import json
+import logging
+import re
+
+from .disease_index import DiseaseIndex, IndexState, _starting_with, normalize_name
+
+# Fields needed to rank and answer a search request
+SEARCH_PROJECTION = {'name': 1, 'description': 1, 'image': 1, 'solutions': 1, 'aliases': 1}
+
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 20
+MIN_SCORE = 0.3
+# Description matches rank below name matches of the same similarity
+DESCRIPTION_WEIGHT = 0.5
+SUGGEST_LIMIT = 8
+
+# Match tiers, best first: exact name, name prefix, name substring, fuzzy
+EXACT, PREFIX, SUBSTRING, FUZZY = 3, 2, 1, 0
+
+_WORD = re.compile(r'\w+')
+# Three word characters in a row: a query with one has at least one in-word trigram
+_WORD_TRIGRAM = re.compile(r'\w{3}')
+
+logger = logging.getLogger(__name__)
+
+
+def trigrams(text):
+    """Return the set of word trigrams for ``text`` (pg_trgm style padding)"""
+    grams = set()
+    for word in _WORD.findall(normalize_name(text)):
+        padded = f'  {word} '
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def solution_payload(document, images=False):
+    """Return the search response fields for ``document``, solutions grouped by type
+
+    Malformed solutions (not a dict, no ``solution`` text or no ``type``)
+    are left out; unexpected types get a group of their own.
+    """
+    solutions = {"organic": [], "inorganic": []}
+    for solution in document.get('solutions') or []:
+        if not isinstance(solution, dict) or not solution.get('solution') or not solution.get('type'):
+            continue
+        solution_data = {"solution": solution['solution']}
+        if images:
+            solution_data["image"] = solution.get('image', '')
+        solution_data["effectiveness"] = solution.get('effectiveness', 'Unknown')
+        solution_data["application"] = solution.get('application', 'Follow standard guidelines')
+        solutions.setdefault(str(solution['type']), []).append(solution_data)
+
+    payload = {
+        "disease": document['name'],
+        "description": document.get('description', ''),
+    }
+    if images:
+        payload["image"] = document.get('image', '')
+    payload["solutions"] = solutions
+    return payload
+
+
+def _open_object(value):
+    """Serialize a dict to JSON bytes without its closing brace"""
+    return json.dumps(value).encode('utf-8')[:-1]
+
+
+class SearchResult:
+    """A ranked search hit"""
+    __slots__ = ('key', 'document', 'score', 'tier')
+
+    def __init__(self, key, document, score, tier):
+        self.key = key
+        self.document = document
+        self.score = score
+        self.tier = tier
+
+    def __repr__(self):
+        return f"SearchResult({self.document.get('name')!r}, score={self.score:.3f})"
+
+
+class SearchState(IndexState):
+    """Index snapshot extended with trigram postings and pre-rendered responses"""
+
+    def __init__(self, docs=None, render=None):
+        rendered = {}
+        if render is not None:
+            # One bad document is left out of the index instead of failing the whole build
+            for key, document in (docs or {}).items():
+                try:
+                    rendered[key] = _open_object(render(document))
+                except Exception as e:
+                    logger.warning(f"⚠️ Skipping disease {document.get('name')!r} in search index: {e!r}")
+            docs = {key: docs[key] for key in rendered}
+        super().__init__(docs)
+        self.name_sizes = {}
+        self.name_postings = {}
+        self.description_postings = {}
+        # Open JSON objects, completed per request with the ranked matches
+        self.bodies = {}
+        self.match_fragments = {}
+        # Sorted (completion key, disease key, alias or None) for typeahead
+        completions = []
+        for key, document in self.docs.items():
+            completions.append((key, key, None))
+            for alias in document.get('aliases') or ():
+                alias_key = normalize_name(alias)
+                if alias_key and alias_key != key:
+                    completions.append((alias_key, key, alias))
+            if render is not None:
+                self.bodies[key] = rendered[key] + b', "matches": ['
+                self.match_fragments[key] = _open_object({
+                    "disease": document['name'],
+                    "description": document.get('description', ''),
+                }) + b', "score": '
+            name_grams = trigrams(key)
+            self.name_sizes[key] = len(name_grams)
+            for gram in name_grams:
+                self.name_postings.setdefault(gram, []).append(key)
+            for gram in trigrams(document.get('description', '')):
+                self.description_postings.setdefault(gram, []).append(key)
+        completions.sort()
+        self.completions = completions
+        self.completion_keys = [completion[0] for completion in completions]
+
+
+class DiseaseSearchEngine(DiseaseIndex):
+    """Disease index with trigram ranking over ``name`` and ``description``
+
+    ``render(document)`` returns the response dict for a disease (see
+    ``solution_payload``); when given, ``search_body`` is available.
+    """
+
+    projection = SEARCH_PROJECTION
+
+    def __init__(self, render=None):
+        self.render = render
+        super().__init__()
+
+    def _build_state(self, docs):
+        return SearchState(docs, self.render)
+
+    def search(self, text, limit=DEFAULT_LIMIT, min_score=MIN_SCORE):
+        """Return up to ``limit`` SearchResults for ``text``, best match first"""
+        return self._search(self._state, text, limit, min_score)
+
+    def search_body(self, text, limit=DEFAULT_LIMIT, min_score=MIN_SCORE):
+        """Return the pre-serialized JSON response for ``text``, or None when nothing matches"""
+        state = self._state
+        return self._render(state, self._search(state, text, limit, min_score))
+
+    def search_bodies(self, texts, limit=DEFAULT_LIMIT, min_score=MIN_SCORE):
+        """Resolve many queries against one index snapshot: ``{text: body or None}``"""
+        state = self._state
+        return {
+            text: self._render(state, self._search(state, text, limit, min_score))
+            for text in texts
+        }
+
+    def suggest(self, text, limit=SUGGEST_LIMIT):
+        """Return up to ``limit`` completions of ``text`` as ``{"disease", "alias"?}`` dicts
+
+        Names and aliases starting with ``text`` come first, alphabetically;
+        remaining slots go to names with a later word starting with it
+        ("mil" -> "powdery mildew").
+        """
+        key = normalize_name(text)
+        if not key:
+            return []
+        state = self._state
+        suggestions = []
+        seen = set()
+
+        start = bisect.bisect_left(state.completion_keys, key)
+        for completion_key, disease_key, alias in state.completions[start:]:
+            if len(suggestions) >= limit or not completion_key.startswith(key):
+                break
+            if disease_key in seen:
+                continue
+            seen.add(disease_key)
+            suggestion = {"disease": state.docs[disease_key]['name']}
+            if alias is not None:
+                suggestion["alias"] = alias
+            suggestions.append(suggestion)
+
+        if len(suggestions) < limit:
+            word_matches = set()
+            for token in _starting_with(state.token_list, key):
+                word_matches.update(state.tokens[token])
+            for disease_key in sorted(word_matches - seen)[:limit - len(suggestions)]:
+                suggestions.append({"disease": state.docs[disease_key]['name']})
+        return suggestions
+
+    def _render(self, state, results):
+        if not results:
+            return None
+        matches = b', '.join(
+            b'%s%r}' % (state.match_fragments[result.key], round(result.score, 3))
+            for result in results
+        )
+        return state.bodies[results[0].key] + matches + b']}'
+
+    def _search(self, state, text, limit, min_score):
+        key = normalize_name(text)
+        if not key:
+            return []
+
+        query_grams = trigrams(key)
+
+        name_shared = {}
+        description_shared = {}
+        for gram in query_grams:
+            for k in state.name_postings.get(gram, ()):
+                name_shared[k] = name_shared.get(k, 0) + 1
+            for k in state.description_postings.get(gram, ()):
+                description_shared[k] = description_shared.get(k, 0) + 1
+
+        # A name containing the query shares the query's in-word trigrams, so
+        # it is already a candidate; only queries too short to have one
+        # (1-2 character words) are matched against every name
+        candidates = name_shared.keys() | description_shared.keys()
+        if not _WORD_TRIGRAM.search(key):
+            candidates.update(k for k in state.keys if key in k)
+
+        results = []
+        for k in candidates:
+            shared = name_shared.get(k, 0)
+            # Jaccard similarity of the name trigrams
+            union = len(query_grams) + state.name_sizes[k] - shared
+            score = shared / union if union else 0.0
+            if query_grams:
+                coverage = description_shared.get(k, 0) / len(query_grams)
+                score = max(score, DESCRIPTION_WEIGHT * coverage)
+
+            if k == key:
+                tier, score = EXACT, 1.0
+            elif k.startswith(key):
+                tier = PREFIX
+            elif key in k:
+                tier = SUBSTRING
+            else:
+                tier = FUZZY
+                if score < min_score:
+                    continue
+            results.append((-tier, -score, k, SearchResult(k, state.docs[k], score, tier)))
+
+        results.sort(key=lambda r: r[:3])
+        return [r[3] for r in results[:limit]]
+
+
+def clamp_limit(value, default=DEFAULT_LIMIT):
+    """Parse a client supplied result limit into the range 1..MAX_LIMIT"""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(value, MAX_LIMIT))
@@ -0,0 +1,143 @@
+"""
+Versioned seed dataset for the ``diseases`` collection.
+
+The sample diseases live in ``seed_data/diseases.json`` and every entry
+point (Django ``reset_database``, the root Flask app, ``simple_plant_app``
+and ``mongodb_interactive``) loads them through ``apply_seed()``. Bump
+``version`` in the file whenever its contents change.
+
+Each seeded document carries ``seed_version`` and ``seed_hash`` (a hash of
+its seed content), so re-applying the seed only writes diseases that
+actually changed. Two modes:
+
+    upsert (default)  one unordered bulk write of the changed diseases,
+                      keyed by ``name_key``; other documents are left alone,
+                      and so are stored diseases the seed no longer owns
+                      (no ``seed_hash``, or ``added_manually``: edited by hand)
+    swap              build the full seed in a staging collection and
+                      rename it over the live one, so readers never see
+                      an empty or half-written collection
+
+Written documents are stamped for the change feed (``plants.catalog``), and
+swap mode records tombstones for the documents it removed.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+from pymongo import ReplaceOne
+
+from .catalog import catalog_write, record_deletions
+from .disease_index import normalize_name, with_name_key
+
+SEED_PATH = Path(__file__).resolve().parent / 'seed_data' / 'diseases.json'
+
+# Fields that come from the seed file; anything else on a document is metadata
+SEED_FIELDS = ('name', 'description', 'image', 'solutions')
+
+
+def load_seed(path=SEED_PATH):
+    """Return ``(version, diseases)`` from the seed file"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return data['version'], data['diseases']
+
+
+def content_hash(disease):
+    """Stable hash of a disease's seed fields"""
+    content = {field: disease[field] for field in SEED_FIELDS if field in disease}
+    raw = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def seed_documents(path=SEED_PATH):
+    """Return ``(version, documents)`` with seed metadata stamped on each document"""
+    version, diseases = load_seed(path)
+    documents = [
+        with_name_key(dict(disease, seed_version=version, seed_hash=content_hash(disease)))
+        for disease in diseases
+    ]
+    return version, documents
+
+
+def apply_seed(collection, swap=False, path=SEED_PATH):
+    """Load the seed dataset into ``collection``
+
+    Returns a summary dict with the seed ``version`` and the number of
+    diseases ``written``, ``unchanged`` and ``skipped`` (not seed-owned).
+    """
+    version, documents = seed_documents(path)
+    if swap:
+        written = _swap(collection, documents)
+        return {'version': version, 'written': written, 'unchanged': 0, 'skipped': 0}
+
+    # Only documents whose seed content differs from what is stored are written
+    stored = {
+        document['name_key']: document
+        for document in collection.find(
+            {'name_key': {'$in': [document['name_key'] for document in documents]}},
+            {'name_key': 1, 'seed_hash': 1, 'added_manually': 1},
+        )
+    }
+    changed = []
+    skipped = 0
+    for document in documents:
+        current = stored.get(document['name_key'])
+        if current is None:
+            changed.append(document)
+        elif not current.get('seed_hash') or current.get('added_manually'):
+            skipped += 1
+        elif current['seed_hash'] != document['seed_hash']:
+            changed.append(document)
+    if changed:
+        with catalog_write(collection.database, changed, collection.name):
+            collection.bulk_write(
+                [ReplaceOne({'name_key': document['name_key']}, document, upsert=True) for document in changed],
+                ordered=False,
+            )
+    return {
+        'version': version,
+        'written': len(changed),
+        'unchanged': len(documents) - len(changed) - skipped,
+        'skipped': skipped,
+    }
+
+
+def _swap(collection, documents):
+    """Replace ``collection`` with exactly ``documents`` via a staging collection"""
+    staging = collection.database[f'{collection.name}_seed_staging']
+    staging.drop()
+
+    # Keep the _id of diseases that already exist so links to them stay valid
+    existing = list(collection.find({}, {'name': 1}))
+    ids = {
+        normalize_name(document['name']): document['_id']
+        for document in existing
+        if isinstance(document.get('name'), str)
+    }
+    for document in documents:
+        if document['name_key'] in ids:
+            document['_id'] = ids[document['name_key']]
+
+    # Published once the rename has made the documents live
+    with catalog_write(collection.database, documents, collection.name):
+        staging.insert_many(documents, ordered=False)
+
+        # renameCollection with dropTarget discards the live collection's indexes, so copy them first
+        for index in collection.list_indexes():
+            if index['name'] == '_id_':
+                continue
+            options = {k: v for k, v in index.items() if k not in ('key', 'v', 'ns')}
+            keys = list(index['key'].items())
+            if '_fts' in index['key']:
+                # Text indexes report internal keys; rebuild them from their weights
+                keys = [(field, 'text') for field in index['weights']]
+                options.pop('textIndexVersion', None)
+            staging.create_index(keys, **options)
+
+        staging.rename(collection.name, dropTarget=True)
+
+    # Anything the seed did not carry over is gone; tell sync clients
+    kept = {document['_id'] for document in documents}
+    record_deletions(collection.database, [d for d in existing if d['_id'] not in kept], collection.name)
+    return len(documents)
@@ -0,0 +1,160 @@
+"""
+Compact, versioned snapshot of the disease catalog for browsers.
+
+``manage.py build_catalog_snapshot`` compiles the ``diseases`` collection
+into one gzip-compressed JSON file named after the hash of its contents, so
+it can be served with a year-long ``immutable`` cache lifetime: a changed
+catalog gets a new file name instead of a stale cached copy. A small
+manifest next to the snapshots names the current one.
+
+The snapshot holds each disease's search response fields (as returned by
+``/search/``) and ``keys``, the normalized names sorted in the same order,
+so the page can find exact and prefix matches with a binary search and only
+ask the server about everything else. Pages only link a snapshot built from
+the current catalog version (``live_snapshot()``); while it is stale they
+search on the server.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from pymongo.errors import PyMongoError
+
+from .catalog import get_version
+from .disease_index import INDEX_PROJECTION, VERSION_CHECK_TTL, normalize_name
+from .search_cache import LocalCache
+from .search_engine import solution_payload
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_NAME = 'manifest.json'
+# Snapshots kept besides the current one, for pages rendered just before a rebuild
+KEEP_PREVIOUS = 2
+# Cached in place of the catalog version while MongoDB cannot be reached
+VERSION_UNAVAILABLE = -1
+
+_manifest_cache = {'mtime': None, 'manifest': None}
+_manifest_lock = threading.Lock()
+# Catalog version, re-read at most every DISEASE_INDEX_VERSION_TTL seconds
+_version_cache = LocalCache(getattr(settings, 'DISEASE_INDEX_VERSION_TTL', VERSION_CHECK_TTL), 1)
+
+
+def snapshot_dir():
+    return Path(getattr(settings, 'CATALOG_SNAPSHOT_DIR', settings.BASE_DIR / 'catalog_snapshots'))
+
+
+def snapshot_filename(digest):
+    return f'catalog-{digest}.json.gz'
+
+
+def build_snapshot(documents, version):
+    """Return ``(gzip bytes, digest)`` for the given disease documents
+
+    Documents are deduplicated on their normalized name like the search
+    index does (first one wins). Compression is deterministic, so an
+    unchanged catalog always produces the same bytes and digest.
+    """
+    docs = {}
+    for document in documents:
+        key = normalize_name(document.get('name'))
+        if key and key not in docs:
+            docs[key] = document
+    keys = sorted(docs)
+
+    snapshot = {
+        'format': SNAPSHOT_FORMAT,
+        'version': version,
+        'keys': keys,
+        'diseases': [solution_payload(docs[key]) for key in keys],
+    }
+    raw = json.dumps(snapshot, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    return gzip.compress(raw, compresslevel=9, mtime=0), digest
+
+
+def _write_atomic(path, data):
+    tmp = path.with_name(f'.{path.name}.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def write_snapshot(db, directory=None):
+    """Build a snapshot of ``db.diseases``, make it current and return the new manifest"""
+    directory = Path(directory or snapshot_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+
+    # Read before the scan: a write during it leaves the snapshot a version behind, not ahead
+    version = get_version(db)
+    data, digest = build_snapshot(db.diseases.find({}, INDEX_PROJECTION).sort('_id', 1), version)
+
+    path = directory / snapshot_filename(digest)
+    if not path.exists():
+        _write_atomic(path, data)
+    manifest = {
+        'file': path.name,
+        'hash': digest,
+        'catalog_version': version,
+        'size': len(data),
+        'built_at': datetime.now(timezone.utc).isoformat(),
+    }
+    _write_atomic(directory / MANIFEST_NAME, json.dumps(manifest, indent=2).encode('utf-8'))
+    prune_snapshots(directory, keep=path.name)
+    return manifest
+
+
+def prune_snapshots(directory, keep):
+    """Delete all but the newest ``KEEP_PREVIOUS`` snapshots besides ``keep``"""
+    previous = sorted(
+        (path for path in Path(directory).glob('catalog-*.json.gz') if path.name != keep),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in previous[KEEP_PREVIOUS:]:
+        path.unlink(missing_ok=True)
+
+
+def current_snapshot():
+    """Return the current manifest, or None if no snapshot has been built
+
+    The manifest is re-read only when its modification time changes, so
+    calling this on every page render costs one ``stat``.
+    """
+    path = snapshot_dir() / MANIFEST_NAME
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    with _manifest_lock:
+        if _manifest_cache['mtime'] != mtime:
+            try:
+                manifest = json.loads(path.read_bytes())
+            except (OSError, ValueError):
+                return None
+            _manifest_cache.update(mtime=mtime, manifest=manifest)
+        return _manifest_cache['manifest']
+
+
+def live_snapshot(db):
+    """Return the current manifest if it was built from the current catalog version, else None"""
+    manifest = current_snapshot()
+    if manifest is None:
+        return None
+    version = _version_cache.get('diseases')
+    if version is None:
+        try:
+            version = get_version(db)
+        except PyMongoError:
+            # Remembered like a version, so an outage costs one server selection timeout per TTL
+            version = VERSION_UNAVAILABLE
+        _version_cache.set('diseases', version)
+    return manifest if manifest.get('catalog_version') == version else None
+
+
+def snapshot_path(digest):
+    """Return the path of the snapshot with ``digest``, or None if it is not on disk"""
+    path = snapshot_dir() / snapshot_filename(digest)
+    return path if path.is_file() else None
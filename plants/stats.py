@@ -0,0 +1,51 @@
+"""
+Visit statistics for the profile page.
+
+Daily buckets are read from the UserDailyActivity rollup, so the page reads
+at most one small row per day shown no matter how many sessions a user has.
+The visit count and the average session duration come from the UserProfile
+counters (``total_session_duration`` / ``total_visits``), which the
+tracking flush keeps up to date, so no lifetime aggregate is needed.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import UserDailyActivity
+
+ACTIVITY_DAYS = 7
+
+
+def get_activity_stats(user, profile, today=None, days=ACTIVITY_DAYS):
+    """Return session counts and time spent for ``user``, bucketed by day"""
+    today = today or timezone.localdate()
+    dates = [today - timedelta(days=i) for i in range(days)]
+
+    rows = {
+        row.date: row
+        for row in UserDailyActivity.objects.filter(user=user, date__gt=today - timedelta(days=days))
+    }
+
+    daily = []
+    for date in dates:
+        row = rows.get(date)
+        daily.append({
+            'date': date,
+            'sessions': row.sessions if row else 0,
+            'time': row.duration if row else 0,
+            'pages_visited': row.pages_visited if row else 0,
+        })
+
+    return {
+        'total_sessions': profile.total_visits,
+        'avg_session_duration': (
+            profile.total_session_duration // profile.total_visits if profile.total_visits else 0
+        ),
+        'recent_sessions': sum(day['sessions'] for day in daily),
+        'recent_time': sum(day['time'] for day in daily),
+        'today_sessions': daily[0]['sessions'],
+        'today_time': daily[0]['time'],
+        'yesterday_sessions': daily[1]['sessions'] if days > 1 else 0,
+        'yesterday_time': daily[1]['time'] if days > 1 else 0,
+        'daily': daily,
+    }
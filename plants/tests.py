@@ -1,3 +1,884 @@
-from django.test import TestCase
+"""
+Tests for the plants app.
 
-# Create your tests here.
+Run with ``python manage.py test plants``. Tests of the MongoDB-backed
+parts run against mongomock when it is installed and are skipped otherwise.
+"""
+import gzip
+import importlib.util
+import inspect
+import json
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from pymongo.errors import PyMongoError
+
+from . import snapshot, views
+from .catalog import catalog_write, changes_since, get_version, record_deletions
+from .models import UserDailyActivity, UserProfile, UserSession
+from .pageviews import is_page_view, no_tracking, track_pageview
+from .schema_migration import OLD_SCHEMA_FILTER, get_checkpoint, get_failed_ids, run_migration
+from .search_cache import LocalCache, SearchCache
+from .search_engine import EXACT, PREFIX, SUBSTRING, DiseaseSearchEngine, solution_payload
+from .seed import apply_seed, seed_documents
+from .stats import get_activity_stats
+from .tracking import MAX_FLUSH_ATTEMPTS, TrackingBuffer, buffer
+from .tracking_store import CookieTrackingStore, MemoryTrackingStore, get_tracking_store
+
+try:
+    import mongomock
+    from mongomock.collection import BulkOperationBuilder
+except ImportError:
+    mongomock = None
+else:
+    # PyMongo 4.9+ passes ``sort`` to bulk replaces and updates; mongomock 4.3 rejects it
+    def _ignore_sort(add):
+        def add_without_sort(self, *args, sort=None, **kwargs):
+            return add(self, *args, **kwargs)
+        return add_without_sort
+
+    for _name in ('add_replace', 'add_update'):
+        _add = getattr(BulkOperationBuilder, _name)
+        if 'sort' not in inspect.signature(_add).parameters:
+            setattr(BulkOperationBuilder, _name, _ignore_sort(_add))
+
+requires_mongomock = unittest.skipUnless(mongomock, 'mongomock is not installed')
+
+def disease(name, description='', solution='Remove affected leaves'):
+    return {
+        'name': name,
+        'description': description,
+        'solutions': [{'type': 'organic', 'solution': solution, 'effectiveness': 'High', 'application': 'Weekly'}],
+    }
+
+
+class SearchEngineTests(SimpleTestCase):
+    """Trigram ranking in DiseaseSearchEngine"""
+
+    def setUp(self):
+        self.engine = DiseaseSearchEngine(render=solution_payload)
+        self.engine.build([
+            disease('Rust', 'Orange pustules on the underside of leaves'),
+            disease('Rust Mite', 'Tiny mites that bronze tomato leaves'),
+            disease('White Rust', 'White blisters on brassica leaves'),
+            disease('Powdery Mildew', 'White powdery coating on leaves'),
+            disease('Downy Mildew', 'Yellow patches with grey fuzz underneath'),
+            disease('Leaf Spot', 'Brown circular spots with yellow halos'),
+        ])
+
+    def test_exact_then_prefix_then_substring(self):
+        results = self.engine.search('rust')
+        self.assertEqual([r.key for r in results], ['rust', 'rust mite', 'white rust'])
+        self.assertEqual([r.tier for r in results], [EXACT, PREFIX, SUBSTRING])
+        self.assertEqual(results[0].score, 1.0)
+
+    def test_substring_inside_a_word(self):
+        results = self.engine.search('ust')
+        self.assertEqual({r.key for r in results}, {'rust', 'rust mite', 'white rust'})
+        self.assertEqual({r.tier for r in results}, {SUBSTRING})
+
+    def test_short_query_matches_literally(self):
+        self.assertEqual([r.key for r in self.engine.search('ru')], ['rust', 'rust mite', 'white rust'])
+
+    def test_misspelled_query_ranks_closest_name_first(self):
+        self.assertEqual(self.engine.search('powdry mildw')[0].key, 'powdery mildew')
+
+    def test_query_is_normalized(self):
+        self.assertEqual(self.engine.search('  DOWNY   mildew ')[0].key, 'downy mildew')
+
+    def test_description_matches(self):
+        self.assertIn('leaf spot', [r.key for r in self.engine.search('circular spots')])
+
+    def test_no_match(self):
+        self.assertEqual(self.engine.search('xyzzy'), [])
+        self.assertIsNone(self.engine.search_body('xyzzy'))
+
+    def test_search_body_is_the_search_response(self):
+        body = json.loads(self.engine.search_body('rust', limit=2))
+        self.assertEqual(body['disease'], 'Rust')
+        self.assertEqual(body['solutions']['organic'][0]['solution'], 'Remove affected leaves')
+        self.assertEqual([match['disease'] for match in body['matches']], ['Rust', 'Rust Mite'])
+
+    def test_malformed_document_is_left_out(self):
+        self.engine.build([disease('Rust'), {'name': 'Broken', 'solutions': 42}])
+        self.assertEqual(len(self.engine), 1)
+        self.assertEqual(self.engine.search('broken'), [])
+
+
+class SuggestTests(SimpleTestCase):
+    """Typeahead completions from DiseaseSearchEngine.suggest()"""
+
+    def setUp(self):
+        self.engine = DiseaseSearchEngine(render=solution_payload)
+        self.engine.build([
+            disease('Powdery Mildew'),
+            disease('Downy Mildew'),
+            disease('Pythium Root Rot'),
+            dict(disease('Late Blight'), aliases=['Potato Blight', 'late blight']),
+            dict(disease('Potato Scab'), aliases=['Potato Scab Disease']),
+        ])
+
+    def names(self, text, limit=10):
+        return [suggestion['disease'] for suggestion in self.engine.suggest(text, limit)]
+
+    def test_prefix_matches_come_alphabetically(self):
+        self.assertEqual(self.names('p'), ['Late Blight', 'Potato Scab', 'Powdery Mildew', 'Pythium Root Rot'])
+
+    def test_alias_match_names_the_alias(self):
+        self.assertEqual(self.engine.suggest('potato b'), [{'disease': 'Late Blight', 'alias': 'Potato Blight'}])
+
+    def test_each_disease_is_suggested_once(self):
+        self.assertEqual(self.engine.suggest('potato s'), [{'disease': 'Potato Scab'}])
+
+    def test_later_words_fill_remaining_slots(self):
+        self.assertEqual(self.names('mil'), ['Downy Mildew', 'Powdery Mildew'])
+        self.assertEqual(self.names('po'), ['Late Blight', 'Potato Scab', 'Powdery Mildew'])
+
+    def test_limit_and_empty_query(self):
+        self.assertEqual(len(self.engine.suggest('p', 2)), 2)
+        self.assertEqual(self.engine.suggest('   '), [])
+        self.assertEqual(self.engine.suggest('xyz'), [])
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def test_endpoint_is_cacheable(self):
+        with mock.patch.object(views, 'disease_index', self.engine), \
+                mock.patch.object(views, 'ensure_disease_index', return_value=True):
+            response = self.client.get('/search/suggest/', {'q': 'Mil', 'limit': 1})
+        self.assertEqual(response.json(), {'query': 'Mil', 'suggestions': [{'disease': 'Downy Mildew'}]})
+        self.assertEqual(response['Cache-Control'], views.SUGGEST_CACHE_CONTROL)
+
+
+class SearchCacheTests(SimpleTestCase):
+    """SearchCache keys responses by normalized query and catalog version"""
+
+    def setUp(self):
+        self.cache = SearchCache(LocalCache(ttl=60, max_entries=16))
+        self.calls = 0
+
+    def compute(self, status=200):
+        self.calls += 1
+        return status, b'{"disease": "Rust"}'
+
+    def test_normalized_queries_share_an_entry(self):
+        for query in ('Rust', ' rust ', 'RUST'):
+            self.assertEqual(self.cache.get_or_compute(query, self.compute, version=1)[0], 200)
+        self.assertEqual(self.calls, 1)
+
+    def test_new_catalog_version_recomputes(self):
+        self.cache.get_or_compute('rust', self.compute, version=1)
+        self.cache.get_or_compute('rust', self.compute, version=2)
+        self.assertEqual(self.calls, 2)
+
+    def test_variants_are_cached_separately(self):
+        self.cache.get_or_compute('rust', self.compute, 5, version=1)
+        self.cache.get_or_compute('rust', self.compute, 10, version=1)
+        self.assertEqual(self.calls, 2)
+
+    def test_server_errors_are_not_cached(self):
+        self.cache.get_or_compute('rust', lambda: self.compute(500), version=1)
+        self.cache.get_or_compute('rust', lambda: self.compute(500), version=1)
+        self.assertEqual(self.calls, 2)
+
+
+@requires_mongomock
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class SearchBatchTests(SimpleTestCase):
+    """/search/batch/ answers many names from one index snapshot"""
+
+    def setUp(self):
+        self.db = mongomock.MongoClient()['plant_diseases']
+        self.db.diseases.insert_many([disease('Rust'), disease('Powdery Mildew')])
+        for patcher in (
+            mock.patch.object(views, 'db', self.db),
+            mock.patch.object(views, 'disease_index', DiseaseSearchEngine(render=solution_payload)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def post(self, data):
+        return self.client.post('/search/batch/', json.dumps(data), content_type='application/json')
+
+    def test_results_are_keyed_by_the_names_sent(self):
+        response = self.post({'diseases': ['Rust', 'powdry mildw', 'xyzzy']})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(list(results), ['Rust', 'powdry mildw', 'xyzzy'])
+        self.assertEqual(results['Rust']['disease'], 'Rust')
+        self.assertEqual(results['powdry mildw']['disease'], 'Powdery Mildew')
+        self.assertEqual(results['xyzzy'], {'error': 'Disease not found'})
+
+    def test_each_result_matches_single_search(self):
+        single = self.client.post('/search/', json.dumps({'disease': 'rust'}), content_type='application/json')
+        batch = self.post({'diseases': ['rust']})
+        self.assertEqual(batch.json()['results']['rust'], single.json())
+
+    def test_invalid_requests_are_rejected(self):
+        self.assertEqual(self.client.post('/search/batch/', 'not json', content_type='application/json').status_code, 400)
+        self.assertEqual(self.post({'diseases': 'Rust'}).status_code, 400)
+        self.assertEqual(self.post({'diseases': ['Rust', 3]}).status_code, 400)
+        self.assertEqual(self.post({'diseases': ['Rust'] * (views.SEARCH_BATCH_MAX + 1)}).status_code, 400)
+
+
+@requires_mongomock
+@override_settings(ALLOWED_HOSTS=['testserver'], DATABASE_PAGE_SIZE=4)
+class KeysetPaginationTests(TestCase):
+    """The database page walks the collection in (name, _id) order"""
+
+    def setUp(self):
+        self.db = mongomock.MongoClient()['plant_diseases']
+        # Repeated names and old-schema documents without one must not be skipped or repeated
+        self.db.diseases.insert_many(
+            [disease(f'Disease {i % 5}') for i in range(12)]
+            + [{'disease_name': f'old {i}'} for i in range(3)]
+        )
+        patcher = mock.patch.object(views, 'db', self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pages_cover_every_document_once_in_order(self):
+        seen = []
+        page_cursor = None
+        for _ in range(10):
+            response = self.client.get('/database/', {'cursor': page_cursor} if page_cursor else {})
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.context['diseases']), 4)
+            seen.extend(card['id'] for card in response.context['diseases'])
+            page_cursor = response.context.get('next_cursor')
+            if not page_cursor:
+                break
+
+        expected = [str(d['_id']) for d in self.db.diseases.find().sort([('name', 1), ('_id', 1)])]
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_starts_from_the_beginning(self):
+        response = self.client.get('/database/', {'cursor': 'not-a-cursor'})
+        first = self.client.get('/database/')
+        self.assertEqual(
+            [card['id'] for card in response.context['diseases']],
+            [card['id'] for card in first.context['diseases']],
+        )
+
+    def test_stream_renders_every_card(self):
+        response = self.client.get('/database/', {'stream': 1})
+        self.assertTrue(response.streaming)
+        page = b''.join(response.streaming_content).decode()
+        self.assertEqual(page.count('<div class="disease-card">'), self.db.diseases.count_documents({}))
+
+
+class PageViewTests(SimpleTestCase):
+    """is_page_view() classifies requests by decorator, then by path prefix"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def is_page_view(self, path, view_func=lambda request: None):
+        return is_page_view(self.factory.get(path), view_func)
+
+    def test_decorators_win_over_paths(self):
+        self.assertTrue(self.is_page_view('/static/app.css', track_pageview(lambda request: None)))
+        self.assertFalse(self.is_page_view('/admin/', no_tracking(lambda request: None)))
+
+    def test_app_views_are_marked(self):
+        for view in (views.index, views.profile_view):
+            self.assertTrue(view.track_pageview, view.__name__)
+        for view in (views.search_disease, views.search_batch, views.search_suggest, views.catalog_snapshot):
+            self.assertFalse(view.track_pageview, view.__name__)
+
+    def test_undecorated_views_are_not_tracked(self):
+        self.assertFalse(self.is_page_view('/somewhere/'))
+        self.assertFalse(self.is_page_view('/static/app.css'))
+
+    @override_settings(USER_TRACKING_PAGE_PREFIXES=('/admin/',), USER_TRACKING_SKIP_PREFIXES=('/admin/jsi18n/',))
+    def test_prefixes_from_settings(self):
+        self.assertTrue(self.is_page_view('/admin/plants/'))
+        self.assertFalse(self.is_page_view('/admin/jsi18n/'))
+
+
+class TrackingStoreTests(SimpleTestCase):
+    """Visit state round-trips through the cookie and memory stores, per user and session"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.alice = mock.Mock(id=1)
+        self.bob = mock.Mock(id=2)
+        self.state = {'session_id': 7, 'start': 1700000000.0, 'recorded': 30}
+
+    def request(self, session_key='session-a', cookies=None):
+        request = self.factory.get('/')
+        request.session = mock.Mock(session_key=session_key)
+        request.COOKIES.update(cookies or {})
+        return request
+
+    def save(self, store, user=None, session_key='session-a'):
+        response = HttpResponse()
+        store.save(self.request(session_key), response, user or self.alice, self.state)
+        return {name: morsel.value for name, morsel in response.cookies.items()}
+
+    def test_cookie_store_round_trip(self):
+        store = CookieTrackingStore('visit')
+        cookies = self.save(store)
+        self.assertEqual(store.load(self.request(cookies=cookies), self.alice), dict(
+            self.state, user=1, sid=mock.ANY,
+        ))
+
+    def test_cookie_from_another_user_or_session_is_ignored(self):
+        store = CookieTrackingStore('visit')
+        cookies = self.save(store)
+        self.assertIsNone(store.load(self.request(cookies=cookies), self.bob))
+        self.assertIsNone(store.load(self.request('session-b', cookies), self.alice))
+
+    def test_tampered_or_missing_cookie_is_ignored(self):
+        store = CookieTrackingStore('visit')
+        cookies = self.save(store)
+        tampered = {'visit': cookies['visit'].replace('"recorded":30', '"recorded":99')}
+        self.assertIsNone(store.load(self.request(cookies=tampered), self.alice))
+        self.assertIsNone(store.load(self.request(), self.alice))
+
+    def test_memory_store_round_trip(self):
+        store = MemoryTrackingStore(ttl=60, max_entries=10)
+        self.save(store)
+        loaded = store.load(self.request(), self.alice)
+        self.assertEqual(loaded, self.state)
+        loaded['recorded'] = 99
+        self.assertEqual(store.load(self.request(), self.alice), self.state)
+        self.assertIsNone(store.load(self.request(), self.bob))
+        self.assertIsNone(store.load(self.request('session-b'), self.alice))
+
+    def test_memory_store_sets_no_cookie(self):
+        self.assertEqual(self.save(MemoryTrackingStore(ttl=60, max_entries=10)), {})
+
+    def test_store_from_settings(self):
+        with override_settings(USER_TRACKING_STORE='cookie'):
+            self.assertIsInstance(get_tracking_store(), CookieTrackingStore)
+        with override_settings(USER_TRACKING_STORE='memory'):
+            self.assertIsInstance(get_tracking_store(), MemoryTrackingStore)
+        with override_settings(USER_TRACKING_STORE='redis'), self.assertRaises(ValueError):
+            get_tracking_store()
+
+
+class TrackingBufferTests(TestCase):
+    """TrackingBuffer holds deltas in memory until flush() writes them"""
+
+    def setUp(self):
+        self.buffer = TrackingBuffer(flush_interval=3600, flush_threshold=10 ** 6)
+        self.user = User.objects.create_user('tracked')
+        self.session = UserSession.objects.create(user=self.user)
+
+    def test_flush_writes_sessions_profiles_and_daily_rollup(self):
+        self.buffer.record_visit(self.user.id)
+        self.buffer.record_page_view(self.session.pk, self.user.id)
+        self.buffer.record_page_view(self.session.pk, self.user.id)
+        self.buffer.record_duration(self.session.pk, self.user.id, duration=120, added=120, time_spent=30)
+
+        self.assertFalse(UserProfile.objects.filter(user=self.user).exists())
+        self.assertEqual(self.buffer.flush(), 4)
+
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.pages_visited, self.session.duration), (2, 120))
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.total_visits, profile.total_time_spent), (1, 30))
+        self.assertEqual(profile.total_session_duration, 120)
+        self.assertIsNotNone(profile.last_visit)
+        daily = UserDailyActivity.objects.get(user=self.user, date=timezone.localdate())
+        # The visit's first page counts as a page view too
+        self.assertEqual((daily.sessions, daily.duration, daily.pages_visited), (1, 120, 3))
+
+    def test_flushes_accumulate(self):
+        for _ in range(2):
+            self.buffer.record_page_view(self.session.pk, self.user.id)
+            self.buffer.flush()
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.pages_visited, 2)
+
+    def test_session_duration_never_goes_backwards(self):
+        self.buffer.record_duration(self.session.pk, self.user.id, duration=90, added=90, time_spent=0)
+        self.buffer.flush()
+        self.buffer.record_duration(self.session.pk, self.user.id, duration=60, added=0, time_spent=0)
+        self.buffer.flush()
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.duration, 90)
+
+    def test_empty_flush_writes_nothing(self):
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_average_session_duration_reads_no_lifetime_rows(self):
+        other = UserSession.objects.create(user=self.user)
+        for session, duration in ((self.session, 100), (other, 50)):
+            self.buffer.record_visit(self.user.id)
+            self.buffer.record_duration(session.pk, self.user.id, duration=duration, added=duration, time_spent=0)
+        self.buffer.flush()
+        profile = UserProfile.objects.get(user=self.user)
+        # Only the recent daily rows are read
+        with self.assertNumQueries(1):
+            stats = get_activity_stats(self.user, profile)
+        self.assertEqual((stats['total_sessions'], stats['avg_session_duration']), (2, 75))
+
+    def test_failed_flush_is_retried_with_later_events(self):
+        self.buffer.record_visit(self.user.id)
+        self.buffer.record_page_view(self.session.pk, self.user.id)
+        locked = OperationalError('database is locked')
+        with mock.patch.object(self.buffer, '_write_daily', side_effect=locked):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.pages_visited, 0)
+
+        self.buffer.record_page_view(self.session.pk, self.user.id)
+        self.assertEqual(self.buffer.flush(), 3)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.pages_visited, 2)
+        self.assertEqual(UserProfile.objects.get(user=self.user).total_visits, 1)
+        daily = UserDailyActivity.objects.get(user=self.user, date=timezone.localdate())
+        self.assertEqual((daily.sessions, daily.pages_visited), (1, 3))
+
+    def test_events_are_dropped_after_repeated_failures(self):
+        self.buffer.record_page_view(self.session.pk, self.user.id)
+        with mock.patch.object(self.buffer, '_write_daily', side_effect=OperationalError('database is locked')):
+            for _ in range(MAX_FLUSH_ATTEMPTS):
+                self.buffer.flush()
+        self.assertEqual(self.buffer.flush(), 0)
+
+
+@requires_mongomock
+class ChangeFeedTests(TestCase):
+    """Catalog writes are stamped for /api/diseases/changes/"""
+
+    def setUp(self):
+        self.db = mongomock.MongoClient()['plant_diseases']
+
+    def write(self, document):
+        with catalog_write(self.db, document):
+            self.db.diseases.insert_one(document)
+        return document
+
+    def test_changes_come_in_sequence_order(self):
+        self.write(disease('Rust'))
+        self.write(disease('Blight'))
+        documents, tombstones, cursor, more = changes_since(self.db, 0, 10)
+        self.assertEqual([d['name'] for d in documents], ['Rust', 'Blight'])
+        self.assertEqual((tombstones, cursor, more), ([], 2, False))
+        self.assertEqual(changes_since(self.db, cursor, 10)[0], [])
+
+    def test_version_moves_after_the_write(self):
+        document = disease('Rust')
+        with catalog_write(self.db, document):
+            self.assertEqual(get_version(self.db), 0)
+            self.db.diseases.insert_one(document)
+        self.assertEqual(get_version(self.db), 1)
+
+    def test_write_in_flight_holds_back_later_changes(self):
+        slow = disease('Slow')
+        with catalog_write(self.db, slow):
+            self.write(disease('Fast'))
+            documents, _, cursor, _ = changes_since(self.db, 0, 10)
+            self.assertEqual((documents, cursor), ([], 0))
+            self.db.diseases.insert_one(slow)
+        documents, _, cursor, _ = changes_since(self.db, 0, 10)
+        self.assertEqual([d['name'] for d in documents], ['Slow', 'Fast'])
+
+    def test_slow_write_is_delivered_after_later_writes_publish(self):
+        slow = disease('Slow')
+        with catalog_write(self.db, slow):
+            self.write(disease('B'))
+            self.write(disease('C'))
+            documents, _, cursor, _ = changes_since(self.db, 0, 10)
+            self.assertEqual((documents, cursor), ([], 0))
+            self.db.diseases.insert_one(slow)
+        documents, _, cursor, _ = changes_since(self.db, 0, 10)
+        self.assertEqual([d['name'] for d in documents], ['Slow', 'B', 'C'])
+        self.assertEqual(cursor, 3)
+
+    def test_failed_write_releases_its_reservation(self):
+        with self.assertRaises(RuntimeError):
+            with catalog_write(self.db, disease('Lost')):
+                raise RuntimeError
+        self.write(disease('Rust'))
+        self.assertEqual([d['name'] for d in changes_since(self.db, 0, 10)[0]], ['Rust'])
+
+    def test_deletions_are_tombstoned(self):
+        rust = self.write(disease('Rust'))
+        self.db.diseases.delete_one({'_id': rust['_id']})
+        record_deletions(self.db, [rust])
+        _, tombstones, cursor, _ = changes_since(self.db, 1, 10)
+        self.assertEqual([(t['document_id'], t['name']) for t in tombstones], [(rust['_id'], 'Rust')])
+        self.assertEqual(cursor, 2)
+
+    def test_endpoint_pages_through_changes(self):
+        for i in range(5):
+            self.write(disease(f'Disease {i}'))
+        with mock.patch.object(views, 'db', self.db), override_settings(ALLOWED_HOSTS=['testserver']):
+            first = self.client.get('/api/diseases/changes/', {'since': 0, 'limit': 3}).json()
+            rest = self.client.get('/api/diseases/changes/', {'since': first['cursor'], 'limit': 3}).json()
+            invalid = self.client.get('/api/diseases/changes/', {'since': 'x'})
+        self.assertEqual([c['name'] for c in first['changes']], ['Disease 0', 'Disease 1', 'Disease 2'])
+        self.assertTrue(first['more'])
+        self.assertEqual([c['name'] for c in rest['changes']], ['Disease 3', 'Disease 4'])
+        self.assertFalse(rest['more'])
+        self.assertEqual(invalid.status_code, 400)
+
+
+@requires_mongomock
+class NdjsonExportTests(SimpleTestCase):
+    """The Flask app's NDJSON export answers 304 while the catalog version is unchanged"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        try:
+            import flask  # noqa: F401
+        except ImportError:
+            raise unittest.SkipTest('Flask is not installed')
+        path = settings.BASE_DIR / 'simple_plant_app' / 'web' / 'app.py'
+        spec = importlib.util.spec_from_file_location('simple_plant_web_app', path)
+        cls.app = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(cls.app)
+
+    def setUp(self):
+        self.db = mongomock.MongoClient()['plant_diseases']
+        documents = [disease('Rust'), disease('Leaf Spot')]
+        with catalog_write(self.db, documents):
+            self.db.diseases.insert_many(documents)
+        database = self.app.db
+        for attribute, value in (('db', self.db), ('collection', self.db.diseases)):
+            patcher = mock.patch.object(database, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = self.app.app.test_client()
+
+    def export(self, **headers):
+        return self.client.get('/api/diseases?format=ndjson', headers=headers)
+
+    def test_streams_one_document_per_line(self):
+        response = self.export()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['Rust', 'Leaf Spot'])
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.export().headers['ETag']
+        with mock.patch.object(self.app.db, 'iter_diseases') as iter_diseases:
+            response = self.export(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        iter_diseases.assert_not_called()
+
+    def test_write_changes_the_etag(self):
+        etag = self.export().headers['ETag']
+        document = disease('Blight')
+        with catalog_write(self.db, document):
+            self.db.diseases.insert_one(document)
+        response = self.export(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+
+@requires_mongomock
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class CatalogSnapshotTests(SimpleTestCase):
+    """Snapshots are content hashed, linked only while current, and served per Accept-Encoding"""
+
+    def setUp(self):
+        self.db = mongomock.MongoClient()['plant_diseases']
+        documents = [disease('Rust'), disease('Leaf Spot'), disease('rust ', 'A duplicate name')]
+        with catalog_write(self.db, documents):
+            self.db.diseases.insert_many(documents)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(CATALOG_SNAPSHOT_DIR=directory.name))
+        self.enterContext(mock.patch.object(snapshot, '_version_cache', LocalCache(ttl=60, max_entries=1)))
+        self.enterContext(mock.patch.dict(snapshot._manifest_cache, mtime=None, manifest=None))
+        self.manifest = snapshot.write_snapshot(self.db)
+
+    def read(self, manifest):
+        return json.loads(gzip.decompress(snapshot.snapshot_path(manifest['hash']).read_bytes()))
+
+    def test_snapshot_holds_sorted_unique_names(self):
+        data = self.read(self.manifest)
+        self.assertEqual(data['keys'], ['leaf spot', 'rust'])
+        self.assertEqual([d['disease'] for d in data['diseases']], ['Leaf Spot', 'Rust'])
+        self.assertEqual(data['version'], get_version(self.db))
+
+    def test_unchanged_catalog_keeps_its_file(self):
+        self.assertEqual(snapshot.write_snapshot(self.db)['file'], self.manifest['file'])
+
+    def test_only_a_current_snapshot_is_live(self):
+        self.assertEqual(snapshot.live_snapshot(self.db), self.manifest)
+        document = disease('Blight')
+        with catalog_write(self.db, document):
+            self.db.diseases.insert_one(document)
+        snapshot._version_cache.clear()
+        self.assertIsNone(snapshot.live_snapshot(self.db))
+
+    def test_failed_version_read_is_cached(self):
+        with mock.patch.object(snapshot, 'get_version', side_effect=PyMongoError('down')) as get:
+            self.assertIsNone(snapshot.live_snapshot(self.db))
+            self.assertIsNone(snapshot.live_snapshot(self.db))
+        self.assertEqual(get.call_count, 1)
+
+    def get(self, accept_encoding=None):
+        headers = {} if accept_encoding is None else {'HTTP_ACCEPT_ENCODING': accept_encoding}
+        return self.client.get(f'/catalog/snapshot-{self.manifest["hash"]}.json', **headers)
+
+    def test_served_compressed_when_gzip_is_accepted(self):
+        for accept_encoding in ('gzip, deflate, br', 'br;q=1.0, gzip;q=0.8', '*'):
+            response = self.get(accept_encoding)
+            self.assertEqual(response['Content-Encoding'], 'gzip', accept_encoding)
+            self.assertEqual(json.loads(gzip.decompress(response.content)), self.read(self.manifest))
+
+    def test_served_decompressed_when_gzip_is_refused(self):
+        for accept_encoding in (None, 'identity', 'gzip;q=0', 'gzip; q=0.0, br', '*;q=0'):
+            response = self.get(accept_encoding)
+            self.assertFalse(response.has_header('Content-Encoding'), accept_encoding)
+            self.assertEqual(json.loads(response.content), self.read(self.manifest))
+            self.assertIn('Accept-Encoding', response['Vary'])
+
+
+@requires_mongomock
+class SolutionStatisticsTests(SimpleTestCase):
+    """The Flask dashboard's solution counts are cached per catalog version"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        path = settings.BASE_DIR / 'simple_plant_app' / 'database' / 'statistics.py'
+        spec = importlib.util.spec_from_file_location('simple_plant_statistics', path)
+        cls.statistics = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(cls.statistics)
+
+    def setUp(self):
+        self.db = mongomock.MongoClient()['plant_diseases']
+        self.write(disease('Rust'))
+        self.counts = self.statistics.SolutionStatistics()
+
+    def write(self, document):
+        with catalog_write(self.db, document):
+            self.db.diseases.insert_one(document)
+
+    def get(self):
+        return self.counts.get(self.db.diseases, get_version(self.db))
+
+    def test_counts_by_type_and_effectiveness(self):
+        solutions = [{'type': 'inorganic'}, {'type': 'organic', 'effectiveness': 'Low'}]
+        self.write(dict(disease('Blight'), solutions=solutions))
+        stats = self.get()
+        self.assertEqual(stats['by_type'], {'organic': 2, 'inorganic': 1})
+        self.assertEqual(stats['by_effectiveness'], {'High': 1, 'Low': 1, 'Unknown': 1})
+        self.assertEqual(stats['total_solutions'], 3)
+
+    def test_cached_until_the_version_changes(self):
+        self.assertEqual(self.get()['total_solutions'], 1)
+        # Bypasses catalog_write, so the version (and the cached counts) stay
+        self.db.diseases.insert_one(disease('Leaf Spot'))
+        self.assertEqual(self.get()['total_solutions'], 1)
+        self.write(disease('Blight'))
+        self.assertEqual(self.get()['total_solutions'], 3)
+
+
+@requires_mongomock
+class SeedTests(SimpleTestCase):
+    """apply_seed() in upsert and swap mode"""
+
+    def setUp(self):
+        self.db = mongomock.MongoClient()['plant_diseases']
+        self.collection = self.db.diseases
+        _, self.seed = seed_documents()
+
+    def test_upsert_writes_only_changed_diseases(self):
+        self.assertEqual(apply_seed(self.collection)['written'], len(self.seed))
+        self.collection.update_one({'name_key': self.seed[1]['name_key']}, {'$set': {'seed_hash': 'stale'}})
+
+        summary = apply_seed(self.collection)
+        self.assertEqual((summary['written'], summary['unchanged']), (1, len(self.seed) - 1))
+        self.assertEqual(apply_seed(self.collection)['written'], 0)
+
+    def test_upsert_leaves_diseases_the_seed_does_not_own(self):
+        apply_seed(self.collection)
+        edited, manual = self.seed[0]['name_key'], self.seed[1]['name_key']
+        # Edited by hand: the seed hash is gone; added by hand: flagged
+        self.collection.update_one({'name_key': edited}, {'$set': {'description': 'mine'}, '$unset': {'seed_hash': ''}})
+        self.collection.update_one(
+            {'name_key': manual}, {'$set': {'description': 'mine', 'added_manually': True, 'seed_hash': 'stale'}},
+        )
+
+        summary = apply_seed(self.collection)
+        self.assertEqual((summary['written'], summary['skipped']), (0, 2))
+        for name_key in (edited, manual):
+            self.assertEqual(self.collection.find_one({'name_key': name_key})['description'], 'mine')
+
+    def test_upsert_adds_deleted_seed_diseases_back(self):
+        apply_seed(self.collection)
+        self.collection.delete_one({'name_key': self.seed[0]['name_key']})
+        self.assertEqual(apply_seed(self.collection)['written'], 1)
+
+    def test_swap_replaces_the_collection(self):
+        kept = self.collection.insert_one(dict(self.seed[0], description='edited')).inserted_id
+        removed = self.collection.insert_one(disease('Not In Seed')).inserted_id
+        self.collection.create_index('name_key', unique=True, name='name_key_unique')
+
+        summary = apply_seed(self.collection, swap=True)
+
+        self.assertEqual(summary['written'], len(self.seed))
+        self.assertEqual(self.collection.count_documents({}), len(self.seed))
+        # Existing diseases keep their _id, so links to them stay valid
+        restored = self.collection.find_one({'_id': kept})
+        self.assertEqual(restored['description'], self.seed[0]['description'])
+        self.assertIsNone(self.collection.find_one({'_id': removed}))
+        self.assertIn('name_key_unique', self.collection.index_information())
+        self.assertIsNone(self.db.diseases_seed_staging.find_one())
+
+    def test_swap_is_visible_to_sync_clients(self):
+        removed = self.collection.insert_one(disease('Not In Seed')).inserted_id
+        apply_seed(self.collection, swap=True)
+        documents, tombstones, _, _ = changes_since(self.db, 0, 1000)
+        self.assertEqual(len(documents), len(self.seed))
+        self.assertEqual([t['document_id'] for t in tombstones], [removed])
+
+
+class Interrupted(Exception):
+    pass
+
+
+@requires_mongomock
+class SchemaMigrationTests(SimpleTestCase):
+    """run_migration() converts old-schema diseases in checkpointed batches"""
+
+    def setUp(self):
+        self.db = mongomock.MongoClient()['plant_diseases']
+        self.collection = self.db.diseases
+
+    def old(self, name, **fields):
+        return self.collection.insert_one(dict(fields, disease_name=name)).inserted_id
+
+    def test_converts_old_documents(self):
+        ids = [self.old('Leaf Curl', pesticides='Copper spray'), self.old('Canker', fertilisers='Compost')]
+        progress = run_migration(self.collection, batch_size=1)
+
+        self.assertEqual((progress.migrated, progress.batches, progress.failed), (2, 2, 0))
+        self.assertEqual(self.collection.count_documents(OLD_SCHEMA_FILTER), 0)
+        curl = self.collection.find_one({'_id': ids[0]})
+        self.assertEqual((curl['name'], curl['name_key']), ('leaf curl', 'leaf curl'))
+        self.assertEqual(curl['solutions'][0], {
+            'type': 'inorganic', 'solution': 'Copper spray', 'effectiveness': 'High',
+            'application': 'Apply according to label instructions',
+        })
+        self.assertEqual(get_checkpoint(self.db), ids[-1])
+
+    def test_duplicate_names_merge_into_the_existing_disease(self):
+        existing = self.collection.insert_one(dict(disease('anthracnose'), name_key='anthracnose')).inserted_id
+        old = self.old('Anthracnose', pesticides='Copper fungicide')
+        # Two old documents for a disease not yet migrated: the second merges into the first
+        first_rot = self.old('Root Rot', fertilisers='Compost')
+        second_rot = self.old('root rot', pesticides='Fungicide X')
+
+        progress = run_migration(self.collection)
+
+        self.assertEqual((progress.migrated, progress.merged, progress.failed), (1, 2, 0))
+        self.assertIsNone(self.collection.find_one({'_id': old}))
+        self.assertIsNone(self.collection.find_one({'_id': second_rot}))
+        anthracnose = self.collection.find_one({'_id': existing})
+        self.assertEqual(
+            [s['solution'] for s in anthracnose['solutions']],
+            ['Remove affected leaves', 'Copper fungicide'],
+        )
+        root_rot = self.collection.find_one({'_id': first_rot})
+        self.assertEqual([s['solution'] for s in root_rot['solutions']], ['Apply compost', 'Fungicide X'])
+        _, tombstones, _, _ = changes_since(self.db, 0, 100)
+        self.assertEqual({t['document_id'] for t in tombstones}, {old, second_rot})
+
+    def test_failed_documents_are_retried_by_the_next_run(self):
+        broken = self.old(123)
+        self.old('Canker')
+        progress = run_migration(self.collection)
+        self.assertEqual((progress.migrated, progress.failed), (1, 1))
+        self.assertEqual(get_failed_ids(self.db), [broken])
+
+        self.collection.update_one({'_id': broken}, {'$set': {'disease_name': 'Fixed'}})
+        progress = run_migration(self.collection)
+        self.assertEqual((progress.migrated, progress.failed), (1, 0))
+        self.assertEqual(get_failed_ids(self.db), [])
+        self.assertEqual(self.collection.find_one({'_id': broken})['name'], 'fixed')
+
+    def test_interrupted_run_resumes_after_the_checkpoint(self):
+        ids = [self.old(f'Disease {i}') for i in range(5)]
+
+        def stop(progress):
+            raise Interrupted
+
+        with self.assertRaises(Interrupted):
+            run_migration(self.collection, batch_size=2, on_batch=stop)
+        self.assertEqual(get_checkpoint(self.db), ids[1])
+
+        progress = run_migration(self.collection, batch_size=2)
+        self.assertEqual(progress.resumed_from, ids[1])
+        self.assertEqual((progress.scanned, progress.migrated), (3, 3))
+        self.assertEqual(self.collection.count_documents(OLD_SCHEMA_FILTER), 0)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class TrackingConcurrencyTests(TransactionTestCase):
+    """UserTrackingMiddleware under concurrent clients loses no writes
+
+    A TransactionTestCase so each client thread commits through its own
+    connection to the test database, as concurrent requests do in production.
+    """
+
+    threads = 6
+    requests = 40
+    visit_every = 10  # start a new visit every N requests
+    path = '/profile/'
+
+    def run_client(self, user, start, failures, lock):
+        cookie_name = getattr(settings, 'USER_TRACKING_COOKIE_NAME', 'plants_visit')
+        try:
+            client = Client()
+            client.force_login(user)
+            start.wait()
+            for i in range(self.requests):
+                if i and i % self.visit_every == 0:
+                    # New visit: drop the tracking cookie and log in again for a new session key
+                    client.cookies.pop(cookie_name, None)
+                    client.logout()
+                    client.force_login(user)
+                response = client.get(self.path)
+                if response.status_code != 200:
+                    with lock:
+                        failures.append(f'HTTP {response.status_code}')
+        except threading.BrokenBarrierError:
+            pass
+        except Exception as e:
+            # Release the other clients if this one never reached the start line
+            start.abort()
+            with lock:
+                failures.append(f'{type(e).__name__}: {e}')
+        finally:
+            connection.close()
+
+    def test_no_tracking_writes_lost(self):
+        users = [User.objects.create_user(f'stress{i}') for i in range(self.threads)]
+        failures = []
+        lock = threading.Lock()
+        start = threading.Barrier(len(users))
+        clients = [
+            threading.Thread(target=self.run_client, args=(user, start, failures, lock))
+            for user in users
+        ]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        # Write out everything the buffer still holds before counting
+        buffer.flush()
+
+        self.assertEqual(failures, [])
+        sessions = UserSession.objects.filter(user__in=users)
+        self.assertEqual(sessions.count(), self.threads * -(-self.requests // self.visit_every))
+        self.assertEqual(sessions.aggregate(total=Sum('pages_visited'))['total'], self.threads * self.requests)
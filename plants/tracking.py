@@ -0,0 +1,239 @@
+"""
+Write-behind buffer for user tracking data.
+
+UserTrackingMiddleware records page views and time spent here instead of
+writing to the database on every request. A background thread flushes the
+accumulated deltas in one transaction, with a single bulk UPDATE per table
+built from F() expressions, whenever the flush interval elapses or the
+number of pending events reaches the threshold. The same flush keeps the
+UserDailyActivity rollup and UserProfile.total_session_duration up to date. A flush that fails (e.g. "database is
+locked") puts its deltas back to be retried with the next one; after
+MAX_FLUSH_ATTEMPTS failures in a row they are dropped.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import UserDailyActivity, UserProfile, UserSession
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 10  # seconds
+DEFAULT_FLUSH_THRESHOLD = 50  # pending events
+# Consecutive failed flushes after which the held deltas are dropped
+MAX_FLUSH_ATTEMPTS = 5
+
+
+def _case(values, field='pk'):
+    """Build a CASE expression mapping each key in ``values`` to its value"""
+    return Case(
+        *[When(**{field: key}, then=Value(value)) for key, value in values.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+class TrackingBuffer:
+    """Accumulates tracking deltas in memory and flushes them in batches"""
+
+    def __init__(self, flush_interval=DEFAULT_FLUSH_INTERVAL, flush_threshold=DEFAULT_FLUSH_THRESHOLD):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._failed_attempts = 0
+        self._reset()
+
+    def _reset(self):
+        self._pages = {}       # session id -> pages visited since last flush
+        self._durations = {}   # session id -> latest session duration
+        self._visits = {}      # user id -> new visits since last flush
+        self._time_spent = {}  # user id -> seconds spent since last flush
+        self._last_visit = {}  # user id -> time of the latest new visit
+        self._daily = {}       # (user id, date) -> [sessions, duration, pages]
+        self._pending = 0
+
+    def _add_daily(self, user_id, sessions=0, duration=0, pages=0):
+        totals = self._daily.setdefault((user_id, timezone.localdate()), [0, 0, 0])
+        totals[0] += sessions
+        totals[1] += duration
+        totals[2] += pages
+
+    def record_visit(self, user_id):
+        """Count a new visit (session) for a user"""
+        with self._lock:
+            self._visits[user_id] = self._visits.get(user_id, 0) + 1
+            self._last_visit[user_id] = timezone.now()
+            self._add_daily(user_id, sessions=1, pages=1)
+            self._pending += 1
+        self._schedule()
+
+    def record_page_view(self, session_id, user_id):
+        """Count one more page visited in a tracked session"""
+        with self._lock:
+            self._pages[session_id] = self._pages.get(session_id, 0) + 1
+            self._add_daily(user_id, pages=1)
+            self._pending += 1
+        self._schedule()
+
+    def record_duration(self, session_id, user_id, duration, added, time_spent):
+        """Record a session's current duration, the seconds ``added`` to it and the active time spent"""
+        with self._lock:
+            self._durations[session_id] = max(duration, self._durations.get(session_id, 0))
+            self._add_daily(user_id, duration=added)
+            if time_spent > 0:
+                self._time_spent[user_id] = self._time_spent.get(user_id, 0) + time_spent
+            self._pending += 1
+        self._schedule()
+
+    def _schedule(self):
+        """Wake the flusher when enough events are pending"""
+        if self.flush_interval <= 0:
+            self.flush()
+            return
+        if self._thread is None:
+            self._start()
+        if self._pending >= self.flush_threshold:
+            self._wakeup.set()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='tracking-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Write all pending deltas to the database"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                pages, durations = self._pages, self._durations
+                visits, time_spent, last_visit = self._visits, self._time_spent, self._last_visit
+                daily = self._daily
+                pending = self._pending
+                self._reset()
+
+            try:
+                with transaction.atomic():
+                    self._write_sessions(pages, durations)
+                    self._write_profiles(visits, time_spent, last_visit, daily)
+                    self._write_daily(daily)
+            except Exception as e:
+                self._failed_attempts += 1
+                if self._failed_attempts >= MAX_FLUSH_ATTEMPTS:
+                    # Tracking is best effort; drop the batch rather than retry forever
+                    logger.error(f"UserTrackingMiddleware flush failed, dropping {pending} events: {e}")
+                    self._failed_attempts = 0
+                else:
+                    logger.warning(f"UserTrackingMiddleware flush failed, will retry: {e}")
+                    self._restore(pages, durations, visits, time_spent, last_visit, daily, pending)
+                return 0
+            self._failed_attempts = 0
+            return pending
+
+    def _restore(self, pages, durations, visits, time_spent, last_visit, daily, pending):
+        """Merge the deltas of a failed flush back in with those recorded since"""
+        with self._lock:
+            for session_id, count in pages.items():
+                self._pages[session_id] = self._pages.get(session_id, 0) + count
+            for session_id, duration in durations.items():
+                self._durations[session_id] = max(duration, self._durations.get(session_id, 0))
+            for user_id, count in visits.items():
+                self._visits[user_id] = self._visits.get(user_id, 0) + count
+            for user_id, seconds in time_spent.items():
+                self._time_spent[user_id] = self._time_spent.get(user_id, 0) + seconds
+            for user_id, when in last_visit.items():
+                self._last_visit[user_id] = max(when, self._last_visit.get(user_id, when))
+            for key, totals in daily.items():
+                current = self._daily.setdefault(key, [0, 0, 0])
+                for i, value in enumerate(totals):
+                    current[i] += value
+            self._pending += pending
+
+    def _write_sessions(self, pages, durations):
+        session_ids = pages.keys() | durations.keys()
+        if not session_ids:
+            return
+        updates = {}
+        if pages:
+            updates['pages_visited'] = F('pages_visited') + _case(pages)
+        if durations:
+            updates['duration'] = Greatest('duration', _case(durations))
+        UserSession.objects.filter(pk__in=session_ids).update(**updates)
+
+    def _write_profiles(self, visits, time_spent, last_visit, daily):
+        # Seconds added to the user's sessions, the same deltas the daily rollup gets
+        session_time = {}
+        for (user_id, _), totals in daily.items():
+            if totals[1]:
+                session_time[user_id] = session_time.get(user_id, 0) + totals[1]
+        user_ids = visits.keys() | time_spent.keys() | session_time.keys()
+        if not user_ids:
+            return
+
+        existing = set(UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        UserProfile.objects.bulk_create([
+            UserProfile(user_id=user_id, total_visits=0, total_time_spent=0)
+            for user_id in user_ids - existing
+        ], ignore_conflicts=True)
+
+        updates = {}
+        if visits:
+            updates['total_visits'] = F('total_visits') + _case(visits, 'user_id')
+        if time_spent:
+            updates['total_time_spent'] = F('total_time_spent') + _case(time_spent, 'user_id')
+        if session_time:
+            updates['total_session_duration'] = F('total_session_duration') + _case(session_time, 'user_id')
+        if last_visit:
+            updates['last_visit'] = Case(
+                *[When(user_id=user_id, then=Value(when)) for user_id, when in last_visit.items()],
+                default=F('last_visit'),
+            )
+        UserProfile.objects.filter(user_id__in=user_ids).update(**updates)
+
+    def _write_daily(self, daily):
+        if not daily:
+            return
+
+        # Make sure every (user, date) row exists, then add the deltas in one UPDATE
+        UserDailyActivity.objects.bulk_create([
+            UserDailyActivity(user_id=user_id, date=date) for user_id, date in daily
+        ], ignore_conflicts=True)
+        rows = UserDailyActivity.objects.filter(
+            user_id__in={user_id for user_id, _ in daily},
+            date__in={date for _, date in daily},
+        ).values_list('pk', 'user_id', 'date')
+        pks = {(user_id, date): pk for pk, user_id, date in rows}
+
+        deltas = {pks[key]: totals for key, totals in daily.items() if key in pks}
+        UserDailyActivity.objects.filter(pk__in=deltas.keys()).update(
+            sessions=F('sessions') + _case({pk: t[0] for pk, t in deltas.items()}),
+            duration=F('duration') + _case({pk: t[1] for pk, t in deltas.items()}),
+            pages_visited=F('pages_visited') + _case({pk: t[2] for pk, t in deltas.items()}),
+        )
+
+
+buffer = TrackingBuffer(
+    flush_interval=getattr(settings, 'USER_TRACKING_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL),
+    flush_threshold=getattr(settings, 'USER_TRACKING_FLUSH_THRESHOLD', DEFAULT_FLUSH_THRESHOLD),
+)
+atexit.register(buffer.flush)
@@ -0,0 +1,97 @@
+"""
+Per-visit tracking state for UserTrackingMiddleware, kept out of the session.
+
+The middleware needs a little state between requests (the UserSession row
+of the current visit, its start time and the duration already recorded).
+Storing it in ``request.session`` made every page view rewrite the
+``django_session`` row; these stores keep it elsewhere so the session is
+only saved when the auth state changes.
+
+Configuration (Django settings):
+
+    USER_TRACKING_STORE        'cookie' (default) or 'memory'
+    USER_TRACKING_COOKIE_NAME  cookie used by the cookie store (default 'plants_visit')
+    USER_TRACKING_STATE_TTL    seconds an idle visit is kept by the memory store
+                               (default SESSION_COOKIE_AGE)
+    USER_TRACKING_STATE_MAX_ENTRIES  LRU size of the memory store (default 10000)
+
+The cookie store is signed with SECRET_KEY and works across processes. The
+memory store sends nothing to the browser but is per process, so with
+several workers a user's requests may be counted as separate visits.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+
+from .search_cache import LocalCache
+
+COOKIE_SALT = 'plants.tracking'
+
+
+def _session_id(request):
+    """Short, non-reversible id of the session the visit belongs to"""
+    session_key = request.session.session_key or ''
+    return hashlib.sha256(session_key.encode()).hexdigest()[:16]
+
+
+class CookieTrackingStore:
+    """Keeps the visit state in a signed browser-session cookie"""
+
+    def __init__(self, cookie_name):
+        self.cookie_name = cookie_name
+
+    def load(self, request, user):
+        value = request.get_signed_cookie(self.cookie_name, default=None, salt=COOKIE_SALT)
+        if value is None:
+            return None
+        try:
+            state = json.loads(value)
+        except ValueError:
+            return None
+        # A cookie left by another user or login session starts a new visit
+        if state.get('user') != user.id or state.get('sid') != _session_id(request):
+            return None
+        return state
+
+    def save(self, request, response, user, state):
+        state = dict(state, user=user.id, sid=_session_id(request))
+        response.set_signed_cookie(
+            self.cookie_name,
+            json.dumps(state, separators=(',', ':')),
+            salt=COOKIE_SALT,
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite=settings.SESSION_COOKIE_SAMESITE,
+        )
+
+
+class MemoryTrackingStore:
+    """Keeps the visit state in a process-local LRU, keyed by session and user"""
+
+    def __init__(self, ttl, max_entries):
+        self.cache = LocalCache(ttl, max_entries)
+
+    def _key(self, request, user):
+        return (_session_id(request), user.id)
+
+    def load(self, request, user):
+        state = self.cache.get(self._key(request, user))
+        # Copied so concurrent requests don't mutate the cached dict
+        return dict(state) if state is not None else None
+
+    def save(self, request, response, user, state):
+        self.cache.set(self._key(request, user), dict(state))
+
+
+def get_tracking_store():
+    """Build the tracking store configured by the USER_TRACKING_* settings"""
+    backend = getattr(settings, 'USER_TRACKING_STORE', 'cookie')
+    if backend == 'cookie':
+        return CookieTrackingStore(getattr(settings, 'USER_TRACKING_COOKIE_NAME', 'plants_visit'))
+    if backend == 'memory':
+        return MemoryTrackingStore(
+            getattr(settings, 'USER_TRACKING_STATE_TTL', settings.SESSION_COOKIE_AGE),
+            getattr(settings, 'USER_TRACKING_STATE_MAX_ENTRIES', 10000),
+        )
+    raise ValueError(f"Unknown USER_TRACKING_STORE: {backend!r}")
@@ -1,6 +1,13 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import path, re_path
 from . import views
 
+# MongoDB-backed views: async (for ASGI) or sync
+if getattr(settings, 'PLANTS_ASYNC_VIEWS', False):
+    from . import async_views as mongo_views
+else:
+    mongo_views = views
+
 app_name = 'plants'
 
 urlpatterns = [
@@ -9,8 +16,12 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('', views.index, name='index'),
     path('profile/', views.profile_view, name='profile'),
-    path('database/', views.view_database, name='database'),
-    path('add-disease/', views.add_disease_form, name='add_disease'),
-    path('search/', views.search_disease, name='search'),
+    path('database/', mongo_views.view_database, name='database'),
+    path('add-disease/', mongo_views.add_disease_form, name='add_disease'),
+    path('search/', mongo_views.search_disease, name='search'),
+    path('search/batch/', views.search_batch, name='search_batch'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
+    re_path(r'^catalog/snapshot-(?P<digest>[0-9a-f]{16})\.json$', views.catalog_snapshot, name='catalog_snapshot'),
+    path('api/diseases/changes/', mongo_views.disease_changes, name='disease_changes'),
     path('reset-db/', views.reset_database, name='reset_db'),
 ]
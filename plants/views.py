@@ -1,5 +1,8 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.urls import reverse
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth import authenticate, login, logout
@@ -9,27 +12,86 @@ from django.contrib import messages
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.db.models import Sum, Count
+from django.utils.cache import patch_vary_headers
 from .models import UserProfile, UserSession
+from .stats import get_activity_stats
+from .search_cache import get_search_cache
+from .catalog import catalog_write, changes_since, get_version
+from .disease_index import VERSION_CHECK_TTL, normalize_name, with_name_key
+from .search_engine import SUGGEST_LIMIT, DiseaseSearchEngine, clamp_limit, solution_payload
+from .seed import apply_seed
+from .snapshot import live_snapshot, snapshot_path
+from .pageviews import no_tracking, track_pageview
+import base64
+import gzip
 import json
-from pymongo import MongoClient
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import PyMongoError
+from .mongo import get_db
 import logging
+import threading
 
 # MongoDB connection
 logger = logging.getLogger(__name__)
 
-try:
-    print("🔄 Attempting MongoDB connection...")
-    client = MongoClient('mongodb://localhost:27017/')
-    client.admin.command('ping')
-    print("✅ Successfully connected to MongoDB!")
-    logger.info("✅ Successfully connected to MongoDB!")
-    db = client['plant_diseases']
-    print(f"📊 Database: {db.name}")
-except Exception as e:
-    print(f"❌ MongoDB connection failed: {e}")
-    logger.error(f"❌ MongoDB connection failed: {e}")
-    db = None
+# Lazily connected handle from the shared provider; no I/O happens at import
+db = get_db()
+
+# In-memory name index so searches don't scan the collection on every request;
+# each disease's search response is serialized once, when the index is built
+disease_index = DiseaseSearchEngine(render=solution_payload)
+
+def refresh_disease_index():
+    """Rebuild the disease name index from MongoDB"""
+    try:
+        disease_index.refresh(db.diseases, get_version(db))
+        logger.info(f"📇 Disease index built with {len(disease_index)} diseases")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Failed to build disease index: {e}")
+        return False
+
+def ensure_disease_index():
+    """Load the index, reloading it when another process or a CLI tool changed the catalog
+
+    The catalog version is checked at most every DISEASE_INDEX_VERSION_TTL
+    seconds, which bounds how stale a worker's index can get.
+    """
+    try:
+        disease_index.ensure_current(
+            db.diseases, lambda: get_version(db),
+            getattr(settings, 'DISEASE_INDEX_VERSION_TTL', VERSION_CHECK_TTL),
+        )
+        return True
+    except Exception as e:
+        logger.error(f"❌ Failed to build disease index: {e}")
+        return False
+
+# Build the index in the background so a slow MongoDB never delays startup
+threading.Thread(target=refresh_disease_index, name='disease-index-warmup', daemon=True).start()
+
+# Cached search responses, keyed by normalized query
+search_cache = get_search_cache()
+
+def catalog_changed():
+    """Refresh derived search state after any write to the diseases collection"""
+    refresh_disease_index()
+    search_cache.invalidate()
+
+# /database/ page settings
+DATABASE_PAGE_SIZE = 24
+DATABASE_STREAM_CHUNK_SIZE = 50
+DATABASE_CARDS_MARKER = '<!-- disease-cards -->'
+# Only the fields database.html displays
+DATABASE_CARD_PROJECTION = {
+    'name': 1,
+    'description': 1,
+    'solutions.type': 1,
+    'solutions.solution': 1,
+    'solutions.effectiveness': 1,
+    'solutions.application': 1,
+}
 
 def login_view(request):
     """Render the login page"""
@@ -131,11 +193,59 @@ def logout_view(request):
     messages.success(request, 'You have been logged out successfully.')
     return redirect('plants:login')
 
+@track_pageview
 @login_required
 def index(request):
     """Render the main page"""
-    return render(request, 'plants/index.html')
-
+    context = {}
+    # A stale snapshot is not linked; the page then searches on the server
+    snapshot = live_snapshot(db)
+    if snapshot:
+        context['snapshot_url'] = reverse('plants:catalog_snapshot', args=[snapshot['hash']])
+    return render(request, 'plants/index.html', context)
+
+# Snapshot URLs are content hashed, so a response never needs revalidating
+SNAPSHOT_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+def _accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header allows gzip; ``q=0`` refuses it"""
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    quality = qualities.get('gzip', qualities.get('x-gzip', qualities.get('*', 0.0)))
+    return quality > 0
+
+@no_tracking
+@require_http_methods(["GET", "HEAD"])
+def catalog_snapshot(request, digest):
+    """Serve a catalog snapshot built by ``manage.py build_catalog_snapshot``"""
+    path = snapshot_path(digest)
+    if path is None:
+        raise Http404("Unknown catalog snapshot")
+    # Stored gzip-compressed; browsers decode it transparently, other clients get it decompressed
+    data = path.read_bytes()
+    if _accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        response = HttpResponse(data, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+        # Each encoding is a separate representation with its own ETag
+        response['ETag'] = f'"{digest}-gzip"'
+    else:
+        response = HttpResponse(gzip.decompress(data), content_type='application/json')
+        response['ETag'] = f'"{digest}"'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['Cache-Control'] = SNAPSHOT_CACHE_CONTROL
+    return response
+
+@track_pageview
 @login_required
 def profile_view(request):
     """User profile page with visit statistics"""
@@ -192,90 +302,24 @@ def profile_view(request):
             }
             formatted_sessions.append(session_dict)
 
-        # Calculate statistics
-        total_sessions = UserSession.objects.filter(user=request.user).count()
-        avg_session_duration = UserSession.objects.filter(
-            user=request.user,
-            duration__gt=0
-        ).aggregate(avg_duration=Sum('duration'))['avg_duration'] or 0
-
-        if total_sessions > 0 and avg_session_duration:
-            avg_session_duration = avg_session_duration // total_sessions
-        else:
-            avg_session_duration = 0
-
-        # Get recent activity (last 7 days)
-        week_ago = timezone.now() - timezone.timedelta(days=7)
-        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        yesterday = today - timezone.timedelta(days=1)
-
-        # Recent sessions (last 7 days)
-        recent_sessions = UserSession.objects.filter(
-            user=request.user,
-            session_start__gte=week_ago
-        ).count()
-
-        # Recent time spent (last 7 days)
-        recent_time = UserSession.objects.filter(
-            user=request.user,
-            session_start__gte=week_ago
-        ).aggregate(total_time=Sum('duration'))['total_time'] or 0
-
-        # Today's activity
-        today_sessions = UserSession.objects.filter(
-            user=request.user,
-            session_start__gte=today
-        ).count()
-
-        today_time = UserSession.objects.filter(
-            user=request.user,
-            session_start__gte=today
-        ).aggregate(total_time=Sum('duration'))['total_time'] or 0
-
-        # Yesterday's activity
-        yesterday_sessions = UserSession.objects.filter(
-            user=request.user,
-            session_start__gte=yesterday,
-            session_start__lt=today
-        ).count()
-
-        yesterday_time = UserSession.objects.filter(
-            user=request.user,
-            session_start__gte=yesterday,
-            session_start__lt=today
-        ).aggregate(total_time=Sum('duration'))['total_time'] or 0
+        # Visit statistics come from the daily rollup and the profile counters
+        stats = get_activity_stats(request.user, profile)
 
-        # Activity by day (last 7 days)
         daily_activity = []
-        for i in range(7):
-            day_start = today - timezone.timedelta(days=i)
-            day_end = day_start + timezone.timedelta(days=1)
-
-            day_sessions = UserSession.objects.filter(
-                user=request.user,
-                session_start__gte=day_start,
-                session_start__lt=day_end
-            ).count()
-
-            day_time = UserSession.objects.filter(
-                user=request.user,
-                session_start__gte=day_start,
-                session_start__lt=day_end
-            ).aggregate(total_time=Sum('duration'))['total_time'] or 0
-
+        for i, day in enumerate(stats['daily']):
             if i == 0:
                 day_name = "Today"
             elif i == 1:
                 day_name = "Yesterday"
             else:
-                day_name = day_start.strftime("%A")
+                day_name = day['date'].strftime("%A")
 
             daily_activity.append({
                 'day_name': day_name,
-                'date': day_start.strftime("%b %d"),
-                'sessions': day_sessions,
-                'time_spent': format_duration(day_time),
-                'has_activity': day_sessions > 0
+                'date': day['date'].strftime("%b %d"),
+                'sessions': day['sessions'],
+                'time_spent': format_duration(day['time']),
+                'has_activity': day['sessions'] > 0
             })
 
         # Calculate additional user stats
@@ -284,21 +328,21 @@ def profile_view(request):
         context = {
             'profile': profile,
             'sessions': formatted_sessions,
-            'total_sessions': total_sessions,
-            'avg_session_duration': format_duration(avg_session_duration),
+            'total_sessions': stats['total_sessions'],
+            'avg_session_duration': format_duration(stats['avg_session_duration']),
             'total_time_formatted': profile.get_total_time_formatted(),
-            'recent_sessions': recent_sessions,
-            'recent_time_formatted': format_duration(recent_time),
+            'recent_sessions': stats['recent_sessions'],
+            'recent_time_formatted': format_duration(stats['recent_time']),
             'member_since': request.user.date_joined,
             'days_since_joined': days_since_joined,
             'user_full_name': f"{request.user.first_name} {request.user.last_name}".strip() or request.user.username,
             # Enhanced recent activity data
-            'today_sessions': today_sessions,
-            'today_time_formatted': format_duration(today_time),
-            'yesterday_sessions': yesterday_sessions,
-            'yesterday_time_formatted': format_duration(yesterday_time),
+            'today_sessions': stats['today_sessions'],
+            'today_time_formatted': format_duration(stats['today_time']),
+            'yesterday_sessions': stats['yesterday_sessions'],
+            'yesterday_time_formatted': format_duration(stats['yesterday_time']),
             'daily_activity': daily_activity,
-            'has_recent_activity': recent_sessions > 0,
+            'has_recent_activity': stats['recent_sessions'] > 0,
         }
 
         return render(request, 'plants/profile.html', context)
@@ -307,70 +351,150 @@ def profile_view(request):
         messages.error(request, f'Error loading profile: {str(e)}')
         return redirect('plants:index')
 
-def view_database(request):
-    """View MongoDB database content"""
+def _encode_page_cursor(disease):
+    """Encode the (name, id) keyset position after ``disease`` as a URL token
+
+    Old-schema and unknown documents have no ``name``; MongoDB sorts them
+    first, as null, and the cursor records that as ``None``.
+    """
+    position = json.dumps([disease.get('name'), disease['id']])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+def _decode_page_cursor(token):
+    """Return the MongoDB filter for documents after a page cursor, or {}"""
+    if not token:
+        return {}
     try:
-        if db is None:
-            # Try to reconnect to MongoDB
-            try:
-                from pymongo import MongoClient
-                client = MongoClient('mongodb://localhost:27017/')
-                client.admin.command('ping')
-                db_temp = client['plant_diseases']
-                diseases = list(db_temp.diseases.find({}))
-
-                # Convert ObjectId to string and rename for template compatibility
-                for disease in diseases:
-                    if '_id' in disease:
-                        disease['id'] = str(disease['_id'])
-                        del disease['_id']
-
-                context = {
-                    'diseases': diseases,
-                    'total_diseases': len(diseases),
-                    'database_name': 'plant_diseases',
-                    'collection_name': 'diseases'
-                }
-                return render(request, 'plants/database.html', context)
-
-            except Exception as reconnect_error:
-                context = {
-                    'error': f"Database connection failed: {reconnect_error}",
-                    'diseases': [],
-                    'total_diseases': 0,
-                    'database_name': 'plant_diseases',
-                    'collection_name': 'diseases'
-                }
-                return render(request, 'plants/database.html', context)
-
-        # Get all diseases from MongoDB
-        diseases = list(db.diseases.find({}))
-
-        # Convert ObjectId to string and rename for template compatibility
-        for disease in diseases:
-            if '_id' in disease:
-                disease['id'] = str(disease['_id'])
-                del disease['_id']
+        name, object_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+        object_id = ObjectId(object_id)
+    except (ValueError, TypeError, InvalidId):
+        return {}
+    if name is None:
+        # Comparisons don't cross types, so "after null" is spelled out
+        return {"$or": [
+            {"name": None, "_id": {"$gt": object_id}},
+            {"name": {"$ne": None}},
+        ]}
+    return {"$or": [
+        {"name": {"$gt": name}},
+        {"name": name, "_id": {"$gt": object_id}},
+    ]}
+
+def _disease_card(disease):
+    """Rename ``_id`` to ``id`` for template compatibility"""
+    if '_id' in disease:
+        disease['id'] = str(disease.pop('_id'))
+    return disease
+
+def _stream_database(request, context, cursor):
+    """Render the database page, emitting disease cards in chunks as the cursor yields them"""
+    context.update({'streaming': True, 'cards_marker': DATABASE_CARDS_MARKER})
+    head, tail = render_to_string('plants/database.html', context, request).split(DATABASE_CARDS_MARKER, 1)
+    card_template = get_template('plants/partials/disease_card.html')
+
+    def render_cards():
+        yield head
+        chunk = []
+        try:
+            for disease in cursor.batch_size(DATABASE_STREAM_CHUNK_SIZE):
+                chunk.append(card_template.render({'disease': _disease_card(disease)}))
+                if len(chunk) >= DATABASE_STREAM_CHUNK_SIZE:
+                    yield ''.join(chunk)
+                    chunk = []
+        except Exception as e:
+            # Headers are already sent, so close the page instead of failing
+            logger.error(f"❌ Database stream interrupted: {e}")
+        if chunk:
+            yield ''.join(chunk)
+        yield tail
 
-        context = {
-            'diseases': diseases,
-            'total_diseases': len(diseases),
-            'database_name': 'plant_diseases',
-            'collection_name': 'diseases'
-        }
+    return StreamingHttpResponse(render_cards(), content_type='text/html; charset=utf-8')
 
+@track_pageview
+def view_database(request):
+    """View MongoDB database content, one keyset page at a time"""
+    context = {
+        'diseases': [],
+        'total_diseases': 0,
+        'database_name': 'plant_diseases',
+        'collection_name': 'diseases'
+    }
+    try:
+        context['total_diseases'] = db.diseases.estimated_document_count()
+
+        # Keyset pagination on (name, _id), fetching only the fields the page shows
+        page_cursor = request.GET.get('cursor')
+        cursor = db.diseases.find(
+            _decode_page_cursor(page_cursor),
+            DATABASE_CARD_PROJECTION
+        ).sort([('name', 1), ('_id', 1)])
+
+        if request.GET.get('stream'):
+            return _stream_database(request, context, cursor)
+
+        page_size = getattr(settings, 'DATABASE_PAGE_SIZE', DATABASE_PAGE_SIZE)
+        diseases = [_disease_card(disease) for disease in cursor.limit(page_size + 1)]
+        if len(diseases) > page_size:
+            diseases = diseases[:page_size]
+            context['next_cursor'] = _encode_page_cursor(diseases[-1])
+
+        context['diseases'] = diseases
+        context['is_paginated'] = bool(page_cursor)
         return render(request, 'plants/database.html', context)
 
+    except PyMongoError as e:
+        context['error'] = f"Database connection failed: {e}"
+        return render(request, 'plants/database.html', context)
     except Exception as e:
-        context = {
-            'error': str(e),
-            'diseases': [],
-            'total_diseases': 0,
-            'database_name': 'plant_diseases',
-            'collection_name': 'diseases'
-        }
+        context['error'] = str(e)
         return render(request, 'plants/database.html', context)
 
+# Solution types the search page and database view know how to show
+SOLUTION_TYPES = ('organic', 'inorganic')
+
+def _disease_from_form(data, disease_name, description):
+    """Build the disease document submitted through the add disease form
+
+    Raises ValueError for a solution type other than SOLUTION_TYPES.
+    """
+    # Get solutions
+    solutions = []
+    solution_count = int(data.get('solution_count', 0))
+
+    for i in range(solution_count):
+        sol_type = data.get(f'solution_type_{i}', '').strip()
+        sol_text = data.get(f'solution_text_{i}', '').strip()
+        effectiveness = data.get(f'effectiveness_{i}', '').strip()
+        application = data.get(f'application_{i}', '').strip()
+
+        if sol_type and sol_text:
+            if sol_type not in SOLUTION_TYPES:
+                raise ValueError(f'Solution {i + 1} has an invalid type "{sol_type}"')
+            solutions.append({
+                'type': sol_type,
+                'solution': sol_text,
+                'effectiveness': effectiveness or 'Medium',
+                'application': application or 'Apply as directed'
+            })
+
+    if not solutions:
+        solutions.append({
+            'type': 'organic',
+            'solution': 'Consult agricultural expert for treatment options',
+            'effectiveness': 'Medium',
+            'application': 'Follow expert recommendations'
+        })
+
+    # Create disease document
+    return with_name_key({
+        'name': disease_name,
+        'description': description or f'A plant disease: {disease_name}',
+        'solutions': solutions,
+        'added_date': timezone.now(),
+        'added_manually': True
+    })
+
+@track_pageview
 def add_disease_form(request):
     """Display form to add new disease"""
     if request.method == 'GET':
@@ -387,578 +511,184 @@ def add_disease_form(request):
                 return render(request, 'plants/add_disease.html')
 
             # Check if disease already exists
-            if db and db.diseases.find_one({"name": disease_name}):
+            if db.diseases.find_one({"name_key": normalize_name(disease_name)}, {"_id": 1}):
                 messages.error(request, f'Disease "{disease_name}" already exists')
                 return render(request, 'plants/add_disease.html')
 
-            # Get solutions
-            solutions = []
-            solution_count = int(request.POST.get('solution_count', 0))
-
-            for i in range(solution_count):
-                sol_type = request.POST.get(f'solution_type_{i}', '').strip()
-                sol_text = request.POST.get(f'solution_text_{i}', '').strip()
-                effectiveness = request.POST.get(f'effectiveness_{i}', '').strip()
-                application = request.POST.get(f'application_{i}', '').strip()
-
-                if sol_type and sol_text:
-                    solutions.append({
-                        'type': sol_type,
-                        'solution': sol_text,
-                        'effectiveness': effectiveness or 'Medium',
-                        'application': application or 'Apply as directed'
-                    })
-
-            if not solutions:
-                solutions.append({
-                    'type': 'organic',
-                    'solution': 'Consult agricultural expert for treatment options',
-                    'effectiveness': 'Medium',
-                    'application': 'Follow expert recommendations'
-                })
-
-            # Create disease document
-            disease_doc = {
-                'name': disease_name,
-                'description': description or f'A plant disease: {disease_name}',
-                'solutions': solutions,
-                'added_date': timezone.now(),
-                'added_manually': True
-            }
-
             # Insert into database
-            if db:
+            disease_doc = _disease_from_form(request.POST, disease_name, description)
+            with catalog_write(db, disease_doc):
                 result = db.diseases.insert_one(disease_doc)
-                messages.success(request, f'Disease "{disease_name}" added successfully!')
-                return redirect('plants:view_database')
-            else:
-                messages.error(request, 'Database connection failed')
-                return render(request, 'plants/add_disease.html')
+            catalog_changed()
+            messages.success(request, f'Disease "{disease_name}" added successfully!')
+            return redirect('plants:database')
 
+        except PyMongoError as e:
+            messages.error(request, f'Database connection failed: {str(e)}')
+            return render(request, 'plants/add_disease.html')
         except Exception as e:
             messages.error(request, f'Error adding disease: {str(e)}')
             return render(request, 'plants/add_disease.html')
 
 
 
+SEARCH_DB_ERROR = b'{"error": "Database connection failed"}'
+SEARCH_NOT_FOUND = b'{"error": "Disease not found"}'
+# Most names accepted by one /search/batch/ request
+SEARCH_BATCH_MAX = 100
+# Suggestions only change with the catalog, so browsers may reuse them briefly
+SUGGEST_CACHE_CONTROL = 'public, max-age=300'
+
+def _search_response(disease_input, limit):
+    """Build the (status, body) search response from the pre-rendered index"""
+    if not ensure_disease_index():
+        return 500, SEARCH_DB_ERROR
+    body = disease_index.search_body(disease_input, limit=limit)
+    if body is None:
+        return 404, SEARCH_NOT_FOUND
+    return 200, body
+
+@no_tracking
+@require_http_methods(["GET"])
+def search_suggest(request):
+    """Typeahead completions for the search box: ``?q=<partial name>&limit=``"""
+    if not ensure_disease_index():
+        return HttpResponse(SEARCH_DB_ERROR, status=500, content_type='application/json')
+
+    query = request.GET.get('q', '')
+    limit = clamp_limit(request.GET.get('limit'), default=SUGGEST_LIMIT)
+    response = JsonResponse({"query": query, "suggestions": disease_index.suggest(query, limit)})
+    response['Cache-Control'] = SUGGEST_CACHE_CONTROL
+    return response
+
+@no_tracking
 @csrf_exempt
 @require_http_methods(["POST"])
 def search_disease(request):
     """Search for disease solutions"""
     try:
-        if db is None:
-            return JsonResponse({"error": "Database connection failed"}, status=500)
-
         data = json.loads(request.body)
         disease_input = data.get('disease', '').lower()
 
         if not disease_input:
             return JsonResponse({"error": "Please enter a disease name"}, status=400)
 
-        # Search for disease (case-insensitive) using MongoDB
-        disease = db.diseases.find_one(
-            {"name": {"$regex": f".*{disease_input}.*", "$options": "i"}}
-        )
-
-        if not disease:
-            return JsonResponse({"error": "Disease not found"}, status=404)
-
-        # Organize solutions by type
-        solutions = {"organic": [], "inorganic": []}
-        for solution in disease.get('solutions', []):
-            solution_data = {
-                "solution": solution['solution'],
-                "effectiveness": solution.get('effectiveness', 'Unknown'),
-                "application": solution.get('application', 'Follow standard guidelines')
-            }
-            solutions[solution['type']].append(solution_data)
+        # Picks up catalog writes from other processes before the cache is consulted
+        if not ensure_disease_index():
+            return HttpResponse(SEARCH_DB_ERROR, status=500, content_type='application/json')
 
-        return JsonResponse({
-            "disease": disease['name'],
-            "description": disease.get('description', ''),
-            "solutions": solutions
-        })
+        # Ranked fuzzy search, served from the response cache when possible
+        limit = clamp_limit(data.get('limit'))
+        status, body = search_cache.get_or_compute(
+            disease_input, lambda: _search_response(disease_input, limit), limit,
+            version=disease_index.version,
+        )
+        return HttpResponse(body, status=status, content_type='application/json')
 
     except json.JSONDecodeError:
         return JsonResponse({"error": "Invalid JSON"}, status=400)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
+@no_tracking
 @csrf_exempt
 @require_http_methods(["POST"])
-def reset_database(request):
-    """Reset database with sample data"""
+def search_batch(request):
+    """Search for many diseases at once; results are keyed by the names sent"""
     try:
-        if db is None:
-            return JsonResponse({"error": "Database connection failed"}, status=500)
-
-        # Clear existing data
-        db.diseases.drop()
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
 
-        # Sample data - text only, no images
-        sample_diseases = [
-            {
-                "name": "powdery mildew",
-                "description": "A fungal disease that appears as white powdery coating on leaves and stems",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Baking soda spray (1 tbsp per gallon water)",
-                        "effectiveness": "High",
-                        "application": "Spray weekly on affected areas"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Neem oil treatment",
-                        "effectiveness": "High",
-                        "application": "Apply every 7-14 days"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Sulfur-based fungicide",
-                        "effectiveness": "Very High",
-                        "application": "Apply as directed on label"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Systemic fungicide (myclobutanil)",
-                        "effectiveness": "Very High",
-                        "application": "Professional application recommended"
-                    }
-                ]
-            },
-            {
-                "name": "blight",
-                "description": "A plant disease causing brown spots and wilting of leaves and stems",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Copper sulfate spray",
-                        "effectiveness": "High",
-                        "application": "Apply every 7-10 days in dry weather"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Bacillus subtilis biological control",
-                        "effectiveness": "Medium",
-                        "application": "Apply as preventive treatment"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Chlorothalonil fungicide",
-                        "effectiveness": "Very High",
-                        "application": "Apply every 7-14 days"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Mancozeb fungicide",
-                        "effectiveness": "Very High",
-                        "application": "Use with protective equipment"
-                    }
-                ]
-            },
-            {
-                "name": "rust",
-                "description": "A fungal disease causing orange-red pustules on leaf undersides",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Sulfur dust application",
-                        "effectiveness": "High",
-                        "application": "Apply early morning when dew is present"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Neem oil spray treatment",
-                        "effectiveness": "Medium",
-                        "application": "Apply in cool weather, avoid hot sun"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Propiconazole systemic fungicide",
-                        "effectiveness": "Very High",
-                        "application": "Apply at first sign of disease"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Tebuconazole for severe cases",
-                        "effectiveness": "Very High",
-                        "application": "Professional application only"
-                    }
-                ]
-            },
-            {
-                "name": "aphid infestation",
-                "description": "Small green or black insects clustering on stems and leaves",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Insecticidal soap spray",
-                        "effectiveness": "High",
-                        "application": "Spray every 2-3 days until controlled"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Ladybug biological control",
-                        "effectiveness": "Very High",
-                        "application": "Release 1500 per garden in evening"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Imidacloprid systemic insecticide",
-                        "effectiveness": "Very High",
-                        "application": "Soil drench or foliar spray"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Pyrethrin contact spray",
-                        "effectiveness": "High",
-                        "application": "Apply in early morning or evening"
-                    }
-                ]
-            },
-            {
-                "name": "black spot",
-                "description": "Fungal disease causing black spots on leaves, common in roses",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Baking soda and oil spray",
-                        "effectiveness": "Medium",
-                        "application": "Spray weekly during growing season"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Copper fungicide spray",
-                        "effectiveness": "High",
-                        "application": "Apply every 7-14 days"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Trifloxystrobin fungicide",
-                        "effectiveness": "Very High",
-                        "application": "Apply at first sign of disease"
-                    }
-                ]
-            },
+    names = data.get('diseases') if isinstance(data, dict) else None
+    if not names or not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        return JsonResponse({"error": "Please send a list of disease names"}, status=400)
+    if len(names) > SEARCH_BATCH_MAX:
+        return JsonResponse({"error": f"At most {SEARCH_BATCH_MAX} diseases per request"}, status=400)
+
+    if not ensure_disease_index():
+        return HttpResponse(SEARCH_DB_ERROR, status=500, content_type='application/json')
+
+    # One pass over the in-memory index; each body is the same one /search/ returns
+    bodies = disease_index.search_bodies(names, limit=clamp_limit(data.get('limit')))
+    results = b', '.join(
+        json.dumps(name).encode('utf-8') + b': ' + (body or SEARCH_NOT_FOUND)
+        for name, body in bodies.items()
+    )
+    return HttpResponse(b'{"results": {' + results + b'}}', content_type='application/json')
+
+# /api/diseases/changes/ settings
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_WAIT = 25  # seconds a client may long-poll for the next change (async views only)
+CHANGES_PARAMS_ERROR = "since, limit and wait must be numbers"
+
+def _changes_params(request):
+    """Return ``(since, limit, wait)`` from the query string; raises ValueError"""
+    since = max(0, int(request.GET.get('since', 0)))
+    limit = max(1, min(int(request.GET.get('limit', CHANGES_PAGE_SIZE)), CHANGES_PAGE_SIZE))
+    wait = max(0.0, min(float(request.GET.get('wait', 0)), CHANGES_MAX_WAIT))
+    return since, limit, wait
+
+def _change_document(document):
+    """Make a changed disease JSON serializable"""
+    document['id'] = str(document.pop('_id'))
+    return document
+
+def _changes_response(since, documents, tombstones, cursor, more):
+    """The /api/diseases/changes/ JSON body"""
+    return JsonResponse({
+        "since": since,
+        "cursor": cursor,
+        "more": more,
+        "changes": [_change_document(document) for document in documents],
+        "deleted": [
             {
-                "name": "downy mildew",
-                "description": "Fungal disease causing yellow patches and fuzzy growth on leaf undersides",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Improve air circulation and reduce humidity",
-                        "effectiveness": "Medium",
-                        "application": "Space plants properly, prune for airflow"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Copper hydroxide spray",
-                        "effectiveness": "High",
-                        "application": "Apply in early morning"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Metalaxyl systemic fungicide",
-                        "effectiveness": "Very High",
-                        "application": "Soil drench and foliar spray"
-                    }
-                ]
-            },
-            {
-                "name": "spider mites",
-                "description": "Tiny pests causing stippled leaves and fine webbing",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Predatory mites release",
-                        "effectiveness": "Very High",
-                        "application": "Release when mites first detected"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Neem oil and water spray",
-                        "effectiveness": "High",
-                        "application": "Spray undersides of leaves weekly"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Abamectin miticide",
-                        "effectiveness": "Very High",
-                        "application": "Apply with spreader-sticker"
-                    }
-                ]
-            },
-            {
-                "name": "leaf spot",
-                "description": "Fungal or bacterial disease causing circular spots on leaves",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Remove affected leaves and improve air circulation",
-                        "effectiveness": "Medium",
-                        "application": "Prune infected parts and dispose properly"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Copper-based organic fungicide",
-                        "effectiveness": "High",
-                        "application": "Apply every 10-14 days"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Chlorothalonil fungicide spray",
-                        "effectiveness": "Very High",
-                        "application": "Apply according to label directions"
-                    }
-                ]
-            },
-            {
-                "name": "anthracnose",
-                "description": "Fungal disease causing dark, sunken lesions on leaves and fruits",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Copper sulfate spray treatment",
-                        "effectiveness": "High",
-                        "application": "Apply during cool, wet weather"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Bacillus subtilis biological fungicide",
-                        "effectiveness": "Medium",
-                        "application": "Apply as preventive treatment"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Azoxystrobin systemic fungicide",
-                        "effectiveness": "Very High",
-                        "application": "Apply at first sign of disease"
-                    }
-                ]
-            },
-            {
-                "name": "fusarium wilt",
-                "description": "Soil-borne fungal disease causing yellowing and wilting of plants",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Soil solarization and crop rotation",
-                        "effectiveness": "Medium",
-                        "application": "Cover soil with plastic for 6-8 weeks in summer"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Trichoderma biological control",
-                        "effectiveness": "High",
-                        "application": "Apply to soil before planting"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Benomyl systemic fungicide",
-                        "effectiveness": "High",
-                        "application": "Soil drench treatment"
-                    }
-                ]
-            },
-            {
-                "name": "bacterial canker",
-                "description": "Bacterial infection causing sunken, dark lesions on stems and branches",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Copper hydroxide spray",
-                        "effectiveness": "High",
-                        "application": "Apply during dormant season"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Prune infected branches and sterilize tools",
-                        "effectiveness": "Medium",
-                        "application": "Cut 6 inches below infected area"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Streptomycin antibiotic spray",
-                        "effectiveness": "Very High",
-                        "application": "Apply during bloom period"
-                    }
-                ]
-            },
-            {
-                "name": "scale insects",
-                "description": "Small, hard-shelled insects that attach to stems and leaves",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Horticultural oil spray",
-                        "effectiveness": "High",
-                        "application": "Apply during dormant season"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Beneficial parasitic wasps release",
-                        "effectiveness": "Very High",
-                        "application": "Release when scales are detected"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Systemic insecticide (imidacloprid)",
-                        "effectiveness": "Very High",
-                        "application": "Soil application in spring"
-                    }
-                ]
-            },
-            {
-                "name": "thrips",
-                "description": "Tiny insects causing silvery streaks and black spots on leaves",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Blue sticky traps",
-                        "effectiveness": "Medium",
-                        "application": "Place traps around affected plants"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Predatory mites (Amblyseius cucumeris)",
-                        "effectiveness": "High",
-                        "application": "Release in greenhouse or garden"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Spinosad insecticide spray",
-                        "effectiveness": "Very High",
-                        "application": "Apply in evening to avoid bee exposure"
-                    }
-                ]
-            },
-            {
-                "name": "whitefly",
-                "description": "Small white flying insects that cluster on leaf undersides",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Yellow sticky traps",
-                        "effectiveness": "Medium",
-                        "application": "Place traps near affected plants"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Encarsia formosa parasitic wasp",
-                        "effectiveness": "Very High",
-                        "application": "Release in greenhouse environments"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Acetamiprid systemic insecticide",
-                        "effectiveness": "Very High",
-                        "application": "Apply as soil drench or foliar spray"
-                    }
-                ]
-            },
-            {
-                "name": "root rot",
-                "description": "Fungal disease affecting plant roots, causing yellowing and wilting",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Improve drainage and reduce watering",
-                        "effectiveness": "High",
-                        "application": "Ensure proper soil drainage"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Mycorrhizal fungi inoculant",
-                        "effectiveness": "Medium",
-                        "application": "Apply to soil around roots"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Metalaxyl fungicide soil drench",
-                        "effectiveness": "Very High",
-                        "application": "Apply to soil around affected plants"
-                    }
-                ]
-            },
-            {
-                "name": "fire blight",
-                "description": "Bacterial disease causing blackened, burnt appearance in branches",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Prune infected branches during dry weather",
-                        "effectiveness": "High",
-                        "application": "Cut 12 inches below infected area"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Copper sulfate spray",
-                        "effectiveness": "Medium",
-                        "application": "Apply during dormant season"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Streptomycin antibiotic spray",
-                        "effectiveness": "Very High",
-                        "application": "Apply during bloom period"
-                    }
-                ]
-            },
-            {
-                "name": "mosaic virus",
-                "description": "Viral disease causing mottled yellow and green patterns on leaves",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Remove infected plants immediately",
-                        "effectiveness": "High",
-                        "application": "Destroy infected plants to prevent spread"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Control aphid vectors with beneficial insects",
-                        "effectiveness": "Medium",
-                        "application": "Release ladybugs and lacewings"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "No chemical cure - focus on prevention",
-                        "effectiveness": "Low",
-                        "application": "Use virus-resistant plant varieties"
-                    }
-                ]
-            },
-            {
-                "name": "clubroot",
-                "description": "Soil-borne disease causing swollen, distorted roots in brassicas",
-                "solutions": [
-                    {
-                        "type": "organic",
-                        "solution": "Lime application to raise soil pH",
-                        "effectiveness": "High",
-                        "application": "Apply lime to achieve pH 7.2 or higher"
-                    },
-                    {
-                        "type": "organic",
-                        "solution": "Long crop rotation (7+ years)",
-                        "effectiveness": "Very High",
-                        "application": "Avoid brassicas for 7-10 years"
-                    },
-                    {
-                        "type": "inorganic",
-                        "solution": "Fluazinam fungicide soil treatment",
-                        "effectiveness": "High",
-                        "application": "Apply before planting susceptible crops"
-                    }
-                ]
+                "id": str(tombstone['document_id']),
+                "name": tombstone.get('name'),
+                "updated_seq": tombstone['updated_seq'],
+                "deleted_at": tombstone['deleted_at'],
             }
-        ]
+            for tombstone in tombstones
+        ],
+    })
+
+@no_tracking
+@require_http_methods(["GET"])
+def disease_changes(request):
+    """Diseases changed and deleted after ?since=<cursor>, for incremental sync
+
+    Pass the returned ``cursor`` as ``since`` on the next call; while
+    ``more`` is true there are further changes to fetch straight away.
+    ``wait=<seconds>`` (long polling) is only honoured by the async views,
+    where a waiting client holds no worker; here it returns at once.
+    """
+    try:
+        since, limit, _ = _changes_params(request)
+    except ValueError:
+        return JsonResponse({"error": CHANGES_PARAMS_ERROR}, status=400)
 
-        # Insert data into MongoDB
-        db.diseases.insert_many(sample_diseases)
+    try:
+        documents, tombstones, cursor, more = changes_since(db, since, limit)
+    except PyMongoError as e:
+        return JsonResponse({"error": f"Database connection failed: {e}"}, status=500)
+    return _changes_response(since, documents, tombstones, cursor, more)
 
-        return JsonResponse({"message": "Database reset successfully with Django and MongoDB!"})
+@no_tracking
+@csrf_exempt
+@require_http_methods(["POST"])
+def reset_database(request):
+    """Reset database with sample data"""
+    try:
+        # Load the versioned seed by swapping in a staging collection, so
+        # searches keep seeing the old catalog until the new one is complete
+        seed = apply_seed(db.diseases, swap=True)
+        catalog_changed()
+
+        return JsonResponse({
+            "message": "Database reset successfully with Django and MongoDB!",
+            "seed_version": seed['version'],
+            "diseases": seed['written'],
+        })
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -1,6 +1,7 @@
 """
 Simple Plant Disease Solution - Configuration
 """
+import os
 
 # MongoDB Configuration
 MONGODB_HOST = 'localhost'
@@ -17,5 +18,5 @@ FLASK_DEBUG = True
 APP_NAME = 'Simple Plant Disease Solution'
 APP_VERSION = '1.0.0'
 
-# Database Connection String
-MONGODB_URI = f'mongodb://{MONGODB_HOST}:{MONGODB_PORT}/'
+# Database Connection String (override with the MONGODB_URI environment variable)
+MONGODB_URI = os.environ.get('MONGODB_URI', f'mongodb://{MONGODB_HOST}:{MONGODB_PORT}/')
@@ -4,9 +4,15 @@ Simple MongoDB Setup and Connection
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Repository root, for the connection provider and search engine shared with the Django app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from pymongo import MongoClient
 from config.settings import MONGODB_URI, DATABASE_NAME, COLLECTION_NAME
+from database.statistics import SolutionStatistics, summarize
+from plants.mongo import get_client, is_connected, with_retry
+from plants.catalog import catalog_write, get_version
+from plants.disease_index import with_name_key
+from plants.search_engine import DiseaseSearchEngine
 
 class SimpleDatabase:
     def __init__(self):
@@ -14,55 +20,52 @@ class SimpleDatabase:
         self.client = None
         self.db = None
         self.collection = None
+        self.search_engine = DiseaseSearchEngine()
+        self.statistics = SolutionStatistics()
         self.connect()
     
     def connect(self):
-        """Connect to MongoDB"""
+        """Get the shared MongoDB client (connects lazily on first use)"""
         try:
-            print("🔄 Connecting to MongoDB...")
-            self.client = MongoClient(MONGODB_URI)
-            self.client.admin.command('ping')
+            self.client = get_client(MONGODB_URI)
             self.db = self.client[DATABASE_NAME]
             self.collection = self.db[COLLECTION_NAME]
-            print("✅ Connected to MongoDB successfully!")
             return True
         except Exception as e:
             print(f"❌ MongoDB connection failed: {e}")
             return False
     
     def is_connected(self):
-        """Check if database is connected"""
-        try:
-            if self.client:
-                self.client.admin.command('ping')
-                return True
-        except:
-            pass
-        return False
+        """Check if database is connected (from driver heartbeats, no ping per call)"""
+        return bool(self.client) and is_connected(MONGODB_URI)
     
     def get_all_diseases(self):
         """Get all diseases from database"""
         try:
-            if not self.is_connected():
-                self.connect()
-            
-            diseases = list(self.collection.find({}))
-            return diseases
+            return with_retry(lambda: list(self.collection.find({})))
         except Exception as e:
             print(f"Error getting diseases: {e}")
             return []
     
-    def search_diseases(self, query):
-        """Search diseases by name"""
+    def iter_diseases(self, batch_size=500):
+        """Yield every disease from a batched cursor, without loading them all"""
+        return self.collection.find({}).sort('_id', 1).batch_size(batch_size)
+    
+    def get_catalog_version(self):
+        """Version counter bumped by every stamped write, for ETags"""
+        return with_retry(lambda: get_version(self.db, COLLECTION_NAME))
+    
+    def search_diseases(self, query, limit=10):
+        """Search diseases by name and description, best match first"""
         try:
-            if not self.is_connected():
-                self.connect()
+            # Reloads the index when another process changed the catalog
+            with_retry(lambda: self.search_engine.ensure_current(
+                self.collection, lambda: get_version(self.db, COLLECTION_NAME)
+            ))
             
-            # Case-insensitive search
-            diseases = list(self.collection.find({
-                "name": {"$regex": query, "$options": "i"}
-            }))
-            return diseases
+            # Ranked fuzzy search served from the in-memory index
+            results = self.search_engine.search(query, limit=limit)
+            return [dict(result.document) for result in results]
         except Exception as e:
             print(f"Error searching diseases: {e}")
             return []
@@ -70,22 +73,32 @@ class SimpleDatabase:
     def add_disease(self, disease_data):
         """Add a new disease to database"""
         try:
-            if not self.is_connected():
-                self.connect()
-            
-            result = self.collection.insert_one(disease_data)
+            with catalog_write(self.db, with_name_key(disease_data), COLLECTION_NAME):
+                result = with_retry(lambda: self.collection.insert_one(disease_data))
+            self.catalog_changed()
             return result.inserted_id
         except Exception as e:
             print(f"Error adding disease: {e}")
             return None
     
+    def catalog_changed(self):
+        """Refresh the search index after a write (statistics follow the catalog version)"""
+        self.search_engine.refresh(self.collection, get_version(self.db, COLLECTION_NAME))
+    
+    def get_solution_statistics(self):
+        """Solution counts by type and effectiveness (cached per catalog version)"""
+        try:
+            return with_retry(lambda: self.statistics.get(
+                self.collection, get_version(self.db, COLLECTION_NAME)
+            ))
+        except Exception as e:
+            print(f"Error counting solutions: {e}")
+            return summarize([])
+    
     def get_disease_count(self):
         """Get total number of diseases"""
         try:
-            if not self.is_connected():
-                self.connect()
-            
-            return self.collection.count_documents({})
+            return with_retry(self.collection.estimated_document_count)
         except Exception as e:
             print(f"Error counting diseases: {e}")
             return 0
@@ -0,0 +1,56 @@
+"""
+Solution Statistics for the Database Dashboard
+
+Counts solutions by type and by effectiveness with one MongoDB aggregation,
+so the dashboard never loads every disease to count them in Python. The
+result is cached against the catalog version (``plants.catalog``), so a
+write from any process or tool makes the next dashboard recount.
+"""
+
+# One group per (type, effectiveness) pair; the totals are summed from these few rows
+SOLUTION_COUNTS_PIPELINE = [
+    {'$unwind': '$solutions'},
+    {'$group': {
+        '_id': {
+            'type': {'$ifNull': ['$solutions.type', 'unknown']},
+            'effectiveness': {'$ifNull': ['$solutions.effectiveness', 'Unknown']},
+        },
+        'count': {'$sum': 1},
+    }},
+]
+
+
+def summarize(groups):
+    """Fold the pipeline's (type, effectiveness) groups into dashboard counts"""
+    by_type = {'organic': 0, 'inorganic': 0}
+    by_effectiveness = {}
+    for group in groups:
+        solution_type = group['_id']['type']
+        effectiveness = group['_id']['effectiveness']
+        by_type[solution_type] = by_type.get(solution_type, 0) + group['count']
+        by_effectiveness[effectiveness] = by_effectiveness.get(effectiveness, 0) + group['count']
+    return {
+        'total_solutions': sum(by_type.values()),
+        'by_type': by_type,
+        'by_effectiveness': by_effectiveness,
+    }
+
+
+class SolutionStatistics:
+    """Solution counts for a diseases collection, cached per catalog version"""
+
+    def __init__(self):
+        # (version, counts), replaced as a whole so readers never see a mixed pair
+        self._cached = (None, None)
+
+    def get(self, collection, version):
+        """Return the counts, running the aggregation only when ``version`` changed
+
+        Read ``version`` before calling: counts computed while a write lands
+        are then stored under the version before it, and recounted next time.
+        """
+        cached_version, stats = self._cached
+        if stats is None or cached_version != version:
+            stats = summarize(collection.aggregate(SOLUTION_COUNTS_PIPELINE))
+            self._cached = (version, stats)
+        return stats
@@ -7,12 +7,15 @@ import sys
 import subprocess
 import time
 
+# Repository root, for the shared MongoDB connection provider
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 def check_mongodb():
     """Check if MongoDB is running"""
     try:
-        from pymongo import MongoClient
-        client = MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=3000)
-        client.admin.command('ping')
+        from plants.mongo import ping
+        from config.settings import MONGODB_URI
+        ping(MONGODB_URI)
         print("✅ MongoDB is running")
         return True
     except Exception:
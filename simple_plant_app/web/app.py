@@ -5,8 +5,9 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, flash, stream_with_context
 from datetime import datetime
+import json
 from database.mongodb_setup import db
 from config.settings import FLASK_HOST, FLASK_PORT, FLASK_DEBUG, APP_NAME
 
@@ -41,23 +42,14 @@ def database():
     diseases = db.get_all_diseases()
     total_count = len(diseases)
     
-    # Count solution types
-    organic_count = 0
-    inorganic_count = 0
-    
-    for disease in diseases:
-        solutions = disease.get('solutions', [])
-        for solution in solutions:
-            if solution.get('type') == 'organic':
-                organic_count += 1
-            elif solution.get('type') == 'inorganic':
-                inorganic_count += 1
+    # Solution counts come from one aggregation, cached per catalog version
+    stats = db.get_solution_statistics()
     
     return render_template('database.html',
                          diseases=diseases,
                          total_count=total_count,
-                         organic_count=organic_count,
-                         inorganic_count=inorganic_count,
+                         organic_count=stats['by_type'].get('organic', 0),
+                         inorganic_count=stats['by_type'].get('inorganic', 0),
                          app_name=APP_NAME)
 
 @app.route('/add-disease', methods=['GET', 'POST'])
@@ -119,9 +111,35 @@ def add_disease():
     
     return render_template('add_disease.html', app_name=APP_NAME)
 
+def _json_default(value):
+    """Serialize ObjectIds and datetimes in exported documents"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def export_diseases_ndjson():
+    """Stream the catalog as one JSON document per line, with an ETag from the catalog version"""
+    etag = f'diseases-v{db.get_catalog_version()}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    def generate():
+        for disease in db.iter_diseases():
+            disease['_id'] = str(disease['_id'])
+            yield json.dumps(disease, default=_json_default) + '\n'
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.set_etag(etag)
+    return response
+
 @app.route('/api/diseases')
 def api_diseases():
-    """API endpoint to get all diseases"""
+    """API endpoint to get all diseases (?format=ndjson streams them instead)"""
+    if request.args.get('format') == 'ndjson':
+        return export_diseases_ndjson()
+
     diseases = db.get_all_diseases()
     
     # Convert ObjectId to string for JSON serialization
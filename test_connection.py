@@ -2,15 +2,15 @@
 """
 Quick MongoDB Connection Test
 """
-from pymongo import MongoClient
+from plants.mongo import get_client, get_db
 
 try:
     print("🔄 Testing MongoDB connection...")
-    client = MongoClient('mongodb://localhost:27017/')
+    client = get_client()
     client.admin.command('ping')
     print("✅ MongoDB connection successful!")
     
-    db = client['plant_diseases']
+    db = get_db()
     count = db.diseases.count_documents({})
     print(f"📊 Found {count} diseases in database")
     
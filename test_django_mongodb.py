@@ -5,7 +5,9 @@ Test Django MongoDB Connection
 import os
 import sys
 import django
-from pymongo import MongoClient
+from plants.catalog import catalog_write
+from plants.disease_index import with_name_key
+from plants.mongo import get_client, get_db
 
 # Add the project directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -23,12 +25,12 @@ def test_mongodb_connection():
     
     try:
         # Test direct MongoDB connection
-        client = MongoClient('mongodb://localhost:27017/')
+        client = get_client()
         client.admin.command('ping')
         print("✅ Direct MongoDB connection: SUCCESS")
         
         # Test database access
-        db = client['plant_diseases']
+        db = get_db()
         print(f"✅ Database 'plant_diseases' access: SUCCESS")
         
         # Test collection access
@@ -56,7 +58,8 @@ def test_mongodb_connection():
                 ]
             }
             
-            result = collection.insert_one(sample_disease)
+            with catalog_write(db, with_name_key(sample_disease)):
+                result = collection.insert_one(sample_disease)
             print(f"✅ Sample document inserted with ID: {result.inserted_id}")
             
             # Verify insertion
@@ -4,7 +4,7 @@ MongoDB Connection Test for PlantDoc Project
 This script verifies the MongoDB connection and shows what data will be visible in MongoDB Compass
 """
 
-from pymongo import MongoClient
+from plants.mongo import get_client, get_db
 import json
 from datetime import datetime
 
@@ -16,14 +16,14 @@ def test_mongodb_connection():
     
     try:
         # Connect to MongoDB (same connection as your Django app)
-        client = MongoClient('mongodb://localhost:27017/')
+        client = get_client()
         
         # Test connection
         client.admin.command('ping')
         print("✅ MongoDB Connection: SUCCESSFUL")
         
         # Get database
-        db = client['plant_diseases']
+        db = get_db()
         print(f"📊 Database: {db.name}")
         
         # Get collections